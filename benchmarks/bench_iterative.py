@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Compares the explicit-stack traversal and reconstruction of TreeNode with
+the recursive implementations they replaced, on balanced trees.
+
+Balanced trees are the only shape the recursive versions can handle, since
+their depth stays far below the recursion limit.
+
+Usage:
+
+    python -m benchmarks.bench_iterative [--repeat 5]
+"""
+import argparse
+import timeit
+from array import array
+
+from binary_tree import TreeNode
+from binary_tree.builders import random_tree
+from binary_tree.reconstruction import (
+    inorder_positions, preorder_links, postorder_links)
+
+
+def recursive_traverse(node, mode="preorder"):
+    """The recursive traversal that TreeNode.traverse used to be."""
+    if mode == "preorder":
+        traversal = [node.value]
+        if node.left_child:
+            traversal.extend(recursive_traverse(node.left_child, mode))
+        if node.right_child:
+            traversal.extend(recursive_traverse(node.right_child, mode))
+    elif mode == "postorder":
+        traversal = []
+        if node.left_child:
+            traversal.extend(recursive_traverse(node.left_child, mode))
+        if node.right_child:
+            traversal.extend(recursive_traverse(node.right_child, mode))
+        traversal.append(node.value)
+    else:
+        traversal = []
+        if node.left_child:
+            traversal.extend(recursive_traverse(node.left_child, mode))
+        traversal.append(node.value)
+        if node.right_child:
+            traversal.extend(recursive_traverse(node.right_child, mode))
+    return traversal
+
+
+def recursive_preorder_links(preorder, inorder):
+    """The recursive, index based preorder reconstruction."""
+    size = len(preorder)
+    positions = inorder_positions(inorder)
+    left = array("q", [-1]) * size
+    right = array("q", [-1]) * size
+
+    def link(pre_start, in_start, length):
+        position = positions.get(preorder[pre_start], -1)
+        if not in_start <= position < in_start + length:
+            raise ValueError("Inconsistent traversals.")
+        left_size = position - in_start
+        if left_size > 0:
+            left[pre_start] = link(pre_start + 1, in_start, left_size)
+        right_size = length - left_size - 1
+        if right_size > 0:
+            right[pre_start] = link(
+                pre_start + 1 + left_size, position + 1, right_size)
+        return pre_start
+
+    link(0, 0, size)
+    return left, right
+
+
+def recursive_postorder_links(postorder, inorder):
+    """The recursive, index based postorder reconstruction."""
+    size = len(postorder)
+    positions = inorder_positions(inorder)
+    left = array("q", [-1]) * size
+    right = array("q", [-1]) * size
+
+    def link(post_start, in_start, length):
+        root = post_start + length - 1
+        position = positions.get(postorder[root], -1)
+        if not in_start <= position < in_start + length:
+            raise ValueError("Inconsistent traversals.")
+        left_size = position - in_start
+        if left_size > 0:
+            left[root] = link(post_start, in_start, left_size)
+        right_size = length - left_size - 1
+        if right_size > 0:
+            right[root] = link(
+                post_start + left_size, position + 1, right_size)
+        return root
+
+    link(0, 0, size)
+    return left, right
+
+
+def best_of(first, second, repeat):
+    """Returns the best wall times of a number of runs of two functions.
+    The runs alternate, so that both see the same load on the machine."""
+    times = ([], [])
+    for _ in range(repeat):
+        for function, function_times in zip((first, second), times):
+            function_times.append(timeit.timeit(function, number=1))
+    return min(times[0]), min(times[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10 ** 4, 10 ** 5, 10 ** 6])
+    args = parser.parse_args()
+
+    print("{:>10} {:<18} {:>12} {:>12} {:>8}".format(
+        "nodes", "operation", "recursive", "iterative", "speedup"))
+    for size in args.sizes:
+        root = random_tree(size, shape="balanced")
+        preorder = TreeNode.traverse(root, mode="preorder")
+        inorder = TreeNode.traverse(root, mode="inorder")
+        postorder = TreeNode.traverse(root, mode="postorder")
+        cases = [
+            ("traverse " + mode,
+             lambda mode=mode: recursive_traverse(root, mode),
+             lambda mode=mode: TreeNode.traverse(root, mode))
+            for mode in ("preorder", "inorder", "postorder")]
+        cases += [
+            ("links preorder",
+             lambda: recursive_preorder_links(preorder, inorder),
+             lambda: preorder_links(preorder, inorder)),
+            ("links postorder",
+             lambda: recursive_postorder_links(postorder, inorder),
+             lambda: postorder_links(postorder, inorder)),
+        ]
+        for name, recursive, iterative in cases:
+            recursive_time, iterative_time = best_of(
+                recursive, iterative, args.repeat)
+            print("{:>10} {:<18} {:>11.4f}s {:>11.4f}s {:>7.2f}x".format(
+                size, name, recursive_time, iterative_time,
+                recursive_time / iterative_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Compares the chunked parser of the text traversal files with the
+readlines based parser it replaced.
+
+Each parser runs in a fresh Python process, so that the peak resident set
+size it reports is its own. Throughput is given in MB of text per second.
+
+Usage:
+
+    python -m benchmarks.bench_parse [--size 1000000] [--repeat 3]
+"""
+import argparse
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from binary_tree.text_format import encode_values, read_values
+
+
+def readlines_parser(path):
+    """The parser that TreeNode.parse_files used to be."""
+    with open(path, "rb+") as f:
+        return [int(l.decode("ascii").strip()) for l in f.readlines()]
+
+
+PARSERS = {
+    "readlines": readlines_parser,
+    "chunked": read_values,
+}
+
+
+def run_parser(name, path, repeat):
+    """Runs a parser and prints its best time and the peak RSS in KiB."""
+    parser = PARSERS[name]
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        values = parser(path)
+        best = min(best, time.perf_counter() - start)
+        del values
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(best, peak)
+
+
+def write_values(path, size):
+    """Writes a text traversal file of seeded random values."""
+    rng = random.Random(0)
+    values = rng.sample(range(-2 ** 40, 2 ** 40), size)
+    with open(path, "wb") as f:
+        f.write(encode_values(values))
+
+
+def baseline_rss():
+    """Returns the peak RSS in KiB of a process that only imports the
+    parsers, to be subtracted from the measurements."""
+    output = subprocess.check_output([
+        sys.executable, "-c",
+        "import resource, benchmarks.bench_parse; "
+        "print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"])
+    return int(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=10 ** 6)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--run", choices=sorted(PARSERS), help=argparse.SUPPRESS)
+    parser.add_argument("--write", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_parser(args.run, args.path, args.repeat)
+        return
+    if args.write:
+        write_values(args.path, args.size)
+        return
+
+    handle, path = tempfile.mkstemp(suffix=".inorder")
+    os.close(handle)
+    try:
+        # The values are generated in a child process too, since a forked
+        # process inherits the peak RSS of its parent.
+        subprocess.check_call([
+            sys.executable, "-m", "benchmarks.bench_parse",
+            "--write", "--path", path, "--size", str(args.size)])
+        megabytes = os.path.getsize(path) / 1e6
+        base = baseline_rss()
+        print("{} values, {:.1f} MB of text".format(args.size, megabytes))
+        print("{:<10} {:>10} {:>10} {:>14}".format(
+            "parser", "seconds", "MB/s", "peak RSS (MB)"))
+        for name in ("readlines", "chunked"):
+            output = subprocess.check_output([
+                sys.executable, "-m", "benchmarks.bench_parse",
+                "--run", name, "--path", path, "--repeat", str(args.repeat)])
+            seconds, peak = output.split()
+            seconds = float(seconds)
+            peak = (int(peak) - base) / 1024
+            print("{:<10} {:>10.3f} {:>10.1f} {:>14.1f}".format(
+                name, seconds, megabytes / seconds, peak))
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
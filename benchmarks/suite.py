@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Benchmark suite of TreeNode traversal, saving, parsing and loading.
+
+Every operation is run on seeded trees of every shape and size, and timed
+on its own: TreeNode.traverse, save_to_disk, parse_files and TreeNode.load
+(from traversals already in memory). For each one the suite records the
+best wall time over a number of runs, the resulting nodes per second, and
+the peak memory allocated by Python during one extra run, measured with
+tracemalloc.
+
+The results can be stored as a baseline, and later runs compared against
+it with --compare. Timings only compare on the same machine, so the
+comparison is opt-in. A compared run fails, with exit status 1, if any
+operation is slower or uses more memory than the baseline by more than the
+given thresholds.
+
+Usage:
+
+    python -m benchmarks.suite
+    python -m benchmarks.suite --sizes 1000 1000000 --shapes balanced left
+    python -m benchmarks.suite --update-baseline
+    python -m benchmarks.suite --compare
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+import tracemalloc
+
+from binary_tree import TreeNode
+from binary_tree.builders import SHAPES, random_tree
+from binary_tree.text_format import read_values
+
+OPERATIONS = ("traverse", "save_to_disk", "parse_files", "load")
+DEFAULT_SIZES = (10 ** 3, 10 ** 4, 10 ** 5)
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def operations(root, directory):
+    """Returns the functions running each operation on a tree. The files of
+    the tree are written into directory."""
+    prefix = os.path.join(directory, "tree")
+    files = {
+        "preorder": prefix + ".preorder",
+        "inorder": prefix + ".inorder",
+    }
+    root.save_to_disk(prefix)
+    traversals = {mode: read_values(path) for mode, path in files.items()}
+    return {
+        "traverse": lambda: TreeNode.traverse(root),
+        "save_to_disk": lambda: root.save_to_disk(prefix),
+        "parse_files": lambda: TreeNode.parse_files(**files),
+        "load": lambda: TreeNode.load(**traversals),
+    }
+
+
+def peak_memory(function):
+    """Returns the peak number of bytes allocated while running function."""
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(shapes, sizes, repeat, seed):
+    """Runs the suite. Returns the results, keyed by shape, size and
+    operation."""
+    results = {}
+    for shape in shapes:
+        for size in sizes:
+            root = random_tree(size, shape=shape, seed=seed)
+            directory = tempfile.mkdtemp()
+            try:
+                functions = operations(root, directory)
+                for name in OPERATIONS:
+                    function = functions[name]
+                    seconds = min(timeit.repeat(
+                        function, number=1, repeat=repeat))
+                    results["{}/{}/{}".format(shape, size, name)] = {
+                        "seconds": seconds,
+                        "nodes_per_second": size / seconds,
+                        "peak_bytes": peak_memory(function),
+                    }
+            finally:
+                shutil.rmtree(directory)
+            del root
+    return results
+
+
+def compare(results, baseline, time_threshold, memory_threshold,
+            min_seconds=0.0):
+    """Returns the descriptions of the results that regressed from the
+    baseline by more than the thresholds, given as ratios. Times shorter
+    than min_seconds are too noisy to be compared."""
+    regressions = []
+    for key, result in sorted(results.items()):
+        if key not in baseline:
+            continue
+        before = baseline[key]
+        if result["seconds"] > max(
+                before["seconds"] * time_threshold, min_seconds):
+            regressions.append("{}: {:.4f}s against {:.4f}s".format(
+                key, result["seconds"], before["seconds"]))
+        if result["peak_bytes"] > before["peak_bytes"] * memory_threshold:
+            regressions.append("{}: {} peak bytes against {}".format(
+                key, result["peak_bytes"], before["peak_bytes"]))
+    return regressions
+
+
+def print_results(results, baseline):
+    """Prints the results as a table, with the time ratio to the baseline."""
+    print("{:<30} {:>10} {:>14} {:>14} {:>9}".format(
+        "benchmark", "seconds", "nodes/s", "peak MB", "baseline"))
+    for key, result in results.items():
+        ratio = ""
+        if key in baseline:
+            ratio = "{:.2f}x".format(
+                result["seconds"] / baseline[key]["seconds"])
+        print("{:<30} {:>10.4f} {:>14,.0f} {:>14.2f} {:>9}".format(
+            key, result["seconds"], result["nodes_per_second"],
+            result["peak_bytes"] / 1e6, ratio))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--shapes", nargs="+", choices=sorted(SHAPES), default=sorted(SHAPES))
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--baseline", default=BASELINE,
+        help="The baseline file to compare against, or to update.")
+    parser.add_argument(
+        "--update-baseline", action="store_true",
+        help="Store the results into the baseline file.")
+    parser.add_argument(
+        "--compare", action="store_true",
+        help="Fail if the results regressed from the baseline.")
+    parser.add_argument(
+        "--time-threshold", type=float, default=1.5,
+        help="The slowdown ratio beyond which a benchmark fails.")
+    parser.add_argument(
+        "--memory-threshold", type=float, default=1.1,
+        help="The peak memory ratio beyond which a benchmark fails.")
+    parser.add_argument(
+        "--min-seconds", type=float, default=0.005,
+        help="Times below this are too noisy to fail a benchmark.")
+    parser.add_argument("--output", help="Also write the results as JSON.")
+    args = parser.parse_args()
+
+    results = run(args.shapes, args.sizes, args.repeat, args.seed)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.update_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        return
+    if not args.compare:
+        return
+    regressions = compare(
+        results, baseline, args.time_threshold, args.memory_threshold,
+        min_seconds=args.min_seconds)
+    if regressions:
+        print("\nRegressions against {}:".format(args.baseline))
+        for regression in regressions:
+            print("    " + regression)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
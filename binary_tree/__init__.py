@@ -8,10 +8,11 @@ These trees can grow to be any size.
 The tree items can be cached into disk and read again from disk.
 """
 
-__all__ = ["TreeNode"]
+__all__ = ["TreeNode", "ArrayTree"]
 __version__ = "2019.4b0"
 __author__ = "Vinay Keerthi"
 __email__ = "ktvkvinaykeerthi+binary_tree@gmail.com"
 
 
 from binary_tree.tree_node import TreeNode
+from binary_tree.array_tree import ArrayTree
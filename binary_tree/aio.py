@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Asynchronous saving and parsing of trees, for asyncio applications.
+
+save_to_disk and parse_files block for as long as they walk, format, parse
+or rebuild a tree. The coroutines below run that work in an executor, the
+default thread pool of the event loop unless one is given, so the event
+loop keeps serving other tasks meanwhile, and several trees can be saved
+or parsed concurrently.
+
+In the text format, the traversal files are written and read concurrently:
+each batch of every traversal is formatted and written in its own task,
+and both files are parsed at the same time. The single file formats are
+saved and parsed with one call in the executor. Subclasses of TreeNode,
+such as the cached and delta trees, are saved through the same hooks as
+by their save_to_disk, so they keep track of their saves either way.
+
+Cancelling a text save stops it at the next batch, waits for the calls it
+already submitted to the executor, then closes its files and, if atomic is
+True, removes the temporary files so that the previous dump is left
+untouched. Cancelling a parse stops it before the next phase. The
+call already running in the executor cannot be interrupted, and finishes
+in the background.
+"""
+import asyncio
+import contextvars
+import os
+from functools import partial
+
+from binary_tree import storage
+from binary_tree.instrumentation import NULL_INSTRUMENTATION
+from binary_tree.reconstruction import check_sufficient
+from binary_tree.text_format import (
+    TraversalFiles, encode_values, read_values)
+from binary_tree.tree_node import TreeNode
+
+def _run(executor, function, *args, **kwargs):
+    """Runs a function in an executor, in a copy of the current context so
+    that its instrumentation joins the running operation. Returns a future
+    of its result."""
+    context = contextvars.copy_context()
+    return asyncio.get_running_loop().run_in_executor(
+        executor, partial(context.run, function, *args, **kwargs))
+
+
+async def _settle(futures):
+    """Waits for futures to complete, and retrieves their exceptions, which
+    are no longer of any use."""
+    if not futures:
+        return
+    done, _ = await asyncio.wait(futures)
+    for future in done:
+        if not future.cancelled():
+            future.exception()
+
+
+async def save_to_disk(tree, file_prefix, preorder=True, inorder=True,
+                       postorder=False, atomic=False, format="text",
+                       instrumentation=None, executor=None):
+    """Saves a TreeNode or ArrayTree tree to disk without blocking the event
+    loop. See TreeNode.save_to_disk for the meaning of the arguments. The
+    blocking work is run in executor."""
+    storage.check_format(format)
+    if format != "text":
+        await _run(
+            executor, tree.save_to_disk, file_prefix,
+            preorder=preorder, inorder=inorder, postorder=postorder,
+            atomic=atomic, format=format, instrumentation=instrumentation)
+        return
+    if instrumentation is None:
+        instrumentation = NULL_INSTRUMENTATION
+    modes = storage.text_modes(preorder, inorder, postorder)
+    # A TreeNode is walked, and told that it was saved, through the same
+    # hooks as in TreeNode.save_to_disk, which subclasses extend.
+    iter_batches = (
+        tree._iter_batches if isinstance(tree, TreeNode) else
+        tree.iter_batches)
+    with instrumentation.operation("save_to_disk") as operation:
+        batches = iter_batches(phase=operation.phase("traverse"), **modes)
+        await _write_text(
+            batches, file_prefix, modes, atomic, executor, operation)
+    if isinstance(tree, TreeNode):
+        await _run(
+            executor, tree._saved, file_prefix, preorder=preorder,
+            inorder=inorder, postorder=postorder, atomic=atomic,
+            format=format)
+
+
+async def _write_text(batches, file_prefix, modes, atomic, executor,
+                      operation):
+    """Writes batches of traversals into their text files, every file in its
+    own task. See text_format.write_batches."""
+    traverse = operation.phase("traverse")
+    encode = operation.phase("format")
+    write = operation.phase("write")
+    # The calls submitted to the executor, which must complete before the
+    # files are closed, even when the save is cancelled.
+    pending = set()
+
+    async def run(function, *args):
+        future = _run(executor, function, *args)
+        pending.add(future)
+        future.add_done_callback(pending.discard)
+        return await asyncio.shield(future)
+
+    files = TraversalFiles(file_prefix, atomic=atomic, **modes)
+    try:
+        outputs = files.outputs
+        while True:
+            with traverse:
+                batch = await run(next, batches, None)
+            if batch is None:
+                break
+            chunks = [
+                (f, values) for f, values in zip(outputs, batch)
+                if f and values]
+            with encode:
+                encoded = await asyncio.gather(*(
+                    run(encode_values, values) for _, values in chunks))
+            with write:
+                await asyncio.gather(*(
+                    run(f.write, data)
+                    for (f, _), data in zip(chunks, encoded)))
+            encode.nodes += sum(len(values) for _, values in chunks)
+            write.bytes_written += sum(map(len, encoded))
+        if atomic:
+            with write:
+                await run(files.sync)
+    except BaseException:
+        try:
+            await _settle(pending)
+        finally:
+            files.discard()
+        raise
+    with write:
+        files.commit()
+    # Every file holds one value per node of the tree.
+    nodes = encode.nodes // max(len(files.modes), 1)
+    traverse.nodes = encode.nodes = write.nodes = nodes
+
+
+async def parse_files(preorder=None, postorder=None, inorder=None,
+                      format="text", filename=None, memory_map=False,
+                      tree_class=TreeNode, instrumentation=None,
+                      executor=None):
+    """Parses files and loads a tree of tree_class, TreeNode or ArrayTree,
+    from them without blocking the event loop. See TreeNode.parse_files for
+    the meaning of the arguments. The blocking work is run in executor."""
+    storage.check_format(format)
+    if format != "text":
+        return await _run(
+            executor, tree_class.parse_files, format=format,
+            filename=filename, memory_map=memory_map,
+            instrumentation=instrumentation)
+    check_sufficient(preorder, postorder, inorder)
+    if instrumentation is None:
+        instrumentation = NULL_INSTRUMENTATION
+    order, path = ("preorder", preorder) if preorder else (
+        "postorder", postorder)
+    with instrumentation.operation("parse_files") as operation:
+        with operation.phase("parse") as parse:
+            traversal, inorder_traversal = await asyncio.gather(
+                _run(executor, read_values, path),
+                _run(executor, read_values, inorder))
+        parse.nodes = len(inorder_traversal)
+        if instrumentation.enabled:
+            parse.bytes_read = (
+                os.path.getsize(path) + os.path.getsize(inorder))
+        return await _run(
+            executor, tree_class.load, inorder=inorder_traversal,
+            instrumentation=instrumentation, **{order: traversal})
@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Array backed binary tree.
+
+A TreeNode is a full Python object per node. An ArrayTree instead stores a
+whole tree as three parallel arrays of 64 bit integers: the value of every
+node, and the indices of its left and right children, -1 meaning that there
+is no child. That is 24 bytes per node, and traversals only ever touch
+those three arrays.
+"""
+from array import array
+from functools import partial
+from itertools import islice
+
+from binary_tree import storage, succinct
+from binary_tree.exceptions import (
+    InconsistentTraversalError, InvalidTraversalMode, InvalidValueError)
+from binary_tree.instrumentation import NULL_INSTRUMENTATION, NULL_PHASE
+from binary_tree.reconstruction import check_sufficient, depth, reconstruct
+from binary_tree.tree_node import TreeNode
+
+
+class ArrayTree:
+    """Binary tree stored as parallel arrays of values and child indices."""
+
+    def __init__(self, values, left, right, root=0):
+        """Initializer method.
+        Takes the values of the nodes, the indices of their left and right
+        children, and the index of the root node. The sequences are used as
+        they are, so they can be arrays, or memoryviews over shared memory."""
+        if not len(values) == len(left) == len(right):
+            raise InconsistentTraversalError(
+                "The values and the child indices of a tree must have the "
+                "same length.")
+        if len(values) and not 0 <= root < len(values):
+            raise InconsistentTraversalError(
+                "The root must be one of the nodes of the tree.")
+        self.values = values
+        self.left = left
+        self.right = right
+        self.root = root
+
+    def __len__(self):
+        """Returns the number of nodes of the tree."""
+        return len(self.values)
+
+    def __repr__(self):
+        """Raw Representation."""
+        return "<ArrayTree [Nodes: {}] [Root: {}]>".format(
+            len(self),
+            self.values[self.root] if len(self) else "-")
+
+    @classmethod
+    def from_tree_node(cls, node):
+        """Returns the ArrayTree of a tree of TreeNode objects.
+        The nodes are stored in preorder, so the root is at index 0."""
+        values = array("q")
+        left = array("q")
+        right = array("q")
+        # Each node waiting on the stack comes with the child links its index
+        # has to be stored in, and the index of its parent.
+        stack = [(node, None, -1)]
+        pop, push = stack.pop, stack.append
+        try:
+            while stack:
+                node, links, parent = pop()
+                index = len(values)
+                values.append(node.value)
+                left.append(-1)
+                right.append(-1)
+                if links is not None:
+                    links[parent] = index
+                if node.right_child:
+                    push((node.right_child, right, index))
+                if node.left_child:
+                    push((node.left_child, left, index))
+        except OverflowError:
+            raise InvalidValueError(
+                "An ArrayTree only holds values that fit in 64 bits.")
+        return cls(values, left, right, root=0)
+
+    @classmethod
+    def _from_links(cls, values, left, right, root):
+        """Returns the tree made of the given values and child links. The
+        links are widened to 64 bit arrays, unless they already are."""
+        try:
+            values = array("q", values)
+        except OverflowError:
+            raise InvalidValueError(
+                "An ArrayTree only holds values that fit in 64 bits.")
+        left, right = (
+            links if isinstance(links, array) and links.typecode == "q"
+            else array("q", links) for links in (left, right))
+        return cls(values, left, right, root=root)
+
+    def to_tree_node(self):
+        """Returns the root of a copy of the tree made of TreeNode objects,
+        or None if the tree is empty."""
+        if not len(self.values):
+            return None
+        values = self.values
+        if not isinstance(values, (array, list)):
+            # The values of NumPy arrays aren't int objects.
+            values = values.tolist()
+        return TreeNode._from_links(values, self.left, self.right, self.root)
+
+    @classmethod
+    def load(cls, preorder=None, postorder=None, inorder=None,
+             instrumentation=None):
+        """Loads the tree given one of the preorder and postorder, along
+        with the inorder. See TreeNode.load.
+
+        The values are stored in the order of the preorder or postorder
+        traversal that is given, and the child links computed from it are
+        used as they are."""
+        check_sufficient(preorder, postorder, inorder)
+        if instrumentation is None:
+            instrumentation = NULL_INSTRUMENTATION
+        with instrumentation.operation("load") as operation:
+            values, left, right, root = reconstruct(
+                preorder=preorder, postorder=postorder, inorder=inorder,
+                operation=operation)
+            with operation.phase("build") as build:
+                tree = cls._from_links(values, left, right, root)
+            build.nodes = len(tree)
+        return tree
+
+    def iter_indices(self, mode="preorder"):
+        """Returns an iterator over the indices of the nodes, in the order of
+        the traversal given in one of 3 modes: preorder, postorder or
+        inorder."""
+        mode = mode.lower()
+        if mode not in ("preorder", "inorder", "postorder"):
+            raise InvalidTraversalMode(
+            ("{} is not an acceptable or "
+            "implemented form of traversal! "
+            "Choose from preorder, postorder "
+            "or inorder traversal.").format(mode))
+        if not len(self):
+            return iter(())
+        return getattr(self, "_iter_" + mode)()
+
+    def _iter_preorder(self):
+        left, right = self.left, self.right
+        stack = [self.root]
+        pop, push = stack.pop, stack.append
+        while stack:
+            index = pop()
+            yield index
+            if right[index] >= 0:
+                push(right[index])
+            if left[index] >= 0:
+                push(left[index])
+
+    def _iter_inorder(self):
+        left, right = self.left, self.right
+        stack = []
+        pop, push = stack.pop, stack.append
+        index = self.root
+        while stack or index >= 0:
+            if index >= 0:
+                push(index)
+                index = left[index]
+            else:
+                index = pop()
+                yield index
+                index = right[index]
+
+    def _iter_postorder(self):
+        left, right = self.left, self.right
+        # A node is pushed back under a -1 marker before its children, and is
+        # yielded once the marker resurfaces.
+        stack = [self.root]
+        pop, push = stack.pop, stack.append
+        while stack:
+            index = pop()
+            if index < 0:
+                yield pop()
+                continue
+            push(index)
+            push(-1)
+            if right[index] >= 0:
+                push(right[index])
+            if left[index] >= 0:
+                push(left[index])
+
+    def iter_traverse(self, mode="preorder"):
+        """Returns an iterator over the values of the tree traversal in one
+        of 3 modes: preorder, postorder or inorder."""
+        return map(self.values.__getitem__, self.iter_indices(mode))
+
+    def traverse(self, mode="preorder"):
+        """Returns the tree traversal in one of 3 modes: preorder, postorder
+        or inorder."""
+        return list(self.iter_traverse(mode))
+
+    def iter_batches(self, preorder=True, inorder=True, postorder=False,
+                     batch_size=65536, phase=NULL_PHASE):
+        """Yields several traversals of the tree in batches of values, like
+        traversal.iter_batches does for TreeNode objects. The traversals are
+        walked side by side, batch_size values at a time.
+
+        The depth of the tree, which bounds the stacks of the walks, is
+        recorded as the max_depth of phase."""
+        if phase is not NULL_PHASE:
+            phase.max_depth = max(
+                phase.max_depth, depth(self.left, self.right, self.root))
+        values = self.values
+        walks = [
+            self.iter_indices(mode) if wanted else iter(())
+            for mode, wanted in (
+                ("preorder", preorder),
+                ("inorder", inorder),
+                ("postorder", postorder))]
+        while True:
+            batch = tuple(
+                [values[index] for index in islice(walk, batch_size)]
+                for walk in walks)
+            if not any(batch):
+                return
+            yield batch
+
+    def save_to_disk(self, file_prefix, preorder=True, inorder=True,
+                     postorder=False, atomic=False, format="text",
+                     instrumentation=None):
+        """Saves the tree to disk, in the same files as TreeNode.save_to_disk
+        would. Either class can parse the files written by the other."""
+        storage.save_to_disk(
+            self.iter_batches, file_prefix,
+            preorder=preorder, inorder=inorder, postorder=postorder,
+            atomic=atomic, format=format,
+            encode_succinct=partial(
+                succinct.encode_arrays,
+                self.values, self.left, self.right, self.root),
+            instrumentation=instrumentation)
+
+    @classmethod
+    def parse_files(cls, preorder=None, postorder=None, inorder=None,
+                    format="text", filename=None, memory_map=False,
+                    instrumentation=None):
+        """Parses files and loads the tree from them.
+        See TreeNode.parse_files."""
+        return storage.parse_files(
+            cls.load, preorder=preorder, postorder=postorder,
+            inorder=inorder, format=format, filename=filename,
+            memory_map=memory_map, from_links=cls._from_links,
+            instrumentation=instrumentation)
+
+    def buffers(self):
+        """Returns read-only memoryviews over the values, left and right
+        arrays, without copying them. They can be handed to anything that
+        understands the buffer protocol."""
+        return tuple(
+            memoryview(array_).toreadonly()
+            for array_ in (self.values, self.left, self.right))
+
+    @property
+    def nbytes(self):
+        """Returns the number of bytes held by the three arrays."""
+        return sum(
+            memoryview(array_).nbytes
+            for array_ in (self.values, self.left, self.right))
@@ -0,0 +1,300 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Binary format of the traversal files.
+
+Both traversals needed to reassemble a tree are stored in a single file. The
+file starts with a 16 byte header:
+
+    magic       4 bytes     b"BTRE"
+    version     1 byte      1
+    width       1 byte      4 or 8, the size in bytes of every value
+    order       1 byte      1 for preorder, 2 for postorder
+    reserved    1 byte      0
+    count       8 bytes     the number of nodes
+
+It is followed by the inorder traversal and then by the preorder or
+postorder traversal, each as count signed integers of width bytes. All the
+numbers are little-endian.
+
+Since the header keeps both traversals aligned on their width, a file can
+also be memory mapped and its traversals used in place, see
+MappedTraversals.
+"""
+import mmap
+import os
+import struct
+import sys
+import uuid
+from array import array
+from contextlib import contextmanager
+
+from binary_tree.exceptions import (
+    InvalidValueError, UnsupportedFormatError)
+from binary_tree.instrumentation import NULL_OPERATION
+
+MAGIC = b"BTRE"
+VERSION = 1
+HEADER = struct.Struct("<4sBBBxQ")
+ORDERS = {1: "preorder", 2: "postorder"}
+ORDER_CODES = {name: code for code, name in ORDERS.items()}
+
+INT32_MIN, INT32_MAX = -2 ** 31, 2 ** 31 - 1
+
+
+def _typecode(width):
+    """Returns the array typecode of the signed integers of a width."""
+    for typecode in ("i", "l", "q"):
+        if array(typecode).itemsize == width:
+            return typecode
+    raise UnsupportedFormatError(
+        "{} byte integers aren't supported.".format(width))
+
+
+def _overflow():
+    """Raises an error for a value that doesn't fit in the format."""
+    raise InvalidValueError(
+        "Only values that fit in 64 bits can be stored in binary files.")
+
+
+def _as_int64(values):
+    """Returns a sequence of integers as an array of 64 bit integers."""
+    if isinstance(values, array) and values.typecode == "q":
+        return values
+    try:
+        return array("q", values)
+    except OverflowError:
+        _overflow()
+
+
+def pack_values(values):
+    """Returns the width in bytes and the little-endian array to write for a
+    sequence of integers. The width is 4 if every value fits in 32 bits, and
+    8 otherwise. The sequence of the caller is never modified."""
+    values = _as_int64(values)
+    width = 8
+    if len(values) and (
+            INT32_MIN <= min(values) and max(values) <= INT32_MAX):
+        width = 4
+        values = array(_typecode(4), values)
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return width, values
+
+
+def unpack_values(f, width, count, file_path):
+    """Reads count little-endian integers of a width from a file, into an
+    array."""
+    values = array(_typecode(width))
+    try:
+        values.fromfile(f, count)
+    except EOFError:
+        raise UnsupportedFormatError("{} is truncated.".format(file_path))
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def temporary_path(file_path):
+    """Returns a temporary name to write a file under before renaming it
+    into place. Every call returns a different name, so that several saves
+    to the same file, even from a single process, never share one."""
+    return "{}.{}.tmp".format(file_path, uuid.uuid4().hex)
+
+
+@contextmanager
+def writing(file_path, atomic=False):
+    """Opens a file for writing in binary mode.
+
+    If atomic is True, the file is written under a temporary name, synced
+    and renamed into place once the block completes. If the block fails,
+    the temporary file is removed and the destination left untouched."""
+    target = file_path
+    if atomic:
+        target = temporary_path(file_path)
+    try:
+        with open(target, "wb") as f:
+            yield f
+            if atomic:
+                f.flush()
+                os.fsync(f.fileno())
+    except BaseException:
+        if atomic and os.path.exists(target):
+            os.remove(target)
+        raise
+    if atomic:
+        os.replace(target, file_path)
+
+
+def write_traversals(file_path, order, traversal, inorder, atomic=False):
+    """Writes a pair of traversals into a binary traversal file.
+
+    The traversals are written with bulk array writes. If atomic is True,
+    the file is written under a temporary name, synced and renamed into
+    place once complete. Returns the number of bytes written."""
+    # Both traversals hold the same values, so they share the width of the
+    # inorder.
+    width, inorder = pack_values(inorder)
+    traversal = _as_int64(traversal)
+    if width == 4:
+        traversal = array(_typecode(4), traversal)
+    if sys.byteorder == "big":
+        traversal = array(traversal.typecode, traversal)
+        traversal.byteswap()
+    header = HEADER.pack(
+        MAGIC, VERSION, width, ORDER_CODES[order], len(inorder))
+    with writing(file_path, atomic=atomic) as f:
+        f.write(header)
+        inorder.tofile(f)
+        traversal.tofile(f)
+    return HEADER.size + 2 * width * len(inorder)
+
+
+def write_batches(batches, file_path, order="preorder", atomic=False,
+                  operation=NULL_OPERATION):
+    """Writes the inorder and the preorder or postorder traversals of a tree
+    into a binary traversal file.
+
+    The traversals are taken from batches of preorder, inorder and postorder
+    values, as yielded by traversal.iter_batches. They are gathered into
+    compact arrays, and written with bulk array writes. The time spent
+    gathering and writing them is recorded into the traverse and write
+    phases of operation."""
+    traversal = array("q")
+    inorder = array("q")
+    with operation.phase("traverse") as traverse:
+        try:
+            for pre, ino, post in batches:
+                traversal.extend(pre if order == "preorder" else post)
+                inorder.extend(ino)
+        except OverflowError:
+            _overflow()
+    with operation.phase("write") as write:
+        write.bytes_written += write_traversals(
+            file_path, order, traversal, inorder, atomic=atomic)
+    traverse.nodes = write.nodes = len(inorder)
+
+
+def unpack_header(data, header, magic, version, kind, name):
+    """Unpacks the header of a file of one of the binary formats from the
+    start of data, and checks its magic and version.
+
+    header is the struct of the header, which starts with a 4 byte magic and
+    a 1 byte version, and kind the name of the format, such as "binary tree
+    file". The name of the file only appears in the errors. Returns the
+    other fields of the header."""
+    if len(data) < header.size:
+        raise UnsupportedFormatError(
+            "{} is too short to be a {}.".format(name, kind))
+    found_magic, found_version, *fields = header.unpack_from(data)
+    if found_magic != magic:
+        raise UnsupportedFormatError("{} is not a {}.".format(name, kind))
+    if found_version != version:
+        raise UnsupportedFormatError(
+            "{} is a version {} {}, only version {} is supported.".format(
+                name, found_version, kind, version))
+    return fields
+
+
+def read_header(f, header, magic, version, kind, file_path):
+    """Reads the header of a file of one of the binary formats from the
+    current position of f, and checks it. See unpack_header."""
+    return unpack_header(
+        f.read(header.size), header, magic, version, kind, file_path)
+
+
+def check_size(size, expected, name):
+    """Raises an error if a file of size bytes is shorter than the expected
+    size."""
+    if size < expected:
+        raise UnsupportedFormatError("{} is truncated.".format(name))
+
+
+def _read_traversals_header(f, file_path):
+    """Reads and validates the header of a binary traversal file.
+    Returns the width, the name of the order and the node count."""
+    width, order, count = read_header(
+        f, HEADER, MAGIC, VERSION, "binary tree file", file_path)
+    if width not in (4, 8) or order not in ORDERS:
+        raise UnsupportedFormatError(
+            "{} has a corrupt header.".format(file_path))
+    return width, ORDERS[order], count
+
+
+def read_traversals(file_path):
+    """Reads a binary traversal file.
+
+    Returns the name of the order that is stored alongside the inorder,
+    that traversal and the inorder traversal, as arrays."""
+    with open(file_path, "rb") as f:
+        width, order, count = _read_traversals_header(f, file_path)
+        inorder = unpack_values(f, width, count, file_path)
+        traversal = unpack_values(f, width, count, file_path)
+    return order, traversal, inorder
+
+
+class MappedTraversals:
+    """Memory mapped view of a binary traversal file.
+
+    The traversals are exposed as read-only memoryviews over the mapped file,
+    so nothing is copied or parsed up front: the pages are read from the
+    page cache as the traversals are accessed, and are shared between all
+    the processes mapping the same file. On big-endian hosts the values have
+    to be byte swapped, so they are copied into arrays instead.
+
+    The views are only valid until close is called. It is best used as a
+    context manager.
+    """
+
+    def __init__(self, file_path):
+        """Maps a binary traversal file and checks its header."""
+        self._file = open(file_path, "rb")
+        self._map = None
+        self._views = []
+        try:
+            width, self.order, count = _read_traversals_header(
+                self._file, file_path)
+            check_size(
+                os.fstat(self._file.fileno()).st_size,
+                HEADER.size + 2 * count * width, file_path)
+            self._map = mmap.mmap(
+                self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            typecode = _typecode(width)
+            self.inorder = self._cast(HEADER.size, count, width, typecode)
+            self.traversal = self._cast(
+                HEADER.size + count * width, count, width, typecode)
+        except BaseException:
+            self.close()
+            raise
+
+    def _cast(self, offset, count, width, typecode):
+        """Returns the count integers found at an offset of the file."""
+        view = memoryview(self._map)[offset:offset + count * width]
+        self._views.append(view)
+        if sys.byteorder == "big":
+            values = array(typecode, view.tobytes())
+            values.byteswap()
+            return values
+        values = view.cast(typecode)
+        self._views.append(values)
+        return values
+
+    def close(self):
+        """Releases the views and unmaps the file."""
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        """Returns the number of nodes of the tree."""
+        return len(self.inorder)
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Bulk construction of whole trees.
+
+Wiring TreeNode objects by hand validates every node and assignment. The
+builders below instead work out the child links of the whole tree first,
+with explicit stacks or queues, and create all the nodes at once with the
+_from_links of the tree class, so they take linear time whatever the depth
+of the tree:
+
+    from_sorted         a height-balanced tree whose inorder traversal is a
+                        given sequence, such as a sorted one
+    from_level_order    a tree given its level order, with None for the
+                        missing children
+    random_tree         a seeded tree of a given size and shape
+
+Every builder takes the class of the tree to build, TreeNode by default,
+and works with ArrayTree and the TreeNode subclasses as well. An empty
+sequence gives None, like a missing child.
+
+The shape of a random tree is described by the size of the left subtree of
+a node, given the size of its subtree and its depth:
+
+    balanced    both subtrees have the same size, give or take a node
+    random      the size of the left subtree is drawn uniformly
+    left        every node only has a left child
+    right       every node only has a right child
+    zigzag      the nodes only have left and right children, in turns
+    spine       every node has a leaf child and a child continuing the spine,
+                on a random side
+"""
+import random
+from array import array
+
+from binary_tree.exceptions import InvalidValueError
+from binary_tree.tree_node import TreeNode
+
+
+def _balanced(size, depth, rng):
+    return (size - 1) // 2
+
+
+def _random(size, depth, rng):
+    return rng.randrange(size)
+
+
+def _left(size, depth, rng):
+    return size - 1
+
+
+def _right(size, depth, rng):
+    return 0
+
+
+def _zigzag(size, depth, rng):
+    return size - 1 if depth % 2 == 0 else 0
+
+
+def _spine(size, depth, rng):
+    if size < 3:
+        return rng.randrange(size)
+    return size - 2 if rng.random() < 0.5 else 1
+
+
+SHAPES = {
+    "balanced": _balanced,
+    "random": _random,
+    "left": _left,
+    "right": _right,
+    "zigzag": _zigzag,
+    "spine": _spine,
+}
+
+
+def _layout(size, left_size_of, rng):
+    """Returns the left and right child links, in preorder layout, of a tree
+    of a given size whose left subtrees have the sizes given by
+    left_size_of, along with the inorder position of every node."""
+    left = array("q", [-1]) * size
+    right = array("q", [-1]) * size
+    positions = array("q", [0]) * size
+    # Each subtree is described by the preorder index of its root, its size,
+    # its depth and the inorder position of its first node.
+    stack = [(0, size, 0, 0)] if size else []
+    pop, push = stack.pop, stack.append
+    while stack:
+        root, length, depth, start = pop()
+        left_size = left_size_of(length, depth, rng)
+        right_size = length - left_size - 1
+        positions[root] = start + left_size
+        if right_size:
+            right[root] = root + 1 + left_size
+            push((root + 1 + left_size, right_size, depth + 1,
+                  start + left_size + 1))
+        if left_size:
+            left[root] = root + 1
+            push((root + 1, left_size, depth + 1, start))
+    return left, right, positions
+
+
+def _check_values(values):
+    """Raises InvalidValueError unless all the values are integers."""
+    for value in values:
+        if not isinstance(value, int):
+            raise InvalidValueError(
+                "The values of a tree must be integers, not {!r}.".format(
+                    value))
+
+
+def shape_links(size, shape, seed=0):
+    """Returns the left and right child links, in preorder layout, of a tree
+    of a given size and shape."""
+    if shape not in SHAPES:
+        raise InvalidValueError(
+            "{} is not a shape. Choose from {}.".format(
+                shape, ", ".join(sorted(SHAPES))))
+    left, right, _ = _layout(size, SHAPES[shape], random.Random(seed))
+    return left, right
+
+
+def random_tree(size, shape="random", seed=0, tree_class=TreeNode):
+    """Returns a tree of tree_class of a given size and shape. The values
+    are a shuffle of range(size), so they are unique. The same seed always
+    gives the same tree."""
+    left, right = shape_links(size, shape, seed=seed)
+    if not size:
+        return None
+    values = list(range(size))
+    random.Random(seed).shuffle(values)
+    return tree_class._from_links(values, left, right, 0)
+
+
+def from_sorted(values, tree_class=TreeNode):
+    """Returns a height-balanced tree of tree_class whose inorder traversal
+    is values. If they are sorted, it's a binary search tree."""
+    _check_values(values)
+    if not values:
+        return None
+    left, right, positions = _layout(len(values), _balanced, None)
+    return tree_class._from_links(
+        [values[position] for position in positions], left, right, 0)
+
+
+def from_level_order(values, tree_class=TreeNode):
+    """Returns a tree of tree_class given its level order, in which None
+    stands for a missing child. The children of every node come after all
+    the nodes of the previous levels, in order, and the trailing None can
+    be left out, so that [1, None, 2, 3] is the tree whose root 1 has a
+    right child 2, which has a left child 3."""
+    items = iter(values)
+    first = next(items, None)
+    if first is None:
+        return None
+    nodes = [first]
+    left = array("q", [-1])
+    right = array("q", [-1])
+    # The nodes get their children in the order they were added, two
+    # entries each.
+    for count, value in enumerate(items):
+        parent = count // 2
+        if value is None:
+            continue
+        if parent == len(nodes):
+            raise InvalidValueError(
+                "{} comes after the last node that can have "
+                "children.".format(value))
+        links = right if count % 2 else left
+        links[parent] = len(nodes)
+        nodes.append(value)
+        left.append(-1)
+        right.append(-1)
+    _check_values(nodes)
+    return tree_class._from_links(nodes, left, right, 0)
@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Trees caching their traversals until they change.
+
+Every traversal of a TreeNode tree walks it again, and so does every save.
+A CachedTreeNode keeps the traversals computed from it, and the succinct
+encoding of its subtree, until something changes in that subtree. Its value
+and children are tracked, so any change clears the caches of the node and
+of all its ancestors, and of nothing else.
+
+TreeNode.traverse and CachedTreeNode.iter_traverse then return a cached
+traversal when there is one, and save_to_disk writes the cached traversals
+of an unchanged tree without walking it. Computing the traversal of a node
+reuses the cached traversals of the subtrees below it, and caches those of
+the subtrees it walks of at least MIN_CACHED nodes which are the smaller of
+two siblings. After a change, only the nodes close to the path from the
+root to the change are walked again, while every value is held by at most
+log2(n) cached traversals of a tree of n nodes.
+"""
+from binary_tree import succinct
+from binary_tree.exceptions import InvalidTraversalMode
+from binary_tree.instrumentation import NULL_PHASE
+from binary_tree.tracking import TrackedTreeNode
+from binary_tree.tree_node import TreeNode
+
+MODES = ("preorder", "inorder", "postorder")
+# The smallest subtree whose traversal is cached while walking a larger one.
+MIN_CACHED = 64
+
+
+def _collect(node, mode):
+    """Returns the traversal of a tree in a mode, made of the cached
+    traversals of its subtrees wherever there are some.
+
+    The traversals of the subtrees walked on the way are cached as well, see
+    _fill.
+
+    The stack holds nodes still to be expanded, tuples of values ready to be
+    added to the traversal, in the order they come in it, and, for the nodes
+    with two children, a list holding the node and where its traversal
+    starts. The list comes back once the left subtree is complete, and
+    records where it ends, then once the whole subtree is complete."""
+    result = []
+    append, extend = result.append, result.extend
+    stack = [node]
+    pop, push = stack.pop, stack.append
+    while stack:
+        node = pop()
+        if node.__class__ is tuple:
+            extend(node)
+            continue
+        if node.__class__ is list:
+            if len(node) == 2:
+                node.append(len(result))
+            else:
+                _fill(node, mode, result)
+            continue
+        cache = node._cache
+        if cache is not None and mode in cache:
+            extend(cache[mode])
+            continue
+        left, right = node._left, node._right
+        if left is not None and right is not None:
+            marker = [node, len(result)]
+            push(marker)
+            if mode == "preorder":
+                append(node._value)
+                push(right)
+            elif mode == "inorder":
+                push(right)
+                push((node._value,))
+            else:
+                push((node._value,))
+                push(right)
+            push(marker)
+            push(left)
+        elif mode == "preorder":
+            if right is not None:
+                push(right)
+            if left is not None:
+                push(left)
+            append(node._value)
+        elif mode == "inorder":
+            if right is not None:
+                push(right)
+            push((node._value,))
+            if left is not None:
+                push(left)
+        else:
+            push((node._value,))
+            if right is not None:
+                push(right)
+            if left is not None:
+                push(left)
+    return result
+
+
+def _fill(marker, mode, result):
+    """Caches the traversal of the smaller child of a node, left on a tie,
+    once _collect walked the subtree of the node, if it holds at least
+    MIN_CACHED nodes.
+
+    A cached child then holds at most half of the nodes below its parent, so
+    a value is held by at most log2(n) cached traversals of a tree of n
+    nodes."""
+    node, start, middle = marker
+    end = len(result)
+    if end - start <= 2 * MIN_CACHED:
+        return
+    # The left subtree ends at middle. The value of the node comes first in
+    # preorder, right after the left subtree in inorder and last in
+    # postorder.
+    end_left = middle
+    if mode == "preorder":
+        start += 1
+    elif mode == "inorder":
+        middle += 1
+    else:
+        end -= 1
+    if end_left - start <= end - middle:
+        child, start, end = node._left, start, end_left
+    else:
+        child, start, end = node._right, middle, end
+    if end - start < MIN_CACHED:
+        return
+    cache = child._cache
+    if cache is None:
+        child._cache = cache = {}
+    if mode not in cache:
+        cache[mode] = tuple(result[start:end])
+
+
+class CachedTreeNode(TrackedTreeNode):
+    """Node of a binary tree which caches its traversals until its subtree
+    changes."""
+
+    __slots__ = ("_cache",)
+
+    def __init__(self, value, left=None, right=None):
+        """Initializer method.
+        Takes an integer value, a left node and a right node, which must be
+        CachedTreeNode objects."""
+        self._cache = None
+        super().__init__(value, left, right)
+
+    @classmethod
+    def _from_links(cls, values, left, right, root):
+        """Creates the nodes of a whole tree at once, with empty caches.
+        Returns the root node."""
+        nodes = cls._build(values, left, right)
+        for node in nodes:
+            node._cache = None
+        return nodes[root]
+
+    @staticmethod
+    def iter_traverse(node, mode="preorder", nodes=False):
+        """Returns an iterator over the tree traversal given a node in one of
+        3 modes, like TreeNode.iter_traverse. The values come from the
+        cached traversal of the node, computed first if need be."""
+        if nodes:
+            return TreeNode.iter_traverse(node, mode=mode, nodes=True)
+        return iter(node.traversal(mode))
+
+    def traversal(self, mode="preorder"):
+        """Returns the traversal of the subtree of the node in one of 3
+        modes, as a tuple, from the cache if it's there."""
+        mode = mode.lower()
+        cache = self._cache
+        if cache is not None and mode in cache:
+            return cache[mode]
+        if mode not in MODES:
+            raise InvalidTraversalMode(
+                ("{} is not an acceptable or "
+                 "implemented form of traversal! "
+                 "Choose from preorder, postorder "
+                 "or inorder traversal.").format(mode))
+        values = tuple(_collect(self, mode))
+        if cache is None:
+            self._cache = cache = {}
+        cache[mode] = values
+        return values
+
+    @property
+    def cached(self):
+        """The names of the traversals and encodings cached by the node."""
+        return tuple(self._cache or ())
+
+    def _iter_batches(self, preorder=True, inorder=True, postorder=False,
+                      batch_size=65536, phase=NULL_PHASE):
+        """Yields slices of the cached traversals of the node, which are
+        computed first if need be, like traversal.iter_batches. The slices
+        aren't walked, so nothing is recorded into phase."""
+        traversals = [
+            self.traversal(mode) if wanted else ()
+            for mode, wanted in zip(MODES, (preorder, inorder, postorder))]
+        size = max(len(traversal) for traversal in traversals)
+        for start in range(0, size, batch_size):
+            yield tuple(
+                traversal[start:start + batch_size]
+                for traversal in traversals)
+
+    def _encode_succinct(self):
+        """Returns the succinct encoding of the subtree of the node, from the
+        cache if it's there."""
+        cache = self._cache
+        if cache is not None and "succinct" in cache:
+            return cache["succinct"]
+        values, codes = succinct.encode(self)
+        encoded = tuple(values), bytes(codes)
+        if cache is None:
+            self._cache = cache = {}
+        cache["succinct"] = encoded
+        return encoded
+
+    def _invalidate(self):
+        """Clears the caches of the node and of its ancestors."""
+        for ancestor in self._ancestors():
+            ancestor._cache = None
+
+    def _set_value(self, value):
+        self._value = value
+        self._invalidate()
+
+    def _attached(self, node):
+        self._invalidate()
+
+    def _detached(self, node):
+        self._invalidate()
+
@@ -0,0 +1,364 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Incremental saves of trees changed between dumps.
+
+save_to_disk writes the whole tree every time, however little of it
+changed. A DeltaTreeNode tracks which values and children changed since it
+was last saved. save_to_disk saves it in full into a base dump, and starts a
+delta log next to it, named after the prefix with a .delta extension.
+save_delta then appends to the log only the values and the subtrees that
+changed since the last save, each keyed by its path from the root, so a
+checkpoint costs time proportional to the amount of change rather than to
+the size of the tree.
+
+parse_files replays the log over the base when given its path, and compact
+merges the log back into a fresh base, which is also what calling
+save_to_disk on the live tree does. Compaction is worth it once the log
+grows to a sizeable part of the base, since loading replays all of it.
+
+A delta log starts with a 32 byte header:
+
+    magic       4 bytes     b"BTDL"
+    version     1 byte      1
+    reserved    3 bytes     0
+    checksums   3 x 4 bytes the CRC-32 of the preorder, inorder and
+                            postorder files of the base, 0 for those not
+                            saved. The binary and succinct formats have a
+                            single file, whose checksum comes first.
+    size        8 bytes     the size of the log up to its last complete
+                            checkpoint
+
+followed by records of a 17 byte header:
+
+    kind        1 byte      1 for a value, 2 for a subtree
+    length      8 bytes     the length of the path, in bits
+    size        8 bytes     the size of the payload
+
+followed by the path, the sides taken from the root, 0 for left and 1 for
+right, packed into as many bytes as needed, and the payload. The payload of
+a value is the value as a signed integer of as many bytes as needed. That
+of a subtree is its succinct encoding, or nothing when the child was
+removed. All the numbers are little-endian.
+
+A checkpoint is appended after the size in the header, and the header is
+only updated once the checkpoint is synced to disk. A checkpoint cut short
+is thus ignored, and overwritten by the next one. A log whose checksums
+don't match the base, left by a compaction that didn't complete, is
+ignored with a warning.
+"""
+import os
+import struct
+import warnings
+import zlib
+
+from binary_tree import succinct
+from binary_tree.binary_format import check_size, unpack_header, writing
+from binary_tree.exceptions import (
+    InconsistentTraversalError, UnsupportedFormatError)
+from binary_tree.storage import check_format, text_modes
+from binary_tree.tracking import TrackedTreeNode
+from binary_tree.traversal import iter_preorder
+
+MAGIC = b"BTDL"
+VERSION = 1
+HEADER = struct.Struct("<4sBxxxIIIQ")
+RECORD = struct.Struct("<BQQ")
+VALUE, SUBTREE = 1, 2
+
+# What changed about a node since the last save. BELOW means that something
+# changed in its subtree.
+CHANGED_VALUE, CHANGED_LEFT, CHANGED_RIGHT, CHANGED_BELOW = 1, 2, 4, 8
+
+
+def log_path(file_prefix):
+    """Returns the path of the delta log of the dump saved under a
+    prefix."""
+    return "{}.delta".format(file_prefix)
+
+
+def base_files(file_prefix, preorder=True, inorder=True, postorder=False,
+               format="text"):
+    """Returns the files of the base dump saved under a prefix with
+    save_to_disk, as the preorder, inorder and postorder file, None for
+    those not saved. The single file of the binary and succinct formats
+    comes first."""
+    check_format(format)
+    if format == "binary":
+        return "{}.tree".format(file_prefix), None, None
+    if format == "succinct":
+        return "{}.succinct".format(file_prefix), None, None
+    modes = text_modes(preorder, inorder, postorder)
+    return tuple(
+        "{}.{}".format(file_prefix, mode) if modes[mode] else None
+        for mode in ("preorder", "inorder", "postorder"))
+
+
+def _checksum(file_path):
+    """Returns the CRC-32 of a file, or 0 for None."""
+    checksum = 0
+    if file_path is None:
+        return checksum
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            checksum = zlib.crc32(chunk, checksum)
+    return checksum
+
+
+def _read_header(header, file_path):
+    """Unpacks and validates the header of a delta log. Returns the
+    checksums of its base and its size."""
+    *checksums, size = unpack_header(
+        header, HEADER, MAGIC, VERSION, "delta log", file_path)
+    return tuple(checksums), size
+
+
+def _record(kind, path, payload):
+    """Returns the bytes of a record, given its path as a string of 0s and
+    1s."""
+    packed = b""
+    if path:
+        packed = int(path, 2).to_bytes((len(path) + 7) // 8, "little")
+    return RECORD.pack(kind, len(path), len(payload)) + packed + payload
+
+
+def _encode_value(value):
+    """Returns the payload of a value."""
+    return value.to_bytes(value.bit_length() // 8 + 1, "little", signed=True)
+
+
+def _encode_subtree(node):
+    """Returns the payload of a subtree, and marks it as saved."""
+    if node is None:
+        return b""
+    for child in iter_preorder(node):
+        child._changes = 0
+    return succinct.dumps(*succinct.encode(node))
+
+
+def read_log(file_path):
+    """Reads a delta log. Returns the checksums of its base, and its records
+    as (kind, path, payload) tuples, the path being a string of 0s and 1s.
+    """
+    with open(file_path, "rb") as f:
+        data = f.read()
+    checksums, size = _read_header(data, file_path)
+    check_size(len(data), size, file_path)
+    records = []
+    offset = HEADER.size
+    while offset < size:
+        if offset + RECORD.size > size:
+            raise UnsupportedFormatError(
+                "{} is corrupt.".format(file_path))
+        kind, length, payload_size = RECORD.unpack_from(data, offset)
+        start = offset + RECORD.size + (length + 7) // 8
+        offset = start + payload_size
+        if kind not in (VALUE, SUBTREE) or offset > size:
+            raise UnsupportedFormatError(
+                "{} is corrupt.".format(file_path))
+        path = ""
+        if length:
+            path = format(int.from_bytes(
+                data[start - (length + 7) // 8:start], "little"),
+                "0{}b".format(length))
+        records.append((kind, path, data[start:offset]))
+    return checksums, records
+
+
+def _follow(node, path, file_path):
+    """Returns the node found at the end of a path from node."""
+    for side in path:
+        node = node.left_child if side == "0" else node.right_child
+        if node is None:
+            raise InconsistentTraversalError(
+                "{} doesn't match the tree it is replayed on.".format(
+                    file_path))
+    return node
+
+
+def replay(node, file_path, from_links=None):
+    """Replays the records of a delta log over the root of a tree, given
+    the _from_links class method building its subtrees, by default that of
+    the class of node. The checksums of the log aren't checked. Returns the
+    number of records replayed."""
+    if from_links is None:
+        from_links = type(node)._from_links
+    _, records = read_log(file_path)
+    for kind, path, payload in records:
+        if kind == VALUE:
+            _follow(node, path, file_path).value = int.from_bytes(
+                payload, "little", signed=True)
+            continue
+        if not path:
+            raise UnsupportedFormatError(
+                "{} replaces the root of the tree.".format(file_path))
+        parent = _follow(node, path[:-1], file_path)
+        child = None
+        if payload:
+            values, codes = succinct.loads(payload, file_path)
+            left, right = succinct.links(codes)
+            child = from_links(values, left, right, 0)
+        if path[-1] == "0":
+            parent.left_child = child
+        else:
+            parent.right_child = child
+    return len(records)
+
+
+def compact(file_prefix, preorder=True, inorder=True, postorder=False,
+            format="text", memory_map=False):
+    """Merges the delta log of a dump into a fresh base, saved atomically
+    under the same prefix, traversals and format, and starts an empty log.
+    Returns the loaded tree."""
+    first, middle, last = base_files(
+        file_prefix, preorder, inorder, postorder, format)
+    if format == "text":
+        node = DeltaTreeNode.parse_files(
+            preorder=first, inorder=middle, postorder=last,
+            memory_map=memory_map, delta=log_path(file_prefix))
+    else:
+        node = DeltaTreeNode.parse_files(
+            format=format, filename=first, memory_map=memory_map,
+            delta=log_path(file_prefix))
+    node.save_to_disk(
+        file_prefix, preorder=preorder, inorder=inorder, postorder=postorder,
+        atomic=True, format=format)
+    return node
+
+
+class DeltaTreeNode(TrackedTreeNode):
+    """Node of a binary tree which can be saved incrementally, by appending
+    what changed since its last save to a delta log."""
+
+    __slots__ = ("_changes",)
+
+    def __init__(self, value, left=None, right=None):
+        """Initializer method.
+        Takes an integer value, a left node and a right node, which must be
+        nodes of the same class."""
+        self._changes = 0
+        super().__init__(value, left, right)
+
+    @classmethod
+    def _build(cls, values, left, right):
+        nodes = super()._build(values, left, right)
+        for node in nodes:
+            node._changes = 0
+        return nodes
+
+    @classmethod
+    def parse_files(cls, preorder=None, postorder=None, inorder=None,
+                    format="text", filename=None, memory_map=False,
+                    instrumentation=None, delta=None):
+        """Parses files and loads a tree from them. See
+        TreeNode.parse_files.
+
+        If delta is the path of a delta log, it is replayed over the tree,
+        unless it was saved along with another base."""
+        node = super().parse_files(
+            preorder=preorder, postorder=postorder, inorder=inorder,
+            format=format, filename=filename, memory_map=memory_map,
+            instrumentation=instrumentation)
+        if delta is None:
+            return node
+        with open(delta, "rb") as f:
+            checksums, _ = _read_header(f.read(HEADER.size), delta)
+        if format == "text":
+            files = (preorder, inorder, postorder)
+        else:
+            files = (filename, None, None)
+        if any(file_path is not None and _checksum(file_path) != checksum
+               for file_path, checksum in zip(files, checksums)):
+            warnings.warn(
+                "{} was saved along with another base, and is "
+                "ignored.".format(delta))
+            return node
+        replay(node, delta, from_links=cls._from_links)
+        for child in iter_preorder(node):
+            child._changes = 0
+        return node
+
+    def _saved(self, file_prefix, preorder=True, inorder=True,
+               postorder=False, atomic=False, format="text"):
+        """Starts an empty delta log, which replaces any former one, with
+        the tree just saved as its base."""
+        checksums = [
+            _checksum(file_path) for file_path in base_files(
+                file_prefix, preorder, inorder, postorder, format)]
+        with writing(log_path(file_prefix), atomic=atomic) as f:
+            f.write(HEADER.pack(MAGIC, VERSION, *checksums, HEADER.size))
+        for node in iter_preorder(self):
+            node._changes = 0
+
+    def save_delta(self, file_prefix):
+        """Appends what changed in the tree since its last save to the delta
+        log of the dump saved under a prefix, as one checkpoint synced to
+        disk. Only the paths leading to the changes are walked. Returns the
+        number of records appended."""
+        records = []
+        stack = [self]
+        pop, push = stack.pop, stack.append
+        while stack:
+            node = pop()
+            changes, node._changes = node._changes, 0
+            if changes & (CHANGED_VALUE | CHANGED_LEFT | CHANGED_RIGHT):
+                path = self._path(node)
+            if changes & CHANGED_VALUE:
+                records.append(
+                    _record(VALUE, path, _encode_value(node._value)))
+            for flag, child, side in ((CHANGED_RIGHT, node._right, "1"),
+                                      (CHANGED_LEFT, node._left, "0")):
+                if changes & flag:
+                    records.append(
+                        _record(SUBTREE, path + side, _encode_subtree(child)))
+                elif changes & CHANGED_BELOW and child is not None and (
+                        child._changes):
+                    push(child)
+        if not records:
+            return 0
+        file_path = log_path(file_prefix)
+        with open(file_path, "r+b") as f:
+            checksums, size = _read_header(f.read(HEADER.size), file_path)
+            f.seek(size)
+            for record in records:
+                f.write(record)
+            size = f.tell()
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, VERSION, *checksums, size))
+            f.flush()
+            os.fsync(f.fileno())
+        return len(records)
+
+    def _path(self, node):
+        """Returns the path from this node down to node, as a string of 0s
+        and 1s."""
+        sides = []
+        while node is not self:
+            parent = node._parent
+            sides.append("0" if parent._left is node else "1")
+            node = parent
+        return "".join(reversed(sides))
+
+    def _mark(self, change):
+        """Records a change of the node, and that its ancestors have changes
+        below them. The walk up stops at the first ancestor already marked.
+        """
+        self._changes |= change
+        node = self._parent
+        while node is not None and not node._changes & CHANGED_BELOW:
+            node._changes |= CHANGED_BELOW
+            node = node._parent
+
+    def _set_value(self, value):
+        super()._set_value(value)
+        self._mark(CHANGED_VALUE)
+
+    def _attached(self, node):
+        super()._attached(node)
+        self._mark(CHANGED_LEFT if self._left is node else CHANGED_RIGHT)
+
+    def _detach(self, node):
+        self._mark(CHANGED_LEFT if self._left is node else CHANGED_RIGHT)
+        super()._detach(node)
@@ -33,3 +33,19 @@ class InvalidChildError(Exception):
     That is apt for a later adaptation.
     """
     pass
+
+
+class InconsistentTraversalError(Exception):
+    """Exception raised when the traversals given to the load method of the
+    TreeNode class cannot describe the same tree, for instance when their
+    lengths differ or when a value of the preorder or postorder traversal
+    is missing from the inorder traversal."""
+    pass
+
+
+class UnsupportedFormatError(Exception):
+    """Exception raised when a serialization format isn't one of those
+    implemented, or when a file doesn't follow the format it claims to be
+    in, for instance because of a wrong magic number or an unknown
+    version."""
+    pass
@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Forest archives: many trees in a single file, each under its own key.
+
+Saving many small trees with save_to_disk costs 2 files per tree, and as
+many opens and closes to load them back. A forest archive instead holds
+every tree in one file, followed by an index of where each tree starts, so
+a single tree can be loaded without reading the others, and the whole
+forest can be loaded in one sequential read.
+
+A forest file starts with a 24 byte header:
+
+    magic       4 bytes     b"BTRF"
+    version     1 byte      1
+    reserved    3 bytes     0
+    count       8 bytes     the number of trees
+    index       8 bytes     the offset of the index
+
+followed by every tree, each stored as a succinct tree file (see the
+succinct module), so values can repeat. The index lists every tree, in the
+order they were written, as the length of its key, the offset and the size
+of the tree, as 4, 8 and 8 bytes, followed by the key in UTF-8. All the
+numbers are little-endian.
+"""
+import struct
+import sys
+from collections.abc import Mapping
+
+from binary_tree import succinct
+from binary_tree.array_tree import ArrayTree
+from binary_tree.binary_format import check_size, read_header, writing
+from binary_tree.exceptions import InvalidValueError, UnsupportedFormatError
+from binary_tree.tree_node import TreeNode
+
+MAGIC = b"BTRF"
+VERSION = 1
+HEADER = struct.Struct("<4sBxxxQQ")
+ENTRY = struct.Struct("<IQQ")
+
+
+def _encode(tree):
+    """Returns the succinct bytes of a TreeNode or ArrayTree tree."""
+    if isinstance(tree, ArrayTree):
+        values, codes = succinct.encode_arrays(
+            tree.values, tree.left, tree.right, tree.root)
+    else:
+        values, codes = succinct.encode(tree)
+    return succinct.dumps(values, codes)
+
+
+def _decode(data, tree_class, name):
+    """Returns the tree of tree_class held by the succinct bytes data."""
+    values, codes = succinct.loads(data, name)
+    left, right = succinct.links(codes)
+    return tree_class._from_links(values, left, right, 0)
+
+
+class ForestWriter:
+    """Writes trees one at a time into a forest archive.
+
+    The index and the header are written when the writer is closed. It is
+    best used as a context manager. If atomic is True, the archive is
+    written under a temporary name and only renamed into place once closed,
+    see binary_format.writing."""
+
+    def __init__(self, file_path, atomic=False):
+        self.file_path = file_path
+        self._writing = writing(file_path, atomic=atomic)
+        self._file = self._writing.__enter__()
+        self._file.write(bytes(HEADER.size))
+        self._offset = HEADER.size
+        self._index = {}
+
+    def add(self, key, tree):
+        """Writes a TreeNode or ArrayTree tree under a string key."""
+        if not isinstance(key, str):
+            raise InvalidValueError("The keys of a forest must be strings.")
+        if key in self._index:
+            raise InvalidValueError(
+                "{} is already in the forest.".format(key))
+        data = _encode(tree)
+        self._file.write(data)
+        self._index[key] = (self._offset, len(data))
+        self._offset += len(data)
+
+    def close(self):
+        """Writes the index and the header, and closes the archive."""
+        if self._file is None:
+            return
+        f, self._file = self._file, None
+        try:
+            for key, (offset, size) in self._index.items():
+                key = key.encode("utf-8")
+                f.write(ENTRY.pack(len(key), offset, size))
+                f.write(key)
+            f.seek(0)
+            f.write(HEADER.pack(
+                MAGIC, VERSION, len(self._index), self._offset))
+        except BaseException:
+            self._writing.__exit__(*sys.exc_info())
+            raise
+        self._writing.__exit__(None, None, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if exc_info[0] is None:
+            self.close()
+        elif self._file is not None:
+            self._file = None
+            self._writing.__exit__(*exc_info)
+
+
+def save_forest(file_path, trees, atomic=False):
+    """Saves trees into a forest archive. The trees are given as a mapping,
+    or as pairs, of string keys and TreeNode or ArrayTree trees."""
+    if isinstance(trees, Mapping):
+        trees = trees.items()
+    with ForestWriter(file_path, atomic=atomic) as writer:
+        for key, tree in trees:
+            writer.add(key, tree)
+
+
+class Forest(Mapping):
+    """Read-only mapping of the keys of a forest archive to its trees.
+
+    Only the header and the index are read when the archive is opened. Each
+    tree is read and loaded, as a tree of tree_class, when it is looked up.
+    The archive stays open until close is called, so it is best used as a
+    context manager."""
+
+    def __init__(self, file_path, tree_class=TreeNode):
+        self.file_path = file_path
+        self.tree_class = tree_class
+        self._file = open(file_path, "rb")
+        try:
+            self._index = self._read_index()
+        except BaseException:
+            self._file.close()
+            raise
+
+    def _read_index(self):
+        """Reads and validates the header, and returns the index as a
+        dictionary of the offset and size of each tree by key."""
+        f = self._file
+        count, index_offset = read_header(
+            f, HEADER, MAGIC, VERSION, "forest file", self.file_path)
+        f.seek(index_offset)
+        data = f.read()
+        index = {}
+        position = 0
+        for _ in range(count):
+            check_size(len(data), position + ENTRY.size, self.file_path)
+            length, offset, size = ENTRY.unpack_from(data, position)
+            position += ENTRY.size
+            key = data[position:position + length].decode("utf-8")
+            position += length
+            if offset + size > index_offset:
+                raise UnsupportedFormatError(
+                    "{} has a corrupt index.".format(self.file_path))
+            index[key] = (offset, size)
+        return index
+
+    def _name(self, key):
+        return "{}[{!r}]".format(self.file_path, key)
+
+    def __getitem__(self, key):
+        """Reads and returns the tree of a key, seeking straight to it."""
+        offset, size = self._index[key]
+        self._file.seek(offset)
+        return _decode(self._file.read(size), self.tree_class, self._name(key))
+
+    def __iter__(self):
+        """Iterates over the keys, in the order the trees were written."""
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def iter_trees(self):
+        """Yields every key and its tree, reading the archive once from start
+        to end."""
+        f = self._file
+        f.seek(HEADER.size)
+        position = HEADER.size
+        for key, (offset, size) in sorted(
+                self._index.items(), key=lambda item: item[1][0]):
+            if offset != position:
+                f.seek(offset)
+            data = f.read(size)
+            position = offset + size
+            yield key, _decode(data, self.tree_class, self._name(key))
+
+    def close(self):
+        """Closes the archive."""
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        return "<Forest [{}] [Trees: {}]>".format(self.file_path, len(self))
+
+
+def load_forest(file_path, tree_class=TreeNode):
+    """Loads every tree of a forest archive, in one sequential read. Returns
+    a dictionary of the trees, of tree_class, by key."""
+    with Forest(file_path, tree_class=tree_class) as forest:
+        return dict(forest.iter_trees())
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Structural equality and hashing of trees of TreeNode objects.
+
+Two trees are structurally equal when they have the same shape and the same
+value at every position, whether or not they share nodes. trees_equal
+walks both trees side by side and stops at the first difference, without
+building any traversal.
+
+structural_hash gives every subtree a Merkle digest: the BLAKE2b digest of
+its value and of the digests of its children. Equal trees always have the
+same digest, so it can be used to dedupe trees or as a cache key. Given a
+dictionary as cache, the digest of every subtree is kept in it, and a
+subtree already in the cache isn't walked again.
+
+matches_files tells whether the files of a dump hold a given tree, by
+streaming them against the traversals of the tree, so that an up to date
+dump doesn't have to be written again.
+"""
+import hashlib
+from itertools import starmap, zip_longest
+from operator import eq
+
+from binary_tree import binary_format, storage, succinct
+from binary_tree.exceptions import InsufficientTraversalInformation
+from binary_tree.text_format import iter_values
+from binary_tree.traversal import iter_postorder
+from binary_tree.tree_node import TreeNode
+
+DIGEST_SIZE = 16
+# The digest standing for a missing child.
+EMPTY = hashlib.blake2b(b"", digest_size=DIGEST_SIZE).digest()
+
+
+def trees_equal(first, second):
+    """Returns whether two trees have the same shape and values. The trees
+    are walked side by side, and the walk stops at the first difference."""
+    stack = [(first, second)]
+    pop, push = stack.pop, stack.append
+    while stack:
+        first, second = pop()
+        if first is second:
+            continue
+        if first is None or second is None or first.value != second.value:
+            return False
+        push((first.right_child, second.right_child))
+        push((first.left_child, second.left_child))
+    return True
+
+
+def _digest(value, left, right):
+    """Returns the digest of a node given its value and the digests of its
+    children. The child digests have a fixed size, so the encoding is
+    unambiguous."""
+    return hashlib.blake2b(
+        b"%d%s%s" % (value, left, right), digest_size=DIGEST_SIZE).digest()
+
+
+def structural_hash(node, cache=None):
+    """Returns the Merkle digest of the subtree of a node, as bytes.
+
+    The tree is walked in postorder with an explicit stack, keeping only the
+    digests of the subtrees still waiting for their parent. If cache is a
+    dictionary, the digest of every subtree is instead stored in it, keyed
+    by its root node, and the subtrees already in it are not walked again.
+    Nodes are keyed by identity, so the digests of a changed node and of
+    its ancestors have to be removed from the cache."""
+    if node is None:
+        return EMPTY
+    if cache is None:
+        digests = []
+        pop, push = digests.pop, digests.append
+        for current in iter_postorder(node):
+            right = pop() if current.right_child else EMPTY
+            left = pop() if current.left_child else EMPTY
+            push(_digest(current.value, left, right))
+        return digests[0]
+    # A node is pushed back under a None marker before its children, and its
+    # digest is computed once the marker resurfaces.
+    stack = [node]
+    pop, push = stack.pop, stack.append
+    while stack:
+        current = pop()
+        if current is None:
+            current = pop()
+            left, right = current.left_child, current.right_child
+            cache[current] = _digest(
+                current.value,
+                cache[left] if left else EMPTY,
+                cache[right] if right else EMPTY)
+            continue
+        if current in cache:
+            continue
+        push(current)
+        push(None)
+        if current.right_child:
+            push(current.right_child)
+        if current.left_child:
+            push(current.left_child)
+    return cache[node]
+
+
+def _same_values(first, second):
+    """Returns whether two iterables yield the same values, stopping at the
+    first difference."""
+    return all(starmap(eq, zip_longest(first, second, fillvalue=object())))
+
+
+def matches_files(node, preorder=None, postorder=None, inorder=None,
+                  format="text", filename=None):
+    """Returns whether the files of a dump, given like to
+    TreeNode.parse_files, hold the traversals of a tree.
+
+    Every traversal is streamed against the values read from the files,
+    and the comparison stops at the first difference. Missing files are
+    reported as an error, not as a mismatch."""
+    storage.check_format(format)
+    if format in ("binary", "succinct") and not filename:
+        raise InsufficientTraversalInformation(
+            "Specify the filename of the {} tree file.".format(format))
+    if format == "succinct":
+        values, codes = succinct.read(filename)
+        expected_values, expected_codes = succinct.encode(node)
+        return (codes == expected_codes
+                and _same_values(values, expected_values))
+    if format == "binary":
+        with binary_format.MappedTraversals(filename) as mapped:
+            return all(
+                _same_values(values, TreeNode.iter_traverse(node, mode))
+                for mode, values in (
+                    ("inorder", mapped.inorder),
+                    (mapped.order, mapped.traversal)))
+    paths = [
+        (mode, path) for mode, path in (
+            ("preorder", preorder),
+            ("inorder", inorder),
+            ("postorder", postorder))
+        if path]
+    if not paths:
+        raise InsufficientTraversalInformation(
+            "Specify at least one traversal file to compare.")
+    return all(
+        _same_values(iter_values(path), TreeNode.iter_traverse(node, mode))
+        for mode, path in paths)
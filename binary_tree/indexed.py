@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Trees indexed by value and augmented with subtree sizes.
+
+Finding a node by value, or the k-th node of the inorder traversal, of a
+tree of TreeNode objects means traversing it. An IndexedTreeNode also knows
+its parent and the size of its subtree, and all the nodes of a tree share
+a dictionary mapping every value to its node. That gives:
+
+    node.find(value)    the node holding a value, in constant time
+    node.kth(k)         the k-th node of the inorder traversal of a subtree,
+                        in time proportional to the depth of the tree
+    node.position       the position of a node in the inorder traversal of
+                        its tree, and node.rank(value) that of a value
+
+load and parse_files build such trees, computing every size and inorder
+position while building the nodes. The positions stay cached until the
+shape of the tree changes, and are then recomputed from the sizes when
+asked for. Reassigning a child or a value keeps everything consistent:
+the sizes of the ancestors are updated, and the nodes of a subtree that is
+moved from a tree to another move from an index to the other. Since the
+index is a dictionary, the values of a tree must be unique.
+"""
+from binary_tree.array_tree import ArrayTree
+from binary_tree.exceptions import InvalidValueError
+from binary_tree.tracking import TrackedTreeNode
+from binary_tree.traversal import iter_preorder
+from binary_tree.vectorized import order, subtree_sizes
+
+
+class _Index:
+    """The value index shared by the nodes of a tree. epoch is replaced by a
+    new object whenever the shape of the tree changes, which invalidates
+    the inorder positions cached in the nodes."""
+
+    __slots__ = ("nodes", "epoch")
+
+    def __init__(self):
+        self.nodes = {}
+        self.epoch = object()
+
+
+class IndexedTreeNode(TrackedTreeNode):
+    """Node of a binary tree indexed by value, which knows its parent and
+    the size of its subtree."""
+
+    __slots__ = ("_size", "_index", "_position", "_epoch")
+
+    def __init__(self, value, left=None, right=None):
+        """Initializer method.
+        Takes an integer value, a left node and a right node, which must be
+        IndexedTreeNode objects."""
+        self._size = 1
+        self._index = _Index()
+        self._position = 0
+        self._epoch = self._index.epoch
+        super().__init__(value, left, right)
+
+    @classmethod
+    def _from_links(cls, values, left, right, root):
+        """Creates the nodes of a whole tree at once, like
+        TreeNode._from_links, along with their index, sizes and inorder
+        positions. Returns the root node."""
+        nodes = cls._build(values, left, right)
+        index = _Index()
+        lookup = index.nodes
+        tree = ArrayTree(values, left, right, root)
+        for node, size in zip(nodes, subtree_sizes(tree)):
+            if node._value in lookup:
+                raise InvalidValueError(
+                    "{} is repeated, but the values of an indexed tree "
+                    "must be unique.".format(node._value))
+            lookup[node._value] = node
+            node._index = index
+            node._size = size
+        epoch = index.epoch
+        for position, link in enumerate(order(tree, "inorder")):
+            node = nodes[link]
+            node._position = position
+            node._epoch = epoch
+        return nodes[root]
+
+    @property
+    def size(self):
+        """The number of nodes of the subtree of the node."""
+        return self._size
+
+    @property
+    def position(self):
+        """The position of the node in the inorder traversal of its tree."""
+        if self._epoch is self._index.epoch:
+            return self._position
+        position = self._left._size if self._left else 0
+        node = self
+        while node._parent is not None:
+            parent = node._parent
+            if parent._right is node:
+                position += 1 + (parent._left._size if parent._left else 0)
+            node = parent
+        self._position = position
+        self._epoch = self._index.epoch
+        return position
+
+    def find(self, value):
+        """Returns the node of the tree holding value, or None."""
+        return self._index.nodes.get(value)
+
+    def rank(self, value):
+        """Returns the position of value in the inorder traversal of the
+        tree."""
+        node = self._index.nodes.get(value)
+        if node is None:
+            raise InvalidValueError("{} is not in the tree.".format(value))
+        return node.position
+
+    def kth(self, k):
+        """Returns the k-th node of the inorder traversal of the subtree of
+        the node, starting from 0."""
+        if not 0 <= k < self._size:
+            raise IndexError(
+                "{} is out of the range of a subtree of {} nodes.".format(
+                    k, self._size))
+        node = self
+        while True:
+            left = node._left._size if node._left else 0
+            if k < left:
+                node = node._left
+            elif k == left:
+                return node
+            else:
+                k -= left + 1
+                node = node._right
+
+    def _set_value(self, value):
+        nodes = self._index.nodes
+        if nodes.get(value, self) is not self:
+            raise InvalidValueError(
+                "{} is already in the tree.".format(value))
+        if nodes.get(self._value) is self:
+            del nodes[self._value]
+        self._value = value
+        nodes[value] = self
+
+    def _check_child(self, node, replaced):
+        """Raises InvalidValueError if a value of the subtree of node is
+        already in the tree, outside of the subtree being replaced."""
+        nodes = self._index.nodes
+        leaving = set()
+        if replaced is not None:
+            leaving = {child._value for child in iter_preorder(replaced)}
+        for child in iter_preorder(node):
+            if nodes.get(child._value, child) is not child and (
+                    child._value not in leaving):
+                raise InvalidValueError(
+                    "{} is already in the tree.".format(child._value))
+
+    def _attached(self, node):
+        """Moves the nodes of the subtree of node into the index of the
+        tree."""
+        index = self._index
+        for child in iter_preorder(node):
+            index.nodes[child._value] = child
+            child._index = index
+        for ancestor in self._ancestors():
+            ancestor._size += node._size
+        index.epoch = object()
+
+    def _detached(self, node):
+        """Moves the nodes of the subtree of node into an index of their
+        own."""
+        for ancestor in self._ancestors():
+            ancestor._size -= node._size
+        nodes = self._index.nodes
+        index = _Index()
+        for child in iter_preorder(node):
+            if nodes.get(child._value) is child:
+                del nodes[child._value]
+            index.nodes[child._value] = child
+            child._index = index
+        self._index.epoch = object()
+
+
+load = IndexedTreeNode.load
+parse_files = IndexedTreeNode.parse_files
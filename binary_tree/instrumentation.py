@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Opt-in instrumentation of saving, parsing and loading trees.
+
+Pass an Instrumentation object as the instrumentation argument of
+save_to_disk, parse_files or load. Every call then records an Operation,
+made of the phases it went through, such as traverse, format and write
+when saving, or parse, reconstruct and build when loading. Each phase
+records its duration, the number of nodes it handled, the bytes it read or
+wrote and, for the reconstruction, the depth of the tree, which bounds the
+explicit stacks used to walk it. The traverse phase of a save records the
+largest number of nodes the stack of its walk held instead.
+
+When no instrumentation is given, the operations use NULL_INSTRUMENTATION,
+whose operations and phases do nothing. It is entered a handful of times
+per operation, or once per batch of values, never once per node, so it
+costs next to nothing.
+"""
+import contextvars
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# The number of operations an Instrumentation keeps by default, when there is
+# no callback to hand them to.
+MAX_OPERATIONS = 10000
+
+
+class Phase:
+    """Measurements of one phase of an operation. A phase can be entered
+    several times, for instance once per batch, and accumulates its
+    duration."""
+
+    def __init__(self, name):
+        self.name = name
+        self.seconds = 0.0
+        self.nodes = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.max_depth = 0
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.seconds += time.perf_counter() - self._start
+
+    @property
+    def nodes_per_second(self):
+        """Returns the throughput of the phase in nodes per second."""
+        return self.nodes / self.seconds if self.seconds else 0.0
+
+    @property
+    def bytes_per_second(self):
+        """Returns the throughput of the phase in bytes per second."""
+        transferred = self.bytes_read + self.bytes_written
+        return transferred / self.seconds if self.seconds else 0.0
+
+    def as_dict(self):
+        """Returns the measurements as a dictionary."""
+        return {
+            "name": self.name,
+            "seconds": self.seconds,
+            "nodes": self.nodes,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "max_depth": self.max_depth,
+            "nodes_per_second": self.nodes_per_second,
+            "bytes_per_second": self.bytes_per_second,
+        }
+
+    def __repr__(self):
+        return "<Phase [{}] [{:.6f}s] [Nodes: {}]>".format(
+            self.name, self.seconds, self.nodes)
+
+
+class Operation:
+    """Measurements of one call of save_to_disk, parse_files or load."""
+
+    def __init__(self, name):
+        self.name = name
+        self.seconds = 0.0
+        self.phases = {}
+
+    def phase(self, name):
+        """Returns the phase of a name, creating it the first time."""
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.phases[name] = Phase(name)
+        return phase
+
+    def as_dict(self):
+        """Returns the measurements as a dictionary."""
+        return {
+            "name": self.name,
+            "seconds": self.seconds,
+            "phases": [phase.as_dict() for phase in self.phases.values()],
+        }
+
+    def __repr__(self):
+        return "<Operation [{}] [{:.6f}s] [Phases: {}]>".format(
+            self.name, self.seconds, ", ".join(self.phases))
+
+
+class Instrumentation:
+    """Collects the operations of the calls it is given to.
+
+    If a callback is given, it is called with every operation as soon as
+    it completes, which is where the measurements can be forwarded to a
+    metrics pipeline.
+
+    operations holds the last keep operations, so that a long running
+    process doesn't run out of memory. By default, none are kept when there
+    is a callback consuming them, and MAX_OPERATIONS otherwise."""
+
+    enabled = True
+
+    def __init__(self, callback=None, keep=None):
+        if keep is None:
+            keep = 0 if callback is not None else MAX_OPERATIONS
+        self.callback = callback
+        self.operations = deque(maxlen=keep)
+        # The running operation is kept per thread and per asyncio task.
+        self._current = contextvars.ContextVar("operation", default=None)
+
+    @contextmanager
+    def operation(self, name):
+        """Records an operation over the duration of the block. An operation
+        started while another one is running in the same thread or task,
+        such as the load done by parse_files, adds its phases to the running
+        one."""
+        current = self._current.get()
+        if current is not None:
+            yield current
+            return
+        operation = Operation(name)
+        self.operations.append(operation)
+        token = self._current.set(operation)
+        start = time.perf_counter()
+        try:
+            yield operation
+        finally:
+            operation.seconds = time.perf_counter() - start
+            self._current.reset(token)
+            if self.callback is not None:
+                self.callback(operation)
+
+    def report(self):
+        """Returns the measurements of every operation as dictionaries."""
+        return [operation.as_dict() for operation in self.operations]
+
+
+class _NullPhase:
+    """Phase that measures nothing. Its counters read as 0 and ignore
+    updates."""
+
+    __slots__ = ()
+    name = None
+    seconds = nodes = bytes_read = bytes_written = max_depth = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def __setattr__(self, name, value):
+        pass
+
+
+class _NullOperation:
+    """Operation that records nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def phase(self, name):
+        return NULL_PHASE
+
+
+class _NullInstrumentation:
+    """Instrumentation used when none is given, which records nothing."""
+
+    __slots__ = ()
+    enabled = False
+
+    def operation(self, name):
+        return NULL_OPERATION
+
+
+NULL_PHASE = _NullPhase()
+NULL_OPERATION = _NullOperation()
+NULL_INSTRUMENTATION = _NullInstrumentation()
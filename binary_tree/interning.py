@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Sharing of identical subtrees, in memory and on disk.
+
+Trees often repeat the same subtrees. intern_tree collapses structurally
+identical subtrees into a single shared node, turning the tree into a
+directed acyclic graph which traverses, saves and compares exactly like the
+original tree, in a fraction of the memory.
+
+Subtrees are hash-consed: every subtree is keyed by its value and by the
+shared nodes of its children, which is its structural hash with the hashes
+of the children already resolved to unique nodes. So the keys stay small,
+and two subtrees only ever share a node if they are identical.
+
+A DAG file stores every unique subtree once. It starts with a 16 byte
+header:
+
+    magic       4 bytes     b"BTRD"
+    version     1 byte      1
+    width       1 byte      4 or 8, the size in bytes of every value
+    link width  1 byte      4 or 8, the size in bytes of every link
+    reserved    1 byte      0
+    count       8 bytes     the number of unique subtrees
+
+followed by the values of the unique subtrees, then by the indices of
+their left children and then of their right children, -1 meaning that
+there is no child. The subtrees are stored children first, so every link
+points backwards and the root is the last subtree. All the numbers are
+little-endian.
+"""
+import struct
+import sys
+from array import array
+
+from binary_tree.binary_format import (
+    INT32_MAX, _typecode, pack_values, read_header, unpack_values, writing)
+from binary_tree.exceptions import (
+    InconsistentTraversalError, UnsupportedFormatError)
+from binary_tree.tree_node import TreeNode
+
+MAGIC = b"BTRD"
+VERSION = 1
+HEADER = struct.Struct("<4sBBBxQ")
+
+
+def intern_links(node):
+    """Returns the values and the left and right child links of the unique
+    subtrees of a tree, children first, so that the root is the last one.
+
+    The tree is walked in postorder with an explicit stack. A node that is
+    already shared, in a tree that is already a DAG, is only walked once."""
+    values = []
+    left = array("q")
+    right = array("q")
+    unique = {}
+    # The index of the unique subtree of every node walked so far.
+    indices = {}
+    # A node is pushed back under a None marker before its children, and is
+    # looked up once the marker resurfaces.
+    stack = [node]
+    pop, push = stack.pop, stack.append
+    while stack:
+        current = pop()
+        if current is None:
+            current = pop()
+            left_child = current.left_child
+            right_child = current.right_child
+            key = (current.value,
+                   indices[left_child] if left_child else -1,
+                   indices[right_child] if right_child else -1)
+            index = unique.get(key)
+            if index is None:
+                index = unique[key] = len(values)
+                values.append(key[0])
+                left.append(key[1])
+                right.append(key[2])
+            indices[current] = index
+            continue
+        if current in indices:
+            continue
+        push(current)
+        push(None)
+        if current.right_child:
+            push(current.right_child)
+        if current.left_child:
+            push(current.left_child)
+    return values, left, right
+
+
+def intern_tree(node):
+    """Returns the root of a copy of a tree in which identical subtrees are
+    shared nodes. The tree given is left untouched.
+
+    The shared nodes must not be modified in place, since every subtree
+    they stand for would change with them."""
+    values, left, right = intern_links(node)
+    return TreeNode._from_links(values, left, right, len(values) - 1)
+
+
+def unique_nodes(node):
+    """Returns the number of distinct node objects of a tree or DAG."""
+    seen = set()
+    stack = [node] if node else []
+    pop, push = stack.pop, stack.append
+    while stack:
+        current = pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        if current.right_child:
+            push(current.right_child)
+        if current.left_child:
+            push(current.left_child)
+    return len(seen)
+
+
+def expand_links(values, left, right, root):
+    """Returns the values and the left and right child links, in preorder,
+    of the tree a DAG stands for, in which every shared subtree is copied
+    wherever it appears."""
+    expanded_values = []
+    expanded_left = array("q")
+    expanded_right = array("q")
+    # Each index waiting on the stack comes with the links its copy has to
+    # be stored in, and the position of the copy of its parent.
+    stack = [(root, None, -1)] if len(values) else []
+    pop, push = stack.pop, stack.append
+    while stack:
+        index, links, parent = pop()
+        position = len(expanded_values)
+        expanded_values.append(values[index])
+        expanded_left.append(-1)
+        expanded_right.append(-1)
+        if links is not None:
+            links[parent] = position
+        if right[index] >= 0:
+            push((right[index], expanded_right, position))
+        if left[index] >= 0:
+            push((left[index], expanded_left, position))
+    return expanded_values, expanded_left, expanded_right
+
+
+def save_dag(node, file_path, atomic=False):
+    """Saves a tree into a DAG file, writing every unique subtree once.
+    See binary_format.writing for the meaning of atomic."""
+    values, left, right = intern_links(node)
+    width, values = pack_values(values)
+    link_width = 4 if len(values) <= INT32_MAX else 8
+    links = []
+    for child_links in (left, right):
+        child_links = array(_typecode(link_width), child_links)
+        if sys.byteorder == "big":
+            child_links.byteswap()
+        links.append(child_links)
+    with writing(file_path, atomic=atomic) as f:
+        f.write(HEADER.pack(MAGIC, VERSION, width, link_width, len(values)))
+        values.tofile(f)
+        for child_links in links:
+            child_links.tofile(f)
+
+
+def read_dag(file_path):
+    """Reads a DAG file. Returns the values and the left and right child
+    links of its unique subtrees, as arrays. The root is the last one."""
+    with open(file_path, "rb") as f:
+        width, link_width, count = read_header(
+            f, HEADER, MAGIC, VERSION, "DAG tree file", file_path)
+        if width not in (4, 8) or link_width not in (4, 8):
+            raise UnsupportedFormatError(
+                "{} has a corrupt header.".format(file_path))
+        values = unpack_values(f, width, count, file_path)
+        left = unpack_values(f, link_width, count, file_path)
+        right = unpack_values(f, link_width, count, file_path)
+    for links in (left, right):
+        if any(not -1 <= link < index for index, link in enumerate(links)):
+            raise InconsistentTraversalError(
+                "{} links a subtree to one that isn't stored before "
+                "it.".format(file_path))
+    return values, left, right
+
+
+def load_dag(file_path, expand=False, tree_class=TreeNode):
+    """Loads a tree of tree_class, TreeNode or ArrayTree, from a DAG file.
+
+    By default, the shared subtrees are loaded once and shared again, so
+    the tree takes as little memory as the file. If expand is True, they
+    are copied wherever they appear instead, as in the original tree."""
+    values, left, right = read_dag(file_path)
+    if not len(values):
+        raise InconsistentTraversalError(
+            "{} holds an empty tree.".format(file_path))
+    if expand:
+        values, left, right = expand_links(
+            values, left, right, len(values) - 1)
+        return tree_class._from_links(values, left, right, 0)
+    return tree_class._from_links(values, left, right, len(values) - 1)
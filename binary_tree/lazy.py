@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Lazy loading of trees from a seekable record file.
+
+parse_files builds every node of a tree before returning. A record file
+instead stores every node as a fixed size record holding its value and the
+indices of the records of its children, so any node can be read on its
+own. LazyTree maps such a file and hands out LazyTreeNode proxies, whose
+children are only read from the file when they are first accessed. Opening
+a tree only reads its header, whatever its size.
+
+The proxies read are kept in a cache of at most max_resident nodes, the
+least recently used ones being evicted first. Since a proxy only holds the
+indices of its children, never the child nodes themselves, the subtrees
+that aren't used anymore are freed, and trees much larger than memory can
+be walked.
+
+A record file starts with a 16 byte header:
+
+    magic       4 bytes     b"BTRL"
+    version     1 byte      1
+    reserved    3 bytes     0
+    count       8 bytes     the number of nodes
+
+followed by one 24 byte record per node, in preorder, so the root is the
+first one: its value and the indices of its left and right children, -1
+meaning that there is no child, as signed 8 byte integers. All the numbers
+are little-endian.
+"""
+import mmap
+import struct
+import sys
+from array import array
+from collections import OrderedDict
+
+from binary_tree.array_tree import ArrayTree
+from binary_tree.binary_format import check_size, read_header, writing
+from binary_tree.exceptions import InconsistentTraversalError
+from binary_tree.interning import expand_links
+from binary_tree.tree_node import TreeNode
+
+MAGIC = b"BTRL"
+VERSION = 1
+HEADER = struct.Struct("<4sBxxxQ")
+RECORD = struct.Struct("<qqq")
+BATCH_SIZE = 65536
+MAX_RESIDENT = 1 << 16
+
+
+def save_records(tree, file_path, atomic=False):
+    """Saves a TreeNode or ArrayTree tree into a record file. See
+    binary_format.writing for the meaning of atomic."""
+    if isinstance(tree, ArrayTree):
+        values, left, right = expand_links(
+            tree.values, tree.left, tree.right, tree.root)
+    else:
+        tree = ArrayTree.from_tree_node(tree)
+        values, left, right = tree.values, tree.left, tree.right
+    size = len(values)
+    with writing(file_path, atomic=atomic) as f:
+        f.write(HEADER.pack(MAGIC, VERSION, size))
+        # The three arrays are interleaved into records a batch at a time.
+        for start in range(0, size, BATCH_SIZE):
+            end = min(start + BATCH_SIZE, size)
+            records = array("q", bytes(RECORD.size * (end - start)))
+            records[0::3] = array("q", values[start:end])
+            records[1::3] = array("q", left[start:end])
+            records[2::3] = array("q", right[start:end])
+            if sys.byteorder == "big":
+                records.byteswap()
+            records.tofile(f)
+
+
+class LazyTreeNode(TreeNode):
+    """Node of a LazyTree, whose children are read from the record file the
+    first time they are accessed.
+
+    It can be used wherever a TreeNode is read, such as by traverse or
+    save_to_disk, but it cannot be modified: its value and children are
+    read-only properties."""
+
+    # The value, left_child and right_child slots of TreeNode are shadowed
+    # by the properties, and stay empty.
+    __slots__ = ("_tree", "_value", "_left", "_right")
+
+    @property
+    def value(self):
+        """The value of the node, as read from its record."""
+        return self._value
+
+    @property
+    def left_child(self):
+        """The left child node, read from the file if it isn't resident."""
+        if self._left < 0:
+            return None
+        return self._tree.node(self._left)
+
+    @property
+    def right_child(self):
+        """The right child node, read from the file if it isn't resident."""
+        if self._right < 0:
+            return None
+        return self._tree.node(self._right)
+
+
+class LazyTree:
+    """Tree read lazily from a record file.
+
+    The file is memory mapped, and only its header is read until nodes are
+    accessed. At most max_resident nodes are kept in the cache. The tree is
+    only valid until close is called, so it is best used as a context
+    manager."""
+
+    def __init__(self, file_path, max_resident=MAX_RESIDENT):
+        self.file_path = file_path
+        self.max_resident = max_resident
+        self._resident = OrderedDict()
+        self._map = None
+        self._file = open(file_path, "rb")
+        try:
+            self._count, = read_header(
+                self._file, HEADER, MAGIC, VERSION, "record file", file_path)
+            self._file.seek(0, 2)
+            check_size(
+                self._file.tell(), HEADER.size + RECORD.size * self._count,
+                file_path)
+            self._map = mmap.mmap(
+                self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self.close()
+            raise
+
+    def __len__(self):
+        """Returns the number of nodes of the tree."""
+        return self._count
+
+    @property
+    def root(self):
+        """The root node of the tree, or None if the tree is empty."""
+        return self.node(0) if self._count else None
+
+    @property
+    def resident(self):
+        """The number of nodes currently kept in the cache."""
+        return len(self._resident)
+
+    def node(self, index):
+        """Returns the node of a record, reading it from the file unless it
+        is resident. An evicted node is read again as a new proxy."""
+        resident = self._resident
+        node = resident.get(index)
+        if node is not None:
+            resident.move_to_end(index)
+            return node
+        value, left, right = RECORD.unpack_from(
+            self._map, HEADER.size + RECORD.size * index)
+        # Children are stored after their parent in preorder, so the links
+        # can never form a cycle.
+        if not (-1 <= left < self._count and -1 <= right < self._count
+                and (left < 0 or left > index)
+                and (right < 0 or right > index)):
+            raise InconsistentTraversalError(
+                "{} has a corrupt record at {}.".format(self.file_path, index))
+        node = object.__new__(LazyTreeNode)
+        node._value = value
+        node._tree = self
+        node._left = left
+        node._right = right
+        resident[index] = node
+        if len(resident) > self.max_resident:
+            resident.popitem(last=False)
+        return node
+
+    def close(self):
+        """Unmaps and closes the file, and drops the resident nodes."""
+        self._resident.clear()
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        return "<LazyTree [{}] [Nodes: {}] [Resident: {}]>".format(
+            self.file_path, len(self), self.resident)
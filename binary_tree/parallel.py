@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Parallel reconstruction of large trees in a pool of processes.
+
+Once the position of a root in the inorder traversal is known, its left and
+right subtrees can be rebuilt independently. load splits the tree this way
+until its subtrees are smaller than a threshold, and rebuilds them in a
+process pool.
+
+The traversals and the child links being computed are kept in shared
+memory, so nothing but the bounds of every subtree is ever pickled: the
+workers read the traversals and write the links of their subtree in place.
+The result is an ArrayTree, whose arrays are copied out of shared memory in
+bulk, or a tree of TreeNode objects built from it.
+"""
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from binary_tree.array_tree import ArrayTree
+from binary_tree.binary_format import _as_int64
+from binary_tree.exceptions import InconsistentTraversalError
+from binary_tree.reconstruction import (
+    _check_lengths, check_sufficient, postorder_links, preorder_links)
+
+# Subtrees are split until there are about this many tasks per worker, so
+# that the workers stay busy whatever the shape of the tree.
+TASKS_PER_WORKER = 8
+MIN_THRESHOLD = 4096
+# The split stops once it has scanned this many times the size of the tree
+# in search of roots, which only happens with very unbalanced trees.
+SCAN_BUDGET = 8
+
+# The shared memory a worker process is attached to.
+_worker = {}
+
+
+def _attach(names, size, order):
+    """Attaches a worker process to the shared traversals and links."""
+    blocks = [shared_memory.SharedMemory(name=name) for name in names]
+    _worker["blocks"] = blocks
+    _worker["views"] = [
+        block.buf.cast("q")[:size] for block in blocks]
+    _worker["links"] = preorder_links if order == "preorder" else (
+        postorder_links)
+
+
+def _shift(links, offset):
+    """Returns links within a subtree as links within the whole tree."""
+    return array("q", [
+        link + offset if link >= 0 else -1 for link in links])
+
+
+def _rebuild(task):
+    """Rebuilds the links of the subtree whose traversal starts at start and
+    whose inorder starts at inorder_start, in a worker process."""
+    start, inorder_start, size = task
+    traversal, inorder, left, right = _worker["views"]
+    sub_left, sub_right = _worker["links"](
+        traversal[start:start + size],
+        inorder[inorder_start:inorder_start + size])
+    left[start:start + size] = _shift(sub_left, start)
+    right[start:start + size] = _shift(sub_right, start)
+
+
+def split(traversal, inorder, left, right, order, threshold):
+    """Splits a tree into subtrees of at most threshold nodes, when possible.
+    Stores the links of the nodes above them into left and right, and
+    returns the subtrees as the start of their traversal, the start of
+    their inorder and their size, largest first."""
+    preorder = order == "preorder"
+    tasks = []
+    budget = SCAN_BUDGET * len(traversal)
+    pending = [(0, 0, len(traversal))]
+    pop, push = pending.pop, pending.append
+    while pending:
+        start, inorder_start, size = pop()
+        if size <= threshold or budget <= 0:
+            tasks.append((start, inorder_start, size))
+            continue
+        root = start if preorder else start + size - 1
+        try:
+            position = inorder.index(
+                traversal[root], inorder_start, inorder_start + size)
+        except ValueError:
+            raise InconsistentTraversalError(
+                "{} is not where it should be in the inorder "
+                "traversal.".format(traversal[root]))
+        left_size = position - inorder_start
+        right_size = size - left_size - 1
+        budget -= left_size + 1
+        left_start = start + 1 if preorder else start
+        right_start = left_start + left_size
+        if left_size:
+            left[root] = left_start if preorder else (
+                left_start + left_size - 1)
+            push((left_start, inorder_start, left_size))
+        if right_size:
+            right[root] = right_start if preorder else (
+                right_start + right_size - 1)
+            push((right_start, position + 1, right_size))
+    tasks.sort(key=lambda task: task[2], reverse=True)
+    return tasks
+
+
+def load(preorder=None, postorder=None, inorder=None, tree_class=ArrayTree,
+         workers=None, threshold=None):
+    """Loads a tree of tree_class, ArrayTree or TreeNode, given one of the
+    preorder and postorder, along with the inorder, with several processes.
+    See TreeNode.load.
+
+    workers is the number of processes, the number of CPUs by default, and
+    threshold the size of the subtrees rebuilt by a single task. With a
+    single worker, or a tree no larger than threshold, the tree is loaded
+    in the current process."""
+    check_sufficient(preorder, postorder, inorder)
+    order, traversal = ("preorder", preorder) if preorder else (
+        "postorder", postorder)
+    _check_lengths(traversal, inorder)
+    size = len(traversal)
+    workers = workers or os.cpu_count() or 1
+    if threshold is None:
+        threshold = max(size // (workers * TASKS_PER_WORKER), MIN_THRESHOLD)
+    if workers == 1 or size <= threshold:
+        return tree_class.load(inorder=inorder, **{order: traversal})
+    traversal = _as_int64(traversal)
+    inorder = _as_int64(inorder)
+    blocks = []
+    try:
+        for _ in range(4):
+            blocks.append(shared_memory.SharedMemory(
+                create=True, size=8 * size))
+        views = [block.buf.cast("q")[:size] for block in blocks]
+        try:
+            views[0][:] = traversal
+            views[1][:] = inorder
+            views[2][:] = views[3][:] = array("q", [-1]) * size
+            tasks = split(
+                traversal, inorder, views[2], views[3], order, threshold)
+            with ProcessPoolExecutor(
+                    max_workers=workers, initializer=_attach,
+                    initargs=([block.name for block in blocks], size,
+                              order)) as pool:
+                for _ in pool.map(_rebuild, tasks):
+                    pass
+            left = array("q")
+            left.frombytes(views[2].cast("B"))
+            right = array("q")
+            right.frombytes(views[3].cast("B"))
+        finally:
+            for view in views:
+                view.release()
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+    root = 0 if order == "preorder" else size - 1
+    return tree_class._from_links(traversal, left, right, root)
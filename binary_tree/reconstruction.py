@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Reconstruction engine for binary trees.
+
+Given the inorder traversal and one of the preorder or postorder
+traversals, these functions work out the shape of the tree. The shape is
+returned as two arrays of child links, indexed by the position of each
+node in the preorder (or postorder) traversal. A link of -1 means that
+there is no child.
+
+The inorder positions are looked up in a dictionary that is built once,
+and the traversals are walked once by index, so they are never sliced,
+filtered or copied.
+"""
+from array import array
+from itertools import repeat
+
+from binary_tree.exceptions import (
+    InconsistentTraversalError, InsufficientTraversalInformation)
+from binary_tree.instrumentation import NULL_OPERATION
+
+
+def inorder_positions(inorder):
+    """Returns a dictionary mapping each value of the inorder traversal
+    to its position. If a value repeats, its first position is kept."""
+    size = len(inorder)
+    return dict(zip(reversed(inorder), range(size - 1, -1, -1)))
+
+
+def _check_lengths(order, inorder):
+    """Raises an error if the two traversals aren't of the same length."""
+    if len(order) != len(inorder):
+        raise InconsistentTraversalError(
+            "The traversals have {} and {} values. They cannot describe "
+            "the same tree.".format(len(order), len(inorder)))
+
+
+def _misplaced(value):
+    """Raises an error for a value that cannot be placed in the tree."""
+    raise InconsistentTraversalError(
+        "{} is not where it should be in the inorder "
+        "traversal.".format(value))
+
+
+def preorder_links(preorder, inorder):
+    """Returns the left and right child links of a tree, given its preorder
+    and inorder traversals. The links are indexed by preorder position.
+
+    The preorder is walked once. The ancestors that can still receive a
+    right child are kept on an explicit stack, together with their inorder
+    positions, so trees of any depth can be linked without recursion."""
+    _check_lengths(preorder, inorder)
+    size = len(preorder)
+    positions = inorder_positions(inorder)
+    left = array("q", [-1]) * size
+    right = array("q", [-1]) * size
+    if size == 0:
+        return left, right
+    # The inorder position of every node, looked up as the preorder is
+    # walked.
+    node_positions = map(positions.get, preorder, repeat(-1))
+    root_position = next(node_positions)
+    if root_position < 0:
+        _misplaced(preorder[0])
+    # The stack starts with a sentinel that lies to the right of every node,
+    # so it is never popped. The top of the stack is also kept in locals.
+    nodes = [-1, 0]
+    stack_positions = [size, root_position]
+    push_node, pop_node = nodes.append, nodes.pop
+    push_position, pop_position = (
+        stack_positions.append, stack_positions.pop)
+    top, top_position = 0, root_position
+    # Every node that comes after a right child must lie to the right of
+    # that child's parent in the inorder traversal.
+    lower = -1
+    for node, position in enumerate(node_positions, 1):
+        if position <= lower:
+            _misplaced(preorder[node])
+        if position < top_position:
+            left[top] = node
+        else:
+            # The parent is the last ancestor to the left of this node.
+            while top_position < position:
+                lower = pop_position()
+                parent = pop_node()
+                top_position = stack_positions[-1]
+            if top_position == position:
+                _misplaced(preorder[node])
+            right[parent] = node
+        push_node(node)
+        push_position(position)
+        top, top_position = node, position
+    return left, right
+
+
+def postorder_links(postorder, inorder):
+    """Returns the left and right child links of a tree, given its postorder
+    and inorder traversals. The links are indexed by postorder position.
+
+    The postorder is walked once from the end, which visits the nodes in
+    root, right, left order. The ancestors that can still receive a left
+    child are kept on an explicit stack, together with their inorder
+    positions, so trees of any depth can be linked without recursion."""
+    _check_lengths(postorder, inorder)
+    size = len(postorder)
+    positions = inorder_positions(inorder)
+    left = array("q", [-1]) * size
+    right = array("q", [-1]) * size
+    if size == 0:
+        return left, right
+    # The inorder position of every node, looked up as the postorder is
+    # walked from the end.
+    node_positions = map(positions.get, reversed(postorder), repeat(-1))
+    root_position = next(node_positions)
+    if root_position < 0:
+        _misplaced(postorder[-1])
+    # The stack starts with a sentinel that lies to the left of every node,
+    # so it is never popped. The top of the stack is also kept in locals.
+    nodes = [-1, size - 1]
+    stack_positions = [-1, root_position]
+    push_node, pop_node = nodes.append, nodes.pop
+    push_position, pop_position = (
+        stack_positions.append, stack_positions.pop)
+    top, top_position = size - 1, root_position
+    # Every node that comes after a left child must lie to the left of
+    # that child's parent in the inorder traversal.
+    upper = size
+    for node, position in zip(range(size - 2, -1, -1), node_positions):
+        if position < 0 or position >= upper:
+            _misplaced(postorder[node])
+        if position > top_position:
+            right[top] = node
+        else:
+            # The parent is the last ancestor to the right of this node.
+            while top_position > position:
+                upper = pop_position()
+                parent = pop_node()
+                top_position = stack_positions[-1]
+            if top_position == position:
+                _misplaced(postorder[node])
+            left[parent] = node
+        push_node(node)
+        push_position(position)
+        top, top_position = node, position
+    return left, right
+
+
+def depth(left, right, root):
+    """Returns the number of levels of a tree given its child links, which
+    is also the deepest the explicit stacks walking it can grow."""
+    if not len(left):
+        return 0
+    deepest = 0
+    stack = [(root, 1)]
+    pop, push = stack.pop, stack.append
+    while stack:
+        index, level = pop()
+        if level > deepest:
+            deepest = level
+        if left[index] >= 0:
+            push((left[index], level + 1))
+        if right[index] >= 0:
+            push((right[index], level + 1))
+    return deepest
+
+
+def check_sufficient(preorder=None, postorder=None, inorder=None):
+    """Raises InsufficientTraversalInformation unless the inorder traversal
+    is given, along with the preorder or the postorder one."""
+    if not inorder or not (preorder or postorder):
+        raise InsufficientTraversalInformation(
+            "Specify at least 2 of the three modes to load a "
+            "unique Binary Tree.")
+
+
+def reconstruct(preorder=None, postorder=None, inorder=None,
+                operation=NULL_OPERATION):
+    """Works out the shape of a tree from its inorder and its preorder or
+    postorder traversals, preferring the preorder. Returns the traversal
+    the links are indexed by, the left and right links and the index of the
+    root.
+
+    The time spent is recorded into the reconstruct phase of operation, with
+    the depth of the tree when the operation is instrumented."""
+    with operation.phase("reconstruct") as phase:
+        if preorder and inorder:
+            traversal, root = preorder, 0
+            left, right = preorder_links(preorder, inorder)
+        else:
+            traversal, root = postorder, len(postorder) - 1
+            left, right = postorder_links(postorder, inorder)
+    phase.nodes = len(traversal)
+    if operation is not NULL_OPERATION:
+        phase.max_depth = depth(left, right, root)
+    return traversal, left, right, root
@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Publishing of trees to other processes through shared memory.
+
+Every process calling parse_files on the same dump parses it again and
+keeps a private copy of the tree. Instead, one process can publish the tree
+once, in a flat layout holding the arrays of an ArrayTree, into a block of
+shared memory or a file. The other processes attach to it, and get an
+ArrayTree whose arrays are read-only memoryviews over the shared pages:
+nothing is parsed or copied, whatever the size of the tree, and the memory
+is the same however many processes attach to it.
+
+The layout only holds indices, never addresses, so it can be mapped at any
+address. It starts with a 24 byte header:
+
+    magic       4 bytes     b"BTRA"
+    version     1 byte      1
+    reserved    3 bytes     0
+    count       8 bytes     the number of nodes
+    root        8 bytes     the index of the root
+
+followed by the values, the left child links and the right child links of
+the nodes, -1 meaning that there is no child, as arrays of signed 8 byte
+integers. All the numbers are little-endian. On big-endian hosts the arrays
+have to be byte swapped, so they are copied on attach.
+"""
+import mmap
+import os
+import struct
+import sys
+from array import array
+from multiprocessing import resource_tracker, shared_memory
+
+from binary_tree.array_tree import ArrayTree
+from binary_tree.binary_format import check_size, unpack_header, writing
+from binary_tree.exceptions import UnsupportedFormatError
+
+MAGIC = b"BTRA"
+VERSION = 1
+HEADER = struct.Struct("<4sBxxxQQ")
+
+
+def _as_array_tree(tree):
+    """Returns a TreeNode or ArrayTree tree as an ArrayTree."""
+    if isinstance(tree, ArrayTree):
+        return tree
+    return ArrayTree.from_tree_node(tree)
+
+
+def _arrays(tree):
+    """Yields the values, left and right arrays of an ArrayTree, as
+    little-endian arrays of 64 bit integers."""
+    for values in (tree.values, tree.left, tree.right):
+        if not isinstance(values, array) or values.typecode != "q" or (
+                sys.byteorder == "big"):
+            values = array("q", values)
+            if sys.byteorder == "big":
+                values.byteswap()
+        yield values
+
+
+def layout_size(count):
+    """Returns the number of bytes of the layout of a tree of count nodes."""
+    return HEADER.size + 3 * 8 * count
+
+
+def publish(tree, name=None):
+    """Publishes a TreeNode or ArrayTree tree into a new block of shared
+    memory, under name or a random name. Returns the SharedTree of the
+    block, whose name the other processes attach to. The block lives until
+    the SharedTree is unlinked."""
+    tree = _as_array_tree(tree)
+    block = shared_memory.SharedMemory(
+        name=name, create=True, size=layout_size(len(tree)))
+    try:
+        buffer = block.buf
+        HEADER.pack_into(buffer, 0, MAGIC, VERSION, len(tree), tree.root)
+        offset = HEADER.size
+        for values in _arrays(tree):
+            size = 8 * len(values)
+            buffer[offset:offset + size] = memoryview(values).cast("B")
+            offset += size
+        del buffer
+        return SharedTree(block, block.name)
+    except BaseException:
+        block.close()
+        block.unlink()
+        raise
+
+
+def attach(name):
+    """Attaches to a tree published in shared memory under name. Returns its
+    SharedTree, whose tree is read-only."""
+    try:
+        block = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13, attaching to a block registers it with the
+        # resource tracker, which unlinks it once the process exits.
+        block = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(block._name, "shared_memory")
+    return SharedTree(block, name)
+
+
+def publish_file(tree, file_path, atomic=False):
+    """Publishes a TreeNode or ArrayTree tree into a file, which processes
+    attach to with attach_file. See binary_format.writing for the meaning
+    of atomic."""
+    tree = _as_array_tree(tree)
+    with writing(file_path, atomic=atomic) as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(tree), tree.root))
+        for values in _arrays(tree):
+            values.tofile(f)
+
+
+def attach_file(file_path):
+    """Attaches to a tree published into a file, by memory mapping it.
+    Returns its SharedTree, whose tree is read-only."""
+    with open(file_path, "rb") as f:
+        if not os.fstat(f.fileno()).st_size:
+            raise UnsupportedFormatError(
+                "{} is not a shared tree file.".format(file_path))
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return SharedTree(mapped, file_path)
+
+
+class SharedTree:
+    """A tree published in, or attached from, shared memory or a file.
+
+    tree is an ArrayTree over the shared pages, which is only valid until
+    close is called. It is best used as a context manager. A block of shared
+    memory also has to be unlinked once it isn't needed anymore, usually by
+    the process that published it."""
+
+    def __init__(self, source, name):
+        """Reads the layout of a tree from a SharedMemory block or an mmap
+        object."""
+        self.name = name
+        self._source = source
+        self._block = None
+        self._views = []
+        try:
+            if isinstance(source, shared_memory.SharedMemory):
+                self._block = source
+                data = source.buf.toreadonly()
+            else:
+                data = memoryview(source)
+            self._views.append(data)
+            count, root = unpack_header(
+                data, HEADER, MAGIC, VERSION, "shared tree", name)
+            check_size(len(data), layout_size(count), name)
+            values, left, right = (
+                self._cast(data, HEADER.size + 8 * count * part, count)
+                for part in range(3))
+            self.tree = ArrayTree(values, left, right, root)
+        except BaseException:
+            self.close()
+            raise
+
+    def _cast(self, data, offset, count):
+        """Returns the count integers found at an offset of the layout."""
+        view = data[offset:offset + 8 * count]
+        self._views.append(view)
+        if sys.byteorder == "big":
+            values = array("q", view.tobytes())
+            values.byteswap()
+            return values
+        values = view.cast("q")
+        self._views.append(values)
+        return values
+
+    def close(self):
+        """Releases the views of the tree, and detaches from the shared
+        memory or the file."""
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self.tree = None
+        if self._source is not None:
+            self._source.close()
+            self._source = None
+
+    def unlink(self):
+        """Closes the tree and destroys its block of shared memory, once
+        every process has detached from it. It is usually called by the
+        process that published the tree. A tree attached from a file is
+        only closed."""
+        self.close()
+        block, self._block = self._block, None
+        if block is not None:
+            # The block may have been unregistered from the resource tracker
+            # by an attached process sharing it, and unlink unregisters it
+            # again.
+            resource_tracker.register(block._name, "shared_memory")
+            block.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        """Returns the number of nodes of the tree."""
+        return len(self.tree)
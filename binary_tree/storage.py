@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Saving and parsing of the traversal files, shared by the tree classes.
+
+Both functions work with any tree class: saving only needs a function that
+walks the tree and yields batches of its traversals, like
+traversal.iter_batches, recording the depth of its walk into the traverse
+phase it is given, and parsing only needs the load function of the
+class. The succinct format also needs a function returning the preorder
+values and shape codes of the tree, and a function building the tree from
+its values and child links, like TreeNode._from_links.
+"""
+import os
+import warnings
+
+from binary_tree import binary_format, succinct
+from binary_tree.exceptions import (
+    InsufficientTraversalInformation, UnsupportedFormatError)
+from binary_tree.instrumentation import NULL_INSTRUMENTATION
+from binary_tree.reconstruction import check_sufficient, depth
+from binary_tree.text_format import read_values, write_batches
+
+FORMATS = ("text", "binary", "succinct")
+
+
+def check_format(format):
+    """Raises an error if a serialization format isn't implemented."""
+    if format not in FORMATS:
+        raise UnsupportedFormatError(
+            "{} is not a serialization format. Choose from {}.".format(
+                format, ", ".join(FORMATS)))
+
+
+def save_to_disk(iter_batches, file_prefix, preorder=True, inorder=True,
+                 postorder=False, atomic=False, format="text",
+                 encode_succinct=None, instrumentation=None):
+    """Saves the traversals of a tree, walked by iter_batches, to disk.
+    See TreeNode.save_to_disk for the meaning of the other arguments."""
+    check_format(format)
+    if instrumentation is None:
+        instrumentation = NULL_INSTRUMENTATION
+    with instrumentation.operation("save_to_disk") as operation:
+        _save(iter_batches, file_prefix, preorder, inorder, postorder,
+              atomic, format, encode_succinct, operation)
+
+
+def _save(iter_batches, file_prefix, preorder, inorder, postorder, atomic,
+          format, encode_succinct, operation):
+    """Saves the traversals of a tree in a format, recording the phases of
+    the save into operation."""
+    if format == "succinct":
+        with operation.phase("encode") as encode:
+            values, codes = encode_succinct()
+        with operation.phase("write") as write:
+            write.bytes_written += succinct.write(
+                "{}.succinct".format(file_prefix), values, codes,
+                atomic=atomic)
+        encode.nodes = write.nodes = len(values)
+        return
+    if format == "binary":
+        if not (inorder and (preorder or postorder)):
+            raise InsufficientTraversalInformation(
+                "The binary format holds the inorder traversal and one "
+                "of the preorder and postorder traversals.")
+        order = "preorder" if preorder else "postorder"
+        binary_format.write_batches(
+            iter_batches(
+                preorder=order == "preorder", inorder=True,
+                postorder=order == "postorder",
+                phase=operation.phase("traverse")),
+            "{}.tree".format(file_prefix), order=order, atomic=atomic,
+            operation=operation)
+        return
+    modes = text_modes(preorder, inorder, postorder)
+    write_batches(
+        iter_batches(phase=operation.phase("traverse"), **modes),
+        file_prefix, atomic=atomic,
+        operation=operation, **modes)
+
+
+def text_modes(preorder, inorder, postorder):
+    """Returns which traversals to save in the text format, keyed by mode.
+    Warns if they aren't enough to reassemble the tree."""
+    if not inorder:
+        warnings.warn("You have saved insufficient information "
+        "regarding the tree to disk. You will need the inorder "
+        "traversal information to reassemble the tree.")
+    if not (preorder or postorder):
+        warnings.warn("You have saved insufficient information "
+        "regarding the tree to disk. You need at least one of the "
+        "preorder and postorder traversals.")
+    return {
+        "preorder": bool(preorder),
+        "inorder": bool(inorder),
+        "postorder": bool(postorder and not preorder),
+    }
+
+
+def parse_files(load, preorder=None, postorder=None, inorder=None,
+                format="text", filename=None, memory_map=False,
+                from_links=None, instrumentation=None):
+    """Parses traversal files and loads a tree from them with load. See
+    TreeNode.parse_files for the meaning of the other arguments."""
+    check_format(format)
+    if instrumentation is None:
+        instrumentation = NULL_INSTRUMENTATION
+    with instrumentation.operation("parse_files") as operation:
+        return _parse(
+            load, preorder, postorder, inorder, format, filename,
+            memory_map, from_links, instrumentation, operation)
+
+
+def _parse(load, preorder, postorder, inorder, format, filename, memory_map,
+           from_links, instrumentation, operation):
+    """Parses traversal files in a format and loads a tree from them,
+    recording the phases of the parse into operation."""
+    if format == "succinct":
+        if not filename:
+            raise InsufficientTraversalInformation(
+                "Specify the filename of the succinct tree file.")
+        with operation.phase("read") as read:
+            values, codes = succinct.read(filename)
+        read.nodes = len(values)
+        if instrumentation.enabled:
+            read.bytes_read = os.path.getsize(filename)
+        with operation.phase("reconstruct") as reconstruct:
+            left, right = succinct.links(codes)
+        reconstruct.nodes = len(values)
+        if instrumentation.enabled:
+            reconstruct.max_depth = depth(left, right, 0)
+        with operation.phase("build") as build:
+            tree = from_links(values, left, right, 0)
+        build.nodes = len(values)
+        return tree
+    if format == "binary":
+        if not filename:
+            raise InsufficientTraversalInformation(
+                "Specify the filename of the binary tree file.")
+        if memory_map:
+            with operation.phase("map") as read:
+                mapped = binary_format.MappedTraversals(filename)
+            read.nodes = len(mapped)
+            with mapped:
+                return load(
+                    inorder=mapped.inorder,
+                    instrumentation=instrumentation,
+                    **{mapped.order: mapped.traversal})
+        with operation.phase("read") as read:
+            order, traversal, inorder_traversal = (
+                binary_format.read_traversals(filename))
+        read.nodes = len(traversal)
+        if instrumentation.enabled:
+            read.bytes_read = os.path.getsize(filename)
+        return load(
+            inorder=inorder_traversal, instrumentation=instrumentation,
+            **{order: traversal})
+    check_sufficient(preorder, postorder, inorder)
+    order, path = ("preorder", preorder) if preorder else (
+        "postorder", postorder)
+    with operation.phase("parse") as parse:
+        traversals = {
+            order: read_values(path),
+            "inorder": read_values(inorder),
+        }
+    parse.nodes = len(traversals["inorder"])
+    if instrumentation.enabled:
+        parse.bytes_read = os.path.getsize(path) + os.path.getsize(inorder)
+    return load(instrumentation=instrumentation, **traversals)
@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Succinct single traversal encoding of binary trees.
+
+A tree is encoded as its preorder traversal, plus 2 bits per node telling
+whether the node has a left child and whether it has a right child. That
+is enough to rebuild the tree in a single pass over the preorder, without
+the inorder traversal and without looking any value up, so it halves the
+size of a dump and works with repeated values.
+
+The shape codes of the nodes are 1 for a left child, 2 for a right child,
+3 for both and 0 for a leaf. They are packed 4 to a byte, the first node in
+the 2 lowest bits.
+
+A succinct file starts with a 16 byte header:
+
+    magic       4 bytes     b"BTRS"
+    version     1 byte      1
+    width       1 byte      4 or 8, the size in bytes of every value
+    reserved    2 bytes     0
+    count       8 bytes     the number of nodes
+
+followed by the packed shape codes, padded with zeros to a multiple of 8
+bytes, and by the preorder traversal as count signed integers of width
+bytes. All the numbers are little-endian.
+"""
+import struct
+import sys
+from array import array
+
+from binary_tree.binary_format import (
+    _typecode, check_size, pack_values, unpack_header, unpack_values,
+    writing)
+from binary_tree.exceptions import (
+    InconsistentTraversalError, UnsupportedFormatError)
+
+MAGIC = b"BTRS"
+VERSION = 1
+HEADER = struct.Struct("<4sBBxxQ")
+
+LEFT, RIGHT = 1, 2
+
+# Every packed byte, unpacked into the 4 shape codes it holds, and back.
+UNPACKED = [
+    bytes((byte & 3, byte >> 2 & 3, byte >> 4 & 3, byte >> 6))
+    for byte in range(256)]
+PACKED = {codes: byte for byte, codes in enumerate(UNPACKED)}
+
+
+def pack_shape(codes):
+    """Packs a sequence of shape codes, one per byte, 4 to a byte."""
+    codes = bytes(codes)
+    padding = -len(codes) % 4
+    codes += bytes(padding)
+    return bytes(
+        PACKED[codes[start:start + 4]]
+        for start in range(0, len(codes), 4))
+
+
+def unpack_shape(shape, count):
+    """Unpacks the shape codes of count nodes, one per byte."""
+    return b"".join(UNPACKED[byte] for byte in shape)[:count]
+
+
+def encode(node):
+    """Returns the preorder values and the shape codes, one per byte, of a
+    tree of TreeNode objects."""
+    values = []
+    codes = bytearray()
+    stack = [node]
+    pop, push = stack.pop, stack.append
+    while stack:
+        node = pop()
+        values.append(node.value)
+        code = 0
+        if node.right_child:
+            code = RIGHT
+            push(node.right_child)
+        if node.left_child:
+            code |= LEFT
+            push(node.left_child)
+        codes.append(code)
+    return values, codes
+
+
+def encode_arrays(values, left, right, root):
+    """Returns the preorder values and the shape codes, one per byte, of a
+    tree stored as arrays of values and child indices, like an ArrayTree."""
+    preorder = []
+    codes = bytearray()
+    stack = [root] if len(values) else []
+    pop, push = stack.pop, stack.append
+    while stack:
+        index = pop()
+        preorder.append(values[index])
+        code = 0
+        if right[index] >= 0:
+            code = RIGHT
+            push(right[index])
+        if left[index] >= 0:
+            code |= LEFT
+            push(left[index])
+        codes.append(code)
+    return preorder, codes
+
+
+def links(codes):
+    """Returns the left and right child links of a tree, indexed by preorder
+    position, given the shape codes of its nodes in preorder.
+
+    The codes are walked once. The nodes that still expect a right child
+    once their left subtree is complete are kept on an explicit stack."""
+    size = len(codes)
+    left = array("q", [-1]) * size
+    right = array("q", [-1]) * size
+    pending = []
+    # The links that the next node in preorder has to be stored in, and the
+    # index of its parent.
+    parent_links, parent = None, -1
+    for index, code in enumerate(codes):
+        if parent_links is not None:
+            parent_links[parent] = index
+        elif index > 0:
+            raise InconsistentTraversalError(
+                "The shape of the tree ends before its last value.")
+        if code & LEFT:
+            if code & RIGHT:
+                pending.append(index)
+            parent_links, parent = left, index
+        elif code & RIGHT:
+            parent_links, parent = right, index
+        elif pending:
+            parent_links, parent = right, pending.pop()
+        else:
+            parent_links = None
+    if parent_links is not None:
+        raise InconsistentTraversalError(
+            "The shape of the tree expects more values than it has.")
+    return left, right
+
+
+def _pieces(values, codes):
+    """Returns the header, the packed shape with its padding and the values
+    array of a succinct tree."""
+    if len(values) != len(codes):
+        raise InconsistentTraversalError(
+            "Every value needs exactly one shape code.")
+    width, values = pack_values(values)
+    shape = pack_shape(codes)
+    header = HEADER.pack(MAGIC, VERSION, width, len(values))
+    return header, shape + bytes(-len(shape) % 8), values
+
+
+def write(file_path, values, codes, atomic=False):
+    """Writes the preorder values and shape codes of a tree into a succinct
+    file. See binary_format.writing for the meaning of atomic. Returns the
+    number of bytes written."""
+    header, shape, values = _pieces(values, codes)
+    with writing(file_path, atomic=atomic) as f:
+        f.write(header)
+        f.write(shape)
+        values.tofile(f)
+    return len(header) + len(shape) + values.itemsize * len(values)
+
+
+def dumps(values, codes):
+    """Returns the bytes of the succinct file of a tree, given its preorder
+    values and shape codes."""
+    header, shape, values = _pieces(values, codes)
+    return header + shape + values.tobytes()
+
+
+def _read_header(header, file_path):
+    """Unpacks and validates the header of a succinct file. Returns the
+    width and the number of values."""
+    width, count = unpack_header(
+        header, HEADER, MAGIC, VERSION, "succinct tree file", file_path)
+    if width not in (4, 8):
+        raise UnsupportedFormatError(
+            "{} has a corrupt header.".format(file_path))
+    return width, count
+
+
+def read(file_path):
+    """Reads a succinct file. Returns its preorder values, as an array, and
+    its shape codes, one per byte."""
+    with open(file_path, "rb") as f:
+        width, count = _read_header(f.read(HEADER.size), file_path)
+        shape_size = (count + 3) // 4
+        shape = f.read(shape_size + -shape_size % 8)[:shape_size]
+        check_size(len(shape), shape_size, file_path)
+        values = unpack_values(f, width, count, file_path)
+    return values, unpack_shape(shape, count)
+
+
+def loads(data, name="<bytes>"):
+    """Reads the bytes of a succinct file, or any buffer holding them.
+    Returns its preorder values, as an array, and its shape codes, one per
+    byte. The name only appears in the errors."""
+    data = memoryview(data)
+    width, count = _read_header(data[:HEADER.size], name)
+    shape_size = (count + 3) // 4
+    start = HEADER.size + shape_size + -shape_size % 8
+    end = start + width * count
+    check_size(len(data), end, name)
+    values = array(_typecode(width))
+    values.frombytes(data[start:end])
+    if sys.byteorder == "big":
+        values.byteswap()
+    shape = data[HEADER.size:HEADER.size + shape_size].tobytes()
+    return values, unpack_shape(shape, count)
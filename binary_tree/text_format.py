@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Text format of the traversal files.
+
+Each traversal is stored in its own file, with one integer per line in
+ASCII. The files are named after a common prefix and the traversal they
+hold, such as my_tree.inorder and my_tree.preorder.
+"""
+import os
+from array import array
+
+from binary_tree.binary_format import temporary_path
+from binary_tree.instrumentation import NULL_OPERATION
+
+CHUNK_SIZE = 1 << 20
+
+
+def encode_values(values):
+    """Returns the text encoding of a batch of integers, one per line."""
+    if not values:
+        return b""
+    return ("\n".join(map(str, values)) + "\n").encode("ascii")
+
+
+MODES = ("preorder", "inorder", "postorder")
+
+
+class TraversalFiles:
+    """The text files of the traversals of a tree being saved under a
+    prefix, opened for writing.
+
+    If atomic is True, each file is written next to its destination under a
+    temporary name, and only renamed over it by commit, once every file has
+    been written completely and synced. Readers then see either the old or
+    the new dump. discard closes the files and removes the temporary ones,
+    leaving the old dump untouched."""
+
+    def __init__(self, file_prefix, preorder=True, inorder=True,
+                 postorder=False, atomic=False):
+        """Opens the files of the traversals asked for."""
+        wanted = dict(
+            preorder=preorder, inorder=inorder, postorder=postorder)
+        self.modes = [mode for mode in MODES if wanted[mode]]
+        self.atomic = atomic
+        self.paths = {
+            mode: "{}.{}".format(file_prefix, mode) for mode in self.modes}
+        self.targets = self.paths
+        if atomic:
+            self.targets = {
+                mode: temporary_path(path)
+                for mode, path in self.paths.items()}
+        self.files = {}
+        try:
+            for mode in self.modes:
+                self.files[mode] = open(self.targets[mode], "wb")
+        except BaseException:
+            self.discard()
+            raise
+
+    @property
+    def outputs(self):
+        """The preorder, inorder and postorder files, None for those not
+        asked for."""
+        return [self.files.get(mode) for mode in MODES]
+
+    def sync(self):
+        """Flushes the files and syncs them to disk, if the save is
+        atomic."""
+        if self.atomic:
+            for f in self.files.values():
+                f.flush()
+                os.fsync(f.fileno())
+
+    def commit(self):
+        """Closes the files and, if the save is atomic, renames them into
+        place."""
+        for f in self.files.values():
+            f.close()
+        if self.atomic:
+            for mode in self.modes:
+                os.replace(self.targets[mode], self.paths[mode])
+
+    def discard(self):
+        """Closes the files and, if the save is atomic, removes them."""
+        for f in self.files.values():
+            f.close()
+        if self.atomic:
+            for target in self.targets.values():
+                if os.path.exists(target):
+                    os.remove(target)
+
+
+def write_batches(batches, file_prefix, preorder=True, inorder=True,
+                  postorder=False, atomic=False, operation=NULL_OPERATION):
+    """Writes batches of preorder, inorder and postorder values, as yielded
+    by traversal.iter_batches, into the files of the requested traversals.
+
+    The values are formatted and written batch by batch, so no traversal is
+    ever held in memory as a whole. See TraversalFiles for the meaning of
+    atomic.
+
+    The time spent walking the tree, formatting the values and writing them
+    is recorded into the traverse, format and write phases of operation."""
+    traverse = operation.phase("traverse")
+    encode = operation.phase("format")
+    write = operation.phase("write")
+    files = TraversalFiles(
+        file_prefix, preorder=preorder, inorder=inorder, postorder=postorder,
+        atomic=atomic)
+    try:
+        outputs = files.outputs
+        batches = iter(batches)
+        while True:
+            with traverse:
+                batch = next(batches, None)
+            if batch is None:
+                break
+            for f, values in zip(outputs, batch):
+                if f and values:
+                    with encode:
+                        data = encode_values(values)
+                    with write:
+                        f.write(data)
+                    encode.nodes += len(values)
+                    write.bytes_written += len(data)
+        with write:
+            files.sync()
+    except BaseException:
+        files.discard()
+        raise
+    with write:
+        files.commit()
+    # Every file holds one value per node of the tree.
+    nodes = encode.nodes // max(len(files.modes), 1)
+    traverse.nodes = encode.nodes = write.nodes = nodes
+
+
+def _iter_blocks(f, chunk_size=CHUNK_SIZE):
+    """Yields the contents of a text traversal file in blocks of about
+    chunk_size bytes, each ending at the end of a line. A line split across
+    two reads is carried over to the next block."""
+    remainder = b""
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        end = chunk.rfind(b"\n")
+        if end < 0:
+            remainder += chunk
+            continue
+        yield remainder + chunk[:end]
+        remainder = chunk[end + 1:]
+    if remainder.strip():
+        yield remainder
+
+
+def read_values(path, chunk_size=CHUNK_SIZE):
+    """Reads a text traversal file into a compact array of 64 bit integers.
+
+    The file is read in blocks of chunk_size bytes, and every block is
+    parsed straight into the array, so only a single block is ever held as
+    bytes. If a value doesn't fit in 64 bits, a list of ints is returned
+    instead.
+    """
+    values = array("q")
+    extend = values.extend
+    with open(path, "rb") as f:
+        for block in _iter_blocks(f, chunk_size):
+            try:
+                extend(map(int, block.split()))
+            except OverflowError:
+                return _read_values_unbounded(path)
+    return values
+
+
+def iter_values(path, chunk_size=CHUNK_SIZE):
+    """Yields the values of a text traversal file one at a time, reading it
+    in blocks of chunk_size bytes."""
+    with open(path, "rb") as f:
+        for block in _iter_blocks(f, chunk_size):
+            yield from map(int, block.split())
+
+
+def _read_values_unbounded(path):
+    """Reads a text traversal file holding values that don't fit in 64 bits
+    into a list of ints."""
+    with open(path, "rb") as f:
+        return [int(line) for line in f if line.strip()]
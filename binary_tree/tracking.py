@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Nodes whose changes are tracked.
+
+The value and children of a TreeNode are plain attributes, so nothing
+knows when they change. A TrackedTreeNode turns them into properties, and
+also knows the parent of every node. A node assigned as a child is first
+detached from its former parent, so every node has at most one parent, and
+assigning a node below itself is refused.
+
+Subclasses keep data derived from the subtree of every node, such as the
+indexed and cached trees, and are told about every change through a few
+hooks, which they extend to keep that data up to date. TreeNode.load and
+parse_files build trees of any subclass, through its _from_links.
+
+The hooks are:
+
+    _set_value(value)               stores the value of the node
+    _check_child(node, replaced)    is called before node replaces a child
+    _attached(node)                 is called once node is a child
+    _detached(node)                 is called once node isn't a child anymore
+"""
+from binary_tree.exceptions import InvalidChildError
+from binary_tree.tree_node import TreeNode
+
+
+class TrackedTreeNode(TreeNode):
+    """Node of a binary tree which knows its parent, and whose value and
+    children are properties."""
+
+    __slots__ = ("_value", "_left", "_right", "_parent")
+
+    def __init__(self, value, left=None, right=None):
+        """Initializer method.
+        Takes an integer value, a left node and a right node, which must be
+        nodes of the same class."""
+        self._value = None
+        self._left = self._right = self._parent = None
+        super().__init__(value, left, right)
+
+    @classmethod
+    def _build(cls, values, left, right):
+        """Creates the nodes of a whole tree at once, like
+        TreeNode._from_links, and returns all of them. The slots of the
+        subclasses are left for them to fill."""
+        new = object.__new__
+        nodes = []
+        append = nodes.append
+        for value in values:
+            node = new(cls)
+            node._value = value
+            node._left = node._right = node._parent = None
+            append(node)
+        for position, node in enumerate(nodes):
+            if left[position] >= 0:
+                node._left = nodes[left[position]]
+                node._left._parent = node
+            if right[position] >= 0:
+                node._right = nodes[right[position]]
+                node._right._parent = node
+        return nodes
+
+    @classmethod
+    def _from_links(cls, values, left, right, root):
+        """Creates the nodes of a whole tree at once. Returns the root
+        node."""
+        return cls._build(values, left, right)[root]
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        self._set_value(value)
+
+    @property
+    def left_child(self):
+        return self._left
+
+    @left_child.setter
+    def left_child(self, node):
+        self._set_child("_left", node)
+
+    @property
+    def right_child(self):
+        return self._right
+
+    @right_child.setter
+    def right_child(self, node):
+        self._set_child("_right", node)
+
+    @property
+    def parent(self):
+        """The parent of the node, None for the root of a tree."""
+        return self._parent
+
+    @property
+    def root(self):
+        """The root of the tree the node belongs to."""
+        node = self
+        while node._parent is not None:
+            node = node._parent
+        return node
+
+    def _ancestors(self):
+        """Yields the node and its ancestors, up to the root."""
+        node = self
+        while node is not None:
+            yield node
+            node = node._parent
+
+    def _set_value(self, value):
+        self._value = value
+
+    def _set_child(self, side, node):
+        """Makes node the child of a side, "_left" or "_right". The subtree
+        it replaces becomes a tree of its own, and node is detached from its
+        former parent."""
+        replaced = getattr(self, side)
+        if node is replaced:
+            return
+        if node is not None:
+            if not isinstance(node, type(self)):
+                raise InvalidChildError(
+                    "Nodes must of type {}!".format(type(self).__name__))
+            for ancestor in self._ancestors():
+                if ancestor is node:
+                    raise InvalidChildError(
+                        "A node cannot be a child of its own subtree.")
+            self._check_child(node, replaced)
+            if node._parent is not None:
+                node._parent._detach(node)
+        if replaced is not None:
+            self._detach(replaced)
+        if node is not None:
+            setattr(self, side, node)
+            node._parent = self
+            self._attached(node)
+
+    def _detach(self, node):
+        """Detaches node, a child of this node, into a tree of its own."""
+        if self._left is node:
+            self._left = None
+        else:
+            self._right = None
+        node._parent = None
+        self._detached(node)
+
+    def _check_child(self, node, replaced):
+        pass
+
+    def _attached(self, node):
+        pass
+
+    def _detached(self, node):
+        pass
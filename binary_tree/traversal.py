@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Lazy depth-first traversals of binary trees.
+
+Each generator yields the nodes of a tree one at a time, in the order of
+its traversal. Only the path from the root to the current node is kept on
+an explicit stack, so the auxiliary memory is proportional to the depth of
+the tree and no intermediate lists are built.
+
+postorder_values builds a whole postorder at once instead, when a list is
+wanted anyway, which is faster than the lazy postorder.
+
+The functions only rely on the value, left_child and right_child
+attributes of the nodes.
+"""
+from binary_tree.instrumentation import NULL_PHASE
+
+
+def iter_preorder(node):
+    """Yields the nodes of a tree in root, left, right order."""
+    stack = [node]
+    pop, push = stack.pop, stack.append
+    while stack:
+        node = pop()
+        yield node
+        if node.right_child:
+            push(node.right_child)
+        if node.left_child:
+            push(node.left_child)
+
+
+def iter_inorder(node):
+    """Yields the nodes of a tree in left, root, right order."""
+    stack = []
+    pop, push = stack.pop, stack.append
+    while stack or node:
+        if node:
+            # Walk down the left spine, remembering each ancestor.
+            push(node)
+            node = node.left_child
+        else:
+            node = pop()
+            yield node
+            node = node.right_child
+
+
+def iter_postorder(node):
+    """Yields the nodes of a tree in left, right, root order."""
+    # A node is pushed back under a None marker before its children, and is
+    # yielded once the marker resurfaces. Unlike a comparison with the last
+    # yielded node, this stays correct when both children are the same
+    # object.
+    stack = [node]
+    pop, push = stack.pop, stack.append
+    while stack:
+        node = pop()
+        if node is None:
+            yield pop()
+            continue
+        push(node)
+        push(None)
+        if node.right_child:
+            push(node.right_child)
+        if node.left_child:
+            push(node.left_child)
+
+
+def postorder_values(node):
+    """Returns the values of a tree in left, right, root order, as a list.
+
+    The tree is walked once in root, right, left order, which is the
+    postorder reversed, so every node is pushed and popped only once and no
+    marker is needed."""
+    values = []
+    append = values.append
+    stack = [node]
+    pop, push = stack.pop, stack.append
+    while stack:
+        node = pop()
+        append(node.value)
+        if node.left_child:
+            push(node.left_child)
+        if node.right_child:
+            push(node.right_child)
+    values.reverse()
+    return values
+
+
+def iter_batches(node, preorder=True, inorder=True, postorder=False,
+                 batch_size=65536, phase=NULL_PHASE):
+    """Walks a tree once and yields several of its traversals together, in
+    batches of values.
+
+    Each batch is a tuple of the preorder, inorder and postorder values
+    reached since the previous batch. A traversal that isn't asked for is
+    always an empty list. A batch is yielded roughly every batch_size
+    nodes, so the memory used is bounded by the batch size and the depth of
+    the tree rather than by its size.
+
+    Once the walk is over, the largest number of nodes its stack held is
+    recorded as the max_depth of phase.
+    """
+    pre, ino, post = [], [], []
+    deepest = 0
+    if not postorder:
+        # Without the postorder, an inorder walk is enough: a node is pushed
+        # in preorder and popped in inorder.
+        stack = []
+        pop, push = stack.pop, stack.append
+        while stack or node:
+            if node:
+                if preorder:
+                    pre.append(node.value)
+                push(node)
+                node = node.left_child
+                # The stack is at its longest at the bottom of a left spine.
+                if not node and len(stack) > deepest:
+                    deepest = len(stack)
+            else:
+                node = pop()
+                if inorder:
+                    ino.append(node.value)
+                    if len(ino) >= batch_size:
+                        yield pre, ino, post
+                        pre, ino = [], []
+                elif len(pre) >= batch_size:
+                    yield pre, ino, post
+                    pre = []
+                node = node.right_child
+    else:
+        # Each node is visited three times: on the way down, between its two
+        # subtrees and on the way back up. The state of every node on the
+        # stack tells which of these visits comes next.
+        stack = [node]
+        states = [0]
+        while stack:
+            node = stack[-1]
+            state = states[-1]
+            if state == 0:
+                if preorder:
+                    pre.append(node.value)
+                states[-1] = 1
+                if node.left_child:
+                    stack.append(node.left_child)
+                    states.append(0)
+                elif len(stack) > deepest:
+                    deepest = len(stack)
+            elif state == 1:
+                if inorder:
+                    ino.append(node.value)
+                states[-1] = 2
+                if node.right_child:
+                    stack.append(node.right_child)
+                    states.append(0)
+            else:
+                post.append(node.value)
+                stack.pop()
+                states.pop()
+                if len(post) >= batch_size:
+                    yield pre, ino, post
+                    pre, ino, post = [], [], []
+    phase.max_depth = max(phase.max_depth, deepest)
+    if pre or ino or post:
+        yield pre, ino, post
+
+
+ITERATORS = {
+    "preorder": iter_preorder,
+    "inorder": iter_inorder,
+    "postorder": iter_postorder,
+}
@@ -1,13 +1,22 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
+from operator import attrgetter
+
 from binary_tree.exceptions import (
-    InvalidTraversalMode, InsufficientTraversalInformation,
-    InvalidChildError, InvalidValueError)
+    InvalidTraversalMode, InvalidChildError, InvalidValueError)
+from binary_tree import storage, succinct
+from binary_tree.instrumentation import NULL_INSTRUMENTATION, NULL_PHASE
+from binary_tree.traversal import (
+    ITERATORS, iter_batches, postorder_values)
+from binary_tree.reconstruction import check_sufficient, reconstruct
 
 
 class TreeNode:
     """Class definition for each node of a binary tree."""
 
+    # Without a __dict__ per instance, a node takes about 30% less memory.
+    __slots__ = ("value", "left_child", "right_child")
+
     def __init__(self, value, left=None, right=None):
         """Initializer method.
         Takes an integer value, a left node and a right node."""
@@ -31,6 +40,32 @@ class TreeNode:
                 raise InvalidChildError("Nodes must of type TreeNode!")
         self.right_child = right
 
+    @classmethod
+    def _from_links(cls, values, left, right, root):
+        """Creates the nodes of a whole tree at once, given the value of
+        every node, the indices of their left and right children, -1
+        meaning that there is no child, and the index of the root node.
+        Returns the root node.
+
+        This is the trusted construction path of the loaders. The values
+        are known to be integers and the children to be nodes, so the checks
+        of the initializer are skipped."""
+        new = object.__new__
+        nodes = []
+        append = nodes.append
+        for value in values:
+            node = new(cls)
+            node.value = value
+            node.left_child = None
+            node.right_child = None
+            append(node)
+        for index, node in enumerate(nodes):
+            if left[index] >= 0:
+                node.left_child = nodes[left[index]]
+            if right[index] >= 0:
+                node.right_child = nodes[right[index]]
+        return nodes[root]
+
     def __repr__(self):
         """Raw Representation."""
         repr_node = "<TreeNode [Value: {}] [L: {} | R: {}]>".format(
@@ -40,209 +75,158 @@ class TreeNode:
         return repr_node
 
     @staticmethod
-    def traverse(node, mode="preorder"):
-        """returns the tree traversal given a node in one of 3 modes.
-        The accepted values for mode are: preorder, postorder or inorder.
+    def iter_traverse(node, mode="preorder", nodes=False):
+        """Returns an iterator over the tree traversal given a node in one of
+        3 modes. The accepted values for mode are: preorder, postorder or
+        inorder.
+
+        The values are yielded one at a time, without building any list, so
+        the memory used is proportional to the depth of the tree. If nodes
+        is True, the TreeNode objects are yielded instead of their values.
         """
-        if mode.lower() == "preorder":
-            traversal = [node.value]
-            if node.left_child:
-                traversal.extend(
-                    TreeNode.traverse(node.left_child, mode=mode))
-            if node.right_child:
-                traversal.extend(
-                    TreeNode.traverse(node.right_child, mode=mode))
-        elif mode.lower() == "postorder":
-            traversal = []
-            if node.left_child:
-                traversal.extend(
-                    TreeNode.traverse(node.left_child, mode=mode))
-            if node.right_child:
-                traversal.extend(
-                    TreeNode.traverse(node.right_child, mode=mode))
-            traversal.append(node.value)
-        elif mode.lower() == "inorder":
-            traversal = []
-            if node.left_child:
-                traversal.extend(
-                    TreeNode.traverse(node.left_child, mode=mode))
-            traversal.append(node.value)
-            if node.right_child:
-                traversal.extend(
-                    TreeNode.traverse(node.right_child, mode=mode))
-        else:
+        iterator = ITERATORS.get(mode.lower())
+        if iterator is None:
             raise InvalidTraversalMode(
             ("{} is not an acceptable or "
             "implemented form of traversal! "
             "Choose from preorder, postorder "
             "or inorder traversal.").format(mode))
-        return traversal
+        if nodes:
+            return iterator(node)
+        return map(attrgetter("value"), iterator(node))
+
+    @staticmethod
+    def traverse(node, mode="preorder"):
+        """returns the tree traversal given a node in one of 3 modes.
+        The accepted values for mode are: preorder, postorder or inorder.
+
+        The traversal is taken from the iter_traverse of the class of the
+        node, so subclasses such as cached.CachedTreeNode can provide it.
+        When that is TreeNode.iter_traverse, the postorder is built in a
+        single reversed walk instead, which is faster than the lazy one.
+        """
+        iter_traverse = type(node).iter_traverse
+        if iter_traverse is TreeNode.iter_traverse and (
+                mode.lower() == "postorder"):
+            return postorder_values(node)
+        return list(iter_traverse(node, mode=mode))
 
     def save_to_disk(
-        self, file_prefix, preorder=True, inorder=True, postorder=False):
+        self, file_prefix, preorder=True, inorder=True, postorder=False,
+        atomic=False, format="text", instrumentation=None):
         """Saves a node and its children into 2 files.
         To check for a unique tree, you need one of two traversal information
         if the tree is not balanced or sorted.
-        """
-        import warnings
-        if inorder:
-            inorder = TreeNode.traverse(self, mode="inorder")
-            with open("{}.inorder".format(file_prefix), "wb+") as f:
-                for node in inorder:
-                    f.write("{}\n".format(node).encode("utf-8"))
-        else:
-            warnings.warn("You have saved insufficient information "
-            "regarding the tree to disk. You will need the inorder "
-            "traversal information to reassemble the tree.")
-
-        if preorder:
-            preorder = TreeNode.traverse(self, mode="preorder")
-            with open("{}.preorder".format(file_prefix), "wb+") as f:
-                for node in preorder:
-                    f.write("{}\n".format(node).encode("utf-8"))
-        elif postorder:
-            postorder = TreeNode.traverse(self, mode="postorder")
-            with open("{}.postorder".format(file_prefix), "wb+") as f:
-                for node in postorder:
-                    f.write("{}\n".format(node).encode("utf-8"))
-        else:
-            warnings.warn("You have saved insufficient information "
-            "regarding the tree to disk. You need at least one of the "
-            "preorder and postorder traversals.")
 
-    @staticmethod
-    def load(preorder=None, postorder=None, inorder=None):
+        Both files are written together in a single walk of the tree, in
+        large buffered chunks. If atomic is True, the files are written
+        under temporary names and renamed into place once complete.
+
+        With format="binary", both traversals are instead packed into a
+        single, much smaller file named after the prefix with a .tree
+        extension. That format always holds the inorder traversal.
+
+        With format="succinct", the tree is saved as its preorder traversal
+        and 2 bits per node describing its shape, in a single file named
+        after the prefix with a .succinct extension. That is half the size
+        of the binary format, and unlike the other formats it can be loaded
+        back when values repeat. The traversal flags are ignored.
+
+        If an instrumentation.Instrumentation object is given, the duration,
+        node count and bytes written of every phase of the save are recorded
+        into it.
+        """
+        storage.save_to_disk(
+            self._iter_batches, file_prefix,
+            preorder=preorder, inorder=inorder, postorder=postorder,
+            atomic=atomic, format=format,
+            encode_succinct=self._encode_succinct,
+            instrumentation=instrumentation)
+        self._saved(
+            file_prefix, preorder=preorder, inorder=inorder,
+            postorder=postorder, atomic=atomic, format=format)
+
+    # The hooks below are all save_to_disk and aio.save_to_disk use, so
+    # subclasses extend them rather than save_to_disk.
+
+    def _iter_batches(self, preorder=True, inorder=True, postorder=False,
+                      batch_size=65536, phase=NULL_PHASE):
+        """Yields batches of the traversals of the tree, like
+        traversal.iter_batches."""
+        return iter_batches(
+            self, preorder=preorder, inorder=inorder, postorder=postorder,
+            batch_size=batch_size, phase=phase)
+
+    def _encode_succinct(self):
+        """Returns the preorder values and shape codes of the tree, like
+        succinct.encode."""
+        return succinct.encode(self)
+
+    def _saved(self, file_prefix, preorder=True, inorder=True,
+               postorder=False, atomic=False, format="text"):
+        """Is called once the tree is saved under a prefix."""
+
+    @classmethod
+    def load(cls, preorder=None, postorder=None, inorder=None,
+             instrumentation=None):
         """Loads the binary tree given one of the preorder and postorder, along
         with the inorder.
         If given preorder and inorder, it uses that.
         Note: It is not possible to assemble a non-full binary tree with
         just the preorder & postorder traversals.
-        """
-        data_is_sufficient = (preorder and inorder) or (
-            postorder and inorder)
-        if not data_is_sufficient:
-            raise InsufficientTraversalInformation(
-                "Specify at least 2 of the three modes to load a "
-                "unique Binary Tree.")
-        if preorder and inorder:
-            # Pick the first item of the preorder. This is the root node.
-            root = preorder[0]
-            # Create a node with that root.
-            node = TreeNode(root)
-            # identify the new preorder. This is the preorder without the root.
-            new_preorder = preorder[1:]
-            # Now, identify which is the left child of this node.
-            # This information is in the inorder traversal.
-            # Get all the nodes left of this root using the inorder traversal.
-
-            if root in inorder:  # if the root is in the inorder traversal.
-                # find where it occurs.
-
-                root_position = inorder.index(root)
-                # split the inorder traversal list at that index.
-                left_inorder = inorder[:root_position]
-
-                if len(left_inorder) > 0:
-                    # filter the preorder so that it only contains items
-                    # in the left inorder traversal list.
-                    left_preorder = [
-                        n for n in new_preorder if n in left_inorder]
-                    node.left_child = TreeNode.load(
-                        preorder=left_preorder,
-                        inorder=left_inorder)
-                # if the root occurs before the end of the preorder.
-                if root_position < len(inorder):
-                    # split the inorder traversal tree at the root.
-                    # Take the right half
-                    right_inorder = inorder[root_position + 1:]
-                    # if there *is* a right traversal tree.
-                    if len(right_inorder) > 0:
-                        # filter the preorder so that it only contains items
-                        # in the right inorder traversal list.
-                        right_preorder = [
-                            n for n in new_preorder if n in right_inorder]
-                        node.right_child = TreeNode.load(
-                            preorder=right_preorder, inorder=right_inorder)
-            return node
-        elif postorder and inorder:
-            # If the postorder and inorder traversal information is provided.
-            # post order is in the order Left, Right, Root, so the last item
-            # is a root.
-            root = postorder[-1]
-            # create a node with that root.
-            node = TreeNode(root)
-            # identify the new postorder. This is the postorder without that root.
-            new_postorder = postorder[:-1]
-
-            # now Identify which is the left child of this node.
-            # this information is in the inorder traversal.
-
-            if root in inorder: # if the root is in the inorder traversal.
-                # find where it occurs.
-                root_position = inorder.index(root)
-                # split the inorder traversal list at that index.
-                left_inorder = inorder[:root_position]
-
-                if len(left_inorder) > 0:
-                    # filter the postorder so that it only contains items in
-                    # the left inorder traversal list.
-                    left_postorder = [
-                        n for n in new_postorder if n in left_inorder
-                    ]
-                    node.left_child = TreeNode.load(
-                        postorder=left_postorder,
-                        inorder=left_inorder)
-                # if the root occurs at the beginning of the postorder.
-                if root_position < len(inorder):
-                    # split the inorder traversal tree at the root.
-                    # take the right half.
-                    right_inorder = inorder[root_position + 1:]
-                    # if there *is* a right traversal tree.
-                    if len(right_inorder) > 0:
-                        # filter the postorder so that it only contains items
-                        # in the right inorder traversal list.
-                        right_postorder = [
-                            n for n in new_postorder if n in right_inorder
-                        ]
-                        node.right_child = TreeNode.load(
-                            postorder=right_postorder, inorder=right_inorder)
-            return node
 
-    @staticmethod
-    def parse_files(preorder=None, postorder=None, inorder=None):
+        The traversals can be any indexable sequences of integers. They are
+        never copied, sliced or filtered, so loading runs in linear time.
+        The nodes are built by the _from_links of the class, so subclasses
+        load trees of their own nodes.
+
+        If an instrumentation.Instrumentation object is given, the
+        reconstruction of the shape of the tree and the building of its
+        nodes are recorded into it, along with the depth of the tree.
+        """
+        check_sufficient(preorder, postorder, inorder)
+        if instrumentation is None:
+            instrumentation = NULL_INSTRUMENTATION
+        with instrumentation.operation("load") as operation:
+            # The links are indexed by the position of each node in the
+            # traversal.
+            traversal, left, right, root = reconstruct(
+                preorder=preorder, postorder=postorder, inorder=inorder,
+                operation=operation)
+            with operation.phase("build") as build:
+                node = cls._from_links(traversal, left, right, root)
+            build.nodes = len(traversal)
+        return node
+
+    @classmethod
+    def parse_files(
+        cls, preorder=None, postorder=None, inorder=None, format="text",
+        filename=None, memory_map=False, instrumentation=None):
         """Parses files and loads the tree from them.
 
         The binary tree can be reassembled if at least one of the preorder
         or postorder traversal information is provided alongwith the inorder
-        traversal."""
-        data_is_sufficient = (preorder and inorder) or (
-            postorder and inorder)
-        if not data_is_sufficient:
-            raise InsufficientTraversalInformation(
-                "Specify at least 2 of the three modes to load a "
-                "unique Binary Tree")
-        if preorder:
-            with open(preorder, "rb+") as f:
-                preorder_traversal = [
-                    int(l.decode("ascii").strip()) for l in f.readlines()
-                    ]
-
-        if inorder:
-            with open(inorder, "rb+") as f:
-                inorder_traversal = [
-                    int(l.decode("ascii").strip()) for l in f.readlines()
-                    ]
-
-        if postorder:
-            with open(postorder, "rb+") as f:
-                postorder_traversal = [
-                    int(l.decode("ascii").strip()) for l in f.readlines()
-                    ]
-        if preorder and inorder:
-            return TreeNode.load(
-                preorder=preorder_traversal,
-                inorder=inorder_traversal)
-        elif postorder and inorder:
-            return TreeNode.load(
-                postorder=postorder_traversal,
-                inorder=inorder_traversal)
+        traversal.
+
+        The files are parsed in large blocks straight into compact integer
+        arrays, without building an object per line.
+
+        With format="binary", the tree is instead read from the single file
+        given as filename, as written by save_to_disk with format="binary".
+        If memory_map is also True, the file is memory mapped and the tree
+        is reassembled straight from the mapped traversals, which are never
+        copied into lists or arrays.
+
+        With format="succinct", the tree is read from the single file given
+        as filename, as written by save_to_disk with format="succinct", and
+        rebuilt in one pass without any lookup.
+
+        If an instrumentation.Instrumentation object is given, the reading
+        of the files and the loading of the tree are recorded into it as a
+        single operation.
+        """
+        return storage.parse_files(
+            cls.load, preorder=preorder, postorder=postorder,
+            inorder=inorder, format=format, filename=filename,
+            memory_map=memory_map, from_links=cls._from_links,
+            instrumentation=instrumentation)
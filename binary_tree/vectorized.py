@@ -0,0 +1,311 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Vectorized computations over trees stored as index arrays.
+
+The traversals of an ArrayTree, and the reconstruction of one from its
+traversals, run a few Python bytecodes per node. With NumPy installed, the
+functions below instead work on whole levels of the tree at once: every
+level of nodes is an array of indices, and the sizes, depths and positions
+of all its nodes are computed with a handful of array operations. The
+reconstruction similarly places every node of a level of the tree at once.
+
+The cost then depends on the number of levels of the tree rather than on
+its number of nodes, which pays off for bushy trees. Deep and narrow trees
+would need a round of array operations for very few nodes at a time, so
+the functions fall back to the pure Python code for them, as they do when
+NumPy isn't installed. So do trees whose subtrees are shared, like those
+loaded from DAG files without expanding them. The results are the same
+either way, and are returned as arrays of 64 bit integers of the array
+module.
+"""
+from array import array
+
+from binary_tree import storage
+from binary_tree.array_tree import ArrayTree
+from binary_tree.exceptions import InconsistentTraversalError
+from binary_tree.instrumentation import NULL_INSTRUMENTATION, NULL_OPERATION
+from binary_tree.reconstruction import (
+    _check_lengths, check_sufficient, depth, postorder_links,
+    preorder_links)
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# A tree is deemed too narrow to be vectorized once it has more than
+# MAX_NARROW_LEVELS levels holding fewer than MIN_WIDTH nodes on average.
+MAX_NARROW_LEVELS = 4096
+MIN_WIDTH = 32
+
+
+def _to_numpy(values):
+    """Returns a sequence of integers as a NumPy array, without copying it
+    when it is a buffer of 64 bit integers."""
+    try:
+        view = memoryview(values)
+    except TypeError:
+        view = None
+    if view is not None and view.format == "q" and view.itemsize == 8:
+        return numpy.frombuffer(view, dtype=numpy.int64)
+    return numpy.asarray(values, dtype=numpy.int64)
+
+
+def _to_array(values):
+    """Returns a NumPy array as an array of 64 bit integers."""
+    result = array("q")
+    result.frombytes(values.astype(numpy.int64).tobytes())
+    return result
+
+
+def _too_narrow(levels, nodes):
+    return levels > MAX_NARROW_LEVELS and nodes < levels * MIN_WIDTH
+
+
+def _shares_nodes(left, right, root):
+    """Tells whether a node is the child of several nodes, or the root the
+    child of one, as in the ArrayTrees loaded from DAG files."""
+    children = numpy.concatenate((left, right))
+    counts = numpy.bincount(children[children >= 0], minlength=len(left))
+    return counts.max(initial=0) > 1 or counts[root] > 0
+
+
+def _levels(tree):
+    """Returns the levels of a tree as arrays of node indices, along with
+    its left and right links as NumPy arrays. Returns None if the tree is
+    too narrow to be worth vectorizing, or if its subtrees are shared, since
+    every node then has several positions in the traversals."""
+    left = _to_numpy(tree.left)
+    right = _to_numpy(tree.right)
+    if _shares_nodes(left, right, tree.root):
+        return None
+    levels = []
+    nodes = 0
+    frontier = numpy.array([tree.root], dtype=numpy.int64)
+    while frontier.size:
+        levels.append(frontier)
+        nodes += frontier.size
+        if _too_narrow(len(levels), nodes):
+            return None
+        children = numpy.concatenate((left[frontier], right[frontier]))
+        frontier = children[children >= 0]
+    return levels, left, right
+
+
+def _sizes(levels, left, right, size):
+    """Returns the size of the subtree of every node, with an extra 0 at the
+    end standing for missing children."""
+    sizes = numpy.zeros(size + 1, dtype=numpy.int64)
+    # A missing child, -1, is read as the extra 0 at the end.
+    for level in reversed(levels):
+        sizes[level] = 1 + sizes[left[level]] + sizes[right[level]]
+    return sizes
+
+
+def subtree_sizes(tree):
+    """Returns the number of nodes of the subtree of every node of an
+    ArrayTree, indexed like its nodes."""
+    if numpy is not None and len(tree):
+        found = _levels(tree)
+        if found is not None:
+            levels, left, right = found
+            return _to_array(_sizes(levels, left, right, len(tree))[:-1])
+    sizes = array("q", [0]) * len(tree)
+    for index in tree.iter_indices("postorder"):
+        sizes[index] = 1 + (
+            sizes[tree.left[index]] if tree.left[index] >= 0 else 0) + (
+            sizes[tree.right[index]] if tree.right[index] >= 0 else 0)
+    return sizes
+
+
+def depths(tree):
+    """Returns the depth of every node of an ArrayTree, the root being at
+    depth 0, indexed like its nodes."""
+    if numpy is not None and len(tree):
+        found = _levels(tree)
+        if found is not None:
+            result = numpy.zeros(len(tree), dtype=numpy.int64)
+            for depth, level in enumerate(found[0]):
+                result[level] = depth
+            return _to_array(result)
+    result = array("q", [0]) * len(tree)
+    for index in tree.iter_indices("preorder"):
+        for child in (tree.left[index], tree.right[index]):
+            if child >= 0:
+                result[child] = result[index] + 1
+    return result
+
+
+def _positions(levels, left, right, sizes, mode):
+    """Returns the position of every node in the traversal of a mode.
+
+    Every subtree takes a contiguous range of positions in every traversal.
+    The start of the range of every subtree is worked out from its parent,
+    a level at a time, and the position of its root follows from it."""
+    starts = numpy.zeros(len(sizes) - 1, dtype=numpy.int64)
+    positions = numpy.empty(len(sizes) - 1, dtype=numpy.int64)
+    for level in levels:
+        level_left = left[level]
+        level_right = right[level]
+        start = starts[level]
+        left_sizes = sizes[level_left]
+        if mode == "preorder":
+            position = start
+            left_start = start + 1
+            right_start = start + 1 + left_sizes
+        elif mode == "inorder":
+            position = start + left_sizes
+            left_start = start
+            right_start = position + 1
+        else:
+            position = start + sizes[level] - 1
+            left_start = start
+            right_start = start + left_sizes
+        positions[level] = position
+        has_left = level_left >= 0
+        starts[level_left[has_left]] = left_start[has_left]
+        has_right = level_right >= 0
+        starts[level_right[has_right]] = right_start[has_right]
+    return positions
+
+
+def order(tree, mode="preorder"):
+    """Returns the indices of the nodes of an ArrayTree, in the order of the
+    traversal given in one of 3 modes: preorder, postorder or inorder."""
+    # The mode is validated by iter_indices, even when it isn't used.
+    indices = tree.iter_indices(mode)
+    mode = mode.lower()
+    if numpy is not None and len(tree):
+        found = _levels(tree)
+        if found is not None:
+            levels, left, right = found
+            sizes = _sizes(levels, left, right, len(tree))
+            positions = _positions(levels, left, right, sizes, mode)
+            result = numpy.empty(len(tree), dtype=numpy.int64)
+            result[positions] = numpy.arange(len(tree), dtype=numpy.int64)
+            return _to_array(result)
+    return array("q", indices)
+
+
+def traverse(tree, mode="preorder"):
+    """Returns the values of an ArrayTree in the order of the traversal given
+    in one of 3 modes, as an array of 64 bit integers."""
+    indices = order(tree, mode)
+    if numpy is not None:
+        return _to_array(
+            _to_numpy(tree.values)[_to_numpy(indices)])
+    return array("q", map(tree.values.__getitem__, indices))
+
+
+def _links(traversal, inorder, preorder):
+    """Returns the left and right links of a tree, computed level by level,
+    or None if the tree is too narrow to be worth vectorizing.
+
+    Every subtree is a range of the traversal and of the inorder. The
+    position of its root in the inorder splits both into the ranges of its
+    left and right subtrees, and all the subtrees of a level are split at
+    once."""
+    size = len(traversal)
+    traversal = _to_numpy(traversal)
+    inorder = _to_numpy(inorder)
+    # The position in the inorder of every value of the traversal. A value
+    # that repeats is found at its first position.
+    sorter = numpy.argsort(inorder, kind="stable")
+    found = numpy.searchsorted(inorder[sorter], traversal)
+    found[found == size] = 0
+    positions = sorter[found]
+    missing = inorder[positions] != traversal
+    if missing.any():
+        raise InconsistentTraversalError(
+            "{} is not in the inorder traversal.".format(
+                traversal[missing.argmax()]))
+    left = numpy.full(size, -1, dtype=numpy.int64)
+    right = numpy.full(size, -1, dtype=numpy.int64)
+    # The ranges of the subtrees of the current level: the start of their
+    # traversal, the start of their inorder and their size.
+    starts = numpy.zeros(1, dtype=numpy.int64)
+    inorder_starts = numpy.zeros(1, dtype=numpy.int64)
+    sizes = numpy.array([size], dtype=numpy.int64)
+    levels = nodes = 0
+    while sizes.size:
+        levels += 1
+        nodes += sizes.size
+        if _too_narrow(levels, nodes):
+            return None
+        roots = starts if preorder else starts + sizes - 1
+        left_sizes = positions[roots] - inorder_starts
+        misplaced = (left_sizes < 0) | (left_sizes >= sizes)
+        if misplaced.any():
+            raise InconsistentTraversalError(
+                "{} is not where it should be in the inorder "
+                "traversal.".format(traversal[roots[misplaced.argmax()]]))
+        right_sizes = sizes - left_sizes - 1
+        left_starts = starts + 1 if preorder else starts
+        right_starts = left_starts + left_sizes
+        has_left = left_sizes > 0
+        has_right = right_sizes > 0
+        if preorder:
+            left[roots[has_left]] = left_starts[has_left]
+            right[roots[has_right]] = right_starts[has_right]
+        else:
+            left[roots[has_left]] = (
+                left_starts + left_sizes - 1)[has_left]
+            right[roots[has_right]] = (
+                right_starts + right_sizes - 1)[has_right]
+        starts = numpy.concatenate(
+            (left_starts[has_left], right_starts[has_right]))
+        inorder_starts = numpy.concatenate(
+            (inorder_starts[has_left],
+             (inorder_starts + left_sizes + 1)[has_right]))
+        sizes = numpy.concatenate(
+            (left_sizes[has_left], right_sizes[has_right]))
+    return _to_array(left), _to_array(right)
+
+
+def links(preorder=None, postorder=None, inorder=None):
+    """Returns the left and right child links of a tree, indexed by position
+    in the preorder, or in the postorder if no preorder is given, like
+    reconstruction.preorder_links and postorder_links do."""
+    check_sufficient(preorder, postorder, inorder)
+    traversal = preorder if preorder else postorder
+    _check_lengths(traversal, inorder)
+    if numpy is not None:
+        try:
+            found = _links(traversal, inorder, bool(preorder))
+        except OverflowError:
+            found = None
+        if found is not None:
+            return found
+    if preorder:
+        return preorder_links(preorder, inorder)
+    return postorder_links(postorder, inorder)
+
+
+def load(preorder=None, postorder=None, inorder=None, instrumentation=None):
+    """Loads an ArrayTree given one of the preorder and postorder, along with
+    the inorder, like ArrayTree.load does, with vectorized reconstruction."""
+    if instrumentation is None:
+        instrumentation = NULL_INSTRUMENTATION
+    with instrumentation.operation("load") as operation:
+        with operation.phase("reconstruct") as phase:
+            left, right = links(
+                preorder=preorder, postorder=postorder, inorder=inorder)
+        traversal, root = (preorder, 0) if preorder else (
+            postorder, len(postorder) - 1)
+        phase.nodes = len(traversal)
+        if operation is not NULL_OPERATION:
+            phase.max_depth = depth(left, right, root)
+        with operation.phase("build") as build:
+            tree = ArrayTree._from_links(traversal, left, right, root)
+        build.nodes = len(tree)
+    return tree
+
+
+def parse_files(preorder=None, postorder=None, inorder=None, format="text",
+                filename=None, memory_map=False, instrumentation=None):
+    """Parses files and loads an ArrayTree from them with load.
+    See TreeNode.parse_files."""
+    return storage.parse_files(
+        load, preorder=preorder, postorder=postorder, inorder=inorder,
+        format=format, filename=filename, memory_map=memory_map,
+        from_links=ArrayTree._from_links, instrumentation=instrumentation)
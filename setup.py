@@ -27,6 +27,7 @@ setuptools.setup(
     install_requires=requirements,
     setup_requires=setup_requirements,
     tests_require=test_requirements,
+    extras_require={"numpy": ["numpy"]},
     classifiers=[
         "Development Status :: 3 - Alpha",
         "Environment :: Console",
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""The tree most tests run on, and its traversals."""
+import pytest
+
+from binary_tree import TreeNode
+
+PREORDER = [25, 15, 10, 4, 12, 22, 18, 24, 50, 35, 31, 44, 70, 66, 90]
+INORDER = [4, 10, 12, 15, 18, 22, 24, 25, 31, 35, 44, 50, 66, 70, 90]
+POSTORDER = [4, 12, 10, 18, 24, 22, 15, 31, 44, 35, 66, 90, 70, 50, 25]
+
+
+@pytest.fixture
+def longer_tree():
+    """Returns a longer tree with a preorder traversal of:
+        [25, 15, 10, 4, 12, 22, 18, 24, 50, 35, 31, 44, 70, 66, 90]
+    """
+    root = TreeNode(25)
+
+    root.left_child = TreeNode(15)
+
+    root.left_child.left_child = TreeNode(10)
+
+    root.left_child.left_child.left_child = TreeNode(4)
+    root.left_child.left_child.right_child = TreeNode(12)
+
+    root.left_child.right_child = TreeNode(22)
+
+    root.left_child.right_child.left_child = TreeNode(18)
+    root.left_child.right_child.right_child = TreeNode(24)
+
+    root.right_child = TreeNode(50)
+
+    root.right_child.left_child = TreeNode(35)
+
+    root.right_child.left_child.left_child = TreeNode(31)
+    root.right_child.left_child.right_child = TreeNode(44)
+
+    root.right_child.right_child = TreeNode(70)
+
+    root.right_child.right_child.left_child = TreeNode(66)
+    root.right_child.right_child.right_child = TreeNode(90)
+    yield root
+    del root
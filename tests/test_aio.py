@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from binary_tree import ArrayTree, TreeNode, aio
+from binary_tree.cached import CachedTreeNode
+from binary_tree.delta import DeltaTreeNode
+from binary_tree.exceptions import InsufficientTraversalInformation
+from binary_tree.instrumentation import Instrumentation
+from tests.conftest import INORDER, PREORDER
+
+
+def read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("atomic", [False, True])
+def test_same_files_as_save_to_disk(tmp_path, longer_tree, atomic):
+    """The files written asynchronously are those save_to_disk writes."""
+    prefix = str(tmp_path / "async")
+    longer_tree.save_to_disk(
+        str(tmp_path / "sync"), preorder=False, postorder=True)
+    asyncio.run(aio.save_to_disk(
+        longer_tree, prefix, preorder=False, postorder=True, atomic=atomic))
+    for mode in ("inorder", "postorder"):
+        assert read_bytes("{}.{}".format(prefix, mode)) == read_bytes(
+            str(tmp_path / "sync.{}".format(mode)))
+    assert sorted(os.listdir(str(tmp_path))) == [
+        "async.inorder", "async.postorder", "sync.inorder", "sync.postorder"]
+
+
+def test_round_trip_concurrently(tmp_path, longer_tree):
+    """Several trees, of either class, are saved and parsed concurrently."""
+    trees = [
+        longer_tree,
+        ArrayTree.load(preorder=PREORDER, inorder=INORDER),
+    ]
+    prefixes = [str(tmp_path / str(index)) for index in range(len(trees))]
+
+    async def round_trip():
+        await asyncio.gather(*(
+            aio.save_to_disk(tree, prefix)
+            for tree, prefix in zip(trees, prefixes)))
+        return await asyncio.gather(*(
+            aio.parse_files(
+                preorder=prefix + ".preorder", inorder=prefix + ".inorder",
+                tree_class=type(tree))
+            for tree, prefix in zip(trees, prefixes)))
+
+    first, second = asyncio.run(round_trip())
+    assert TreeNode.traverse(first) == PREORDER
+    assert isinstance(second, ArrayTree)
+    assert second.traverse("inorder") == INORDER
+
+
+@pytest.mark.parametrize("format,extension", [
+    ("binary", ".tree"), ("succinct", ".succinct")])
+def test_single_file_formats(tmp_path, longer_tree, format, extension):
+    """The single file formats are saved and parsed in the executor."""
+    prefix = str(tmp_path / "tree")
+
+    async def round_trip():
+        await aio.save_to_disk(longer_tree, prefix, format=format)
+        return await aio.parse_files(
+            format=format, filename=prefix + extension)
+
+    assert TreeNode.traverse(asyncio.run(round_trip())) == PREORDER
+
+
+def test_instrumentation(tmp_path, longer_tree):
+    """Parsing and loading the tree in the executor is one operation."""
+    prefix = str(tmp_path / "tree")
+    longer_tree.save_to_disk(prefix)
+    instrumentation = Instrumentation()
+    asyncio.run(aio.parse_files(
+        preorder=prefix + ".preorder", inorder=prefix + ".inorder",
+        instrumentation=instrumentation))
+    operation, = instrumentation.operations
+    assert list(operation.phases) == ["parse", "reconstruct", "build"]
+
+
+def test_save_phases(tmp_path, longer_tree):
+    """An asynchronous save records the phases of a synchronous one."""
+    instrumentation = Instrumentation()
+    longer_tree.save_to_disk(
+        str(tmp_path / "sync"), instrumentation=instrumentation)
+    asyncio.run(aio.save_to_disk(
+        longer_tree, str(tmp_path / "async"),
+        instrumentation=instrumentation))
+    sync, asynchronous = instrumentation.report()
+    assert [phase["name"] for phase in asynchronous["phases"]] == [
+        phase["name"] for phase in sync["phases"]]
+    for first, second in zip(sync["phases"], asynchronous["phases"]):
+        assert first["nodes"] == second["nodes"] == len(PREORDER)
+        assert first.get("bytes_written") == second.get("bytes_written")
+        assert first["max_depth"] == second["max_depth"]
+    assert sync["phases"][0]["max_depth"] > 0
+
+
+def test_delta_tree_save(tmp_path):
+    """An asynchronous save of a DeltaTreeNode starts a new delta log, which
+    later checkpoints are appended to."""
+    prefix = str(tmp_path / "tree")
+    node = DeltaTreeNode.load(preorder=PREORDER, inorder=INORDER)
+    node.save_to_disk(prefix)
+    node.value = 26
+    node.save_delta(prefix)
+    asyncio.run(aio.save_to_disk(node, prefix))
+    node.left_child.value = 16
+    assert node.save_delta(prefix) == 1
+    loaded = DeltaTreeNode.parse_files(
+        preorder=prefix + ".preorder", inorder=prefix + ".inorder",
+        delta=prefix + ".delta")
+    assert TreeNode.traverse(loaded) == TreeNode.traverse(node)
+
+
+def test_cached_tree_save(tmp_path):
+    """An asynchronous save of a CachedTreeNode writes, and keeps, its cached
+    traversals."""
+    prefix = str(tmp_path / "tree")
+    node = CachedTreeNode.load(preorder=PREORDER, inorder=INORDER)
+    asyncio.run(aio.save_to_disk(node, prefix))
+    assert node.cached == ("preorder", "inorder")
+    loaded = TreeNode.parse_files(
+        preorder=prefix + ".preorder", inorder=prefix + ".inorder")
+    assert TreeNode.traverse(loaded) == PREORDER
+
+
+def test_insufficient_information():
+    with pytest.raises(InsufficientTraversalInformation):
+        asyncio.run(aio.parse_files(preorder="tree.preorder"))
+
+
+class HeldExecutor(ThreadPoolExecutor):
+    """A thread pool which holds the calls of a function until released,
+    and records the errors raised by its calls."""
+
+    def __init__(self, name):
+        super().__init__(max_workers=4)
+        self.name = name
+        self.held = asyncio.Event()
+        self.released = threading.Event()
+        self.errors = []
+
+    def submit(self, function, *args, **kwargs):
+        # aio submits every call as partial(context.run, call, *args).
+        held = function.args[0].__name__ == self.name
+
+        def run():
+            if held:
+                # The timeout only keeps a broken save from hanging.
+                self.released.wait(10)
+            try:
+                return function(*args, **kwargs)
+            except Exception as error:
+                self.errors.append(error)
+                raise
+
+        if held:
+            self.held.set()
+        return super().submit(run)
+
+
+def run_cancelled(save, executor, monkeypatch):
+    """Runs a save, cancels it once the executor holds a call, and releases
+    the held calls once the save waits for them, or is over."""
+
+    async def cancel():
+        task = asyncio.ensure_future(save)
+        await executor.held.wait()
+        task.cancel()
+        try:
+            await task
+        finally:
+            executor.released.set()
+
+    settle = aio._settle
+
+    async def release(futures):
+        executor.released.set()
+        await settle(futures)
+
+    monkeypatch.setattr(aio, "_settle", release)
+    try:
+        with pytest.raises(asyncio.CancelledError):
+            asyncio.run(cancel())
+    finally:
+        executor.shutdown(wait=True)
+
+
+def test_cancelled_atomic_save(tmp_path, longer_tree, monkeypatch):
+    """A cancelled atomic save leaves the previous files untouched."""
+    prefix = str(tmp_path / "tree")
+    longer_tree.save_to_disk(prefix)
+    before = read_bytes(prefix + ".inorder")
+    # The save opens its temporary files before walking the first batch.
+    executor = HeldExecutor("next")
+    run_cancelled(
+        aio.save_to_disk(longer_tree, prefix, atomic=True, executor=executor),
+        executor, monkeypatch)
+    assert executor.errors == []
+    assert read_bytes(prefix + ".inorder") == before
+    assert sorted(os.listdir(str(tmp_path))) == [
+        "tree.inorder", "tree.preorder"]
+
+
+def test_save_cancelled_while_writing(tmp_path, longer_tree, monkeypatch):
+    """A save cancelled while writing waits for the calls already running
+    before closing and removing its temporary files."""
+    prefix = str(tmp_path / "tree")
+    executor = HeldExecutor("write")
+    run_cancelled(
+        aio.save_to_disk(longer_tree, prefix, atomic=True, executor=executor),
+        executor, monkeypatch)
+    assert executor.errors == []
+    assert os.listdir(str(tmp_path)) == []
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import pytest
+
+from binary_tree import ArrayTree, TreeNode
+from binary_tree.exceptions import (
+    InconsistentTraversalError, InvalidTraversalMode, InvalidValueError)
+from tests.conftest import INORDER, POSTORDER, PREORDER
+
+
+def test_traverse(longer_tree):
+    """An ArrayTree has the same traversals as the TreeNode it comes from."""
+    tree = ArrayTree.from_tree_node(longer_tree)
+    assert len(tree) == 15
+    assert list(tree.values) == PREORDER
+    assert tree.traverse("preorder") == PREORDER
+    assert tree.traverse("inorder") == INORDER
+    assert tree.traverse("postorder") == POSTORDER
+    with pytest.raises(InvalidTraversalMode):
+        tree.traverse("levelorder")
+
+
+def test_tree_node_round_trip(longer_tree):
+    """Converting to and from TreeNode objects is lossless."""
+    node = ArrayTree.from_tree_node(longer_tree).to_tree_node()
+    assert isinstance(node, TreeNode)
+    assert TreeNode.traverse(node, mode="preorder") == PREORDER
+    assert TreeNode.traverse(node, mode="inorder") == INORDER
+
+
+def test_load_postorder():
+    """A tree loaded from the postorder keeps its nodes in postorder."""
+    tree = ArrayTree.load(postorder=POSTORDER, inorder=INORDER)
+    assert list(tree.values) == POSTORDER
+    assert tree.root == 14
+    assert tree.traverse("preorder") == PREORDER
+
+
+@pytest.mark.parametrize("format", ["text", "binary"])
+def test_files_shared_with_tree_node(tmp_path, longer_tree, format):
+    """ArrayTree and TreeNode read each other's files."""
+    prefix = str(tmp_path / "tree")
+    files = (
+        {"filename": prefix + ".tree"} if format == "binary" else
+        {"preorder": prefix + ".preorder", "inorder": prefix + ".inorder"})
+
+    ArrayTree.from_tree_node(longer_tree).save_to_disk(prefix, format=format)
+    node = TreeNode.parse_files(format=format, **files)
+    assert TreeNode.traverse(node, mode="postorder") == POSTORDER
+
+    longer_tree.save_to_disk(prefix, format=format)
+    tree = ArrayTree.parse_files(format=format, **files)
+    assert tree.traverse("postorder") == POSTORDER
+
+
+def test_save_postorder_in_small_batches(tmp_path, longer_tree):
+    """The postorder file is written in batches like the inorder file."""
+    prefix = str(tmp_path / "tree")
+    tree = ArrayTree.from_tree_node(longer_tree)
+    batches = list(tree.iter_batches(
+        preorder=False, inorder=True, postorder=True, batch_size=4))
+    assert [len(batch[2]) for batch in batches] == [4, 4, 4, 3]
+    tree.save_to_disk(prefix, preorder=False, postorder=True)
+    loaded = ArrayTree.parse_files(
+        postorder=prefix + ".postorder", inorder=prefix + ".inorder")
+    assert loaded.traverse("preorder") == PREORDER
+
+
+def test_buffers_are_zero_copy(longer_tree):
+    """The exported buffers are read-only views of the arrays."""
+    tree = ArrayTree.from_tree_node(longer_tree)
+    values, left, right = tree.buffers()
+    assert values.readonly and values.format == "q"
+    assert values.obj is tree.values
+    assert tree.nbytes == 24 * len(tree)
+    assert left[0] == 1 and right[0] == 8
+
+
+def test_invalid_arrays():
+    """The arrays must have the same length and hold the root."""
+    with pytest.raises(InconsistentTraversalError):
+        ArrayTree([1, 2], [-1], [-1, -1])
+    with pytest.raises(InconsistentTraversalError):
+        ArrayTree([1], [-1], [-1], root=1)
+    with pytest.raises(InvalidValueError):
+        ArrayTree.from_tree_node(TreeNode(2 ** 64))
+
+
+def test_numpy_arrays_and_empty_trees():
+    """The arrays can be NumPy arrays, and an empty tree has no root
+    node."""
+    numpy = pytest.importorskip("numpy")
+    tree = ArrayTree(
+        numpy.array([1, 2]), numpy.array([1, -1]), numpy.array([-1, -1]))
+    node = tree.to_tree_node()
+    assert TreeNode.traverse(node, "inorder") == [2, 1]
+    assert type(node.value) is int and type(node.left_child.value) is int
+    with pytest.raises(InconsistentTraversalError):
+        ArrayTree(numpy.array([1]), numpy.array([-1]), numpy.array([-1]),
+                  root=1)
+    assert ArrayTree([], [], []).to_tree_node() is None
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import struct
+
+import pytest
+
+from binary_tree import TreeNode
+from binary_tree.binary_format import (
+    HEADER, MappedTraversals, read_traversals, unpack_header)
+from binary_tree.exceptions import (
+    InsufficientTraversalInformation, InvalidValueError,
+    UnsupportedFormatError)
+
+
+def assert_same_tree(first, second):
+    """Asserts that two trees have the same traversals."""
+    for mode in ("preorder", "inorder", "postorder"):
+        assert TreeNode.traverse(first, mode=mode) == TreeNode.traverse(
+            second, mode=mode)
+
+
+@pytest.mark.parametrize("order", ["preorder", "postorder"])
+def test_binary_round_trip(tmp_path, longer_tree, order):
+    """A tree saved in the binary format is loaded back identically."""
+    prefix = str(tmp_path / "tree")
+    longer_tree.save_to_disk(
+        prefix, preorder=order == "preorder",
+        postorder=order == "postorder", format="binary")
+    assert os.listdir(str(tmp_path)) == ["tree.tree"]
+    stored_order, _, _ = read_traversals(prefix + ".tree")
+    assert stored_order == order
+    loaded = TreeNode.parse_files(filename=prefix + ".tree", format="binary")
+    assert_same_tree(loaded, longer_tree)
+
+
+def test_binary_width(tmp_path, longer_tree):
+    """Values that fit in 32 bits are stored in 4 bytes, others in 8."""
+    small = str(tmp_path / "small.tree")
+    longer_tree.save_to_disk(str(tmp_path / "small"), format="binary")
+    assert os.path.getsize(small) == HEADER.size + 2 * 15 * 4
+
+    large_tree = TreeNode(-2 ** 40, right=TreeNode(2 ** 63 - 1))
+    large_tree.save_to_disk(str(tmp_path / "large"), format="binary")
+    large = str(tmp_path / "large.tree")
+    assert os.path.getsize(large) == HEADER.size + 2 * 2 * 8
+    loaded = TreeNode.parse_files(filename=large, format="binary")
+    assert_same_tree(loaded, large_tree)
+
+
+def test_binary_header_is_little_endian(tmp_path):
+    """The header and the values are stored little-endian."""
+    TreeNode(1, TreeNode(2)).save_to_disk(
+        str(tmp_path / "tree"), format="binary")
+    with open(str(tmp_path / "tree.tree"), "rb") as f:
+        data = f.read()
+    assert data[:HEADER.size] == b"BTRE\x01\x04\x01\x00" + struct.pack(
+        "<Q", 2)
+    assert data[HEADER.size:] == struct.pack("<4i", 2, 1, 1, 2)
+
+
+def test_binary_value_too_large(tmp_path):
+    """Values beyond 64 bits can't be stored in the binary format."""
+    with pytest.raises(InvalidValueError):
+        TreeNode(2 ** 64).save_to_disk(
+            str(tmp_path / "tree"), format="binary")
+
+
+def test_binary_needs_inorder(tmp_path, longer_tree):
+    """The binary format always holds the inorder traversal."""
+    with pytest.raises(InsufficientTraversalInformation):
+        longer_tree.save_to_disk(
+            str(tmp_path / "tree"), inorder=False, format="binary")
+
+
+@pytest.mark.parametrize("data", [
+    b"BTRE",
+    b"XXXX\x01\x04\x01\x00" + struct.pack("<Q", 1) + b"\x00" * 8,
+    b"BTRE\x02\x04\x01\x00" + struct.pack("<Q", 1) + b"\x00" * 8,
+    b"BTRE\x01\x03\x01\x00" + struct.pack("<Q", 1) + b"\x00" * 8,
+    b"BTRE\x01\x04\x01\x00" + struct.pack("<Q", 2) + b"\x00" * 8,
+])
+def test_binary_invalid_files(tmp_path, data):
+    """Short, foreign, unknown, corrupt or truncated files are rejected."""
+    path = tmp_path / "tree.tree"
+    path.write_bytes(data)
+    with pytest.raises(UnsupportedFormatError):
+        TreeNode.parse_files(filename=str(path), format="binary")
+
+
+@pytest.mark.parametrize("data, message", [
+    (b"BTRE", "tree is too short to be a binary tree file."),
+    (b"XXXX\x01\x04\x01\x00" + bytes(8), "tree is not a binary tree file."),
+    (b"BTRE\x02\x04\x01\x00" + bytes(8),
+     "tree is a version 2 binary tree file, only version 1 is supported."),
+])
+def test_header_errors(data, message):
+    """Every binary format checks its header with unpack_header."""
+    with pytest.raises(UnsupportedFormatError) as error:
+        unpack_header(data, HEADER, b"BTRE", 1, "binary tree file", "tree")
+    assert str(error.value) == message
+
+
+def test_unknown_format(tmp_path, longer_tree):
+    """Only the text and binary formats are implemented."""
+    with pytest.raises(UnsupportedFormatError):
+        longer_tree.save_to_disk(str(tmp_path / "tree"), format="json")
+    with pytest.raises(UnsupportedFormatError):
+        TreeNode.parse_files(
+            preorder="tree.preorder", inorder="tree.inorder", format="json")
+
+
+@pytest.mark.parametrize("order", ["preorder", "postorder"])
+def test_memory_mapped_load(tmp_path, longer_tree, order):
+    """A binary file can be loaded straight from its memory map."""
+    prefix = str(tmp_path / "tree")
+    longer_tree.save_to_disk(
+        prefix, preorder=order == "preorder",
+        postorder=order == "postorder", format="binary")
+    loaded = TreeNode.parse_files(
+        filename=prefix + ".tree", format="binary", memory_map=True)
+    assert_same_tree(loaded, longer_tree)
+
+
+def test_mapped_traversals(tmp_path, longer_tree):
+    """The mapped traversals are read-only views, released on close."""
+    prefix = str(tmp_path / "tree")
+    longer_tree.save_to_disk(prefix, format="binary")
+    with MappedTraversals(prefix + ".tree") as mapped:
+        assert mapped.order == "preorder"
+        assert len(mapped) == 15
+        assert list(mapped.inorder) == TreeNode.traverse(
+            longer_tree, mode="inorder")
+        assert list(mapped.traversal) == TreeNode.traverse(
+            longer_tree, mode="preorder")
+        inorder = mapped.inorder
+        if isinstance(inorder, memoryview):
+            assert inorder.readonly
+    if isinstance(inorder, memoryview):
+        with pytest.raises(ValueError):
+            inorder[0]
+
+
+def test_mapped_truncated(tmp_path, longer_tree):
+    """A truncated file is rejected before being mapped."""
+    path = tmp_path / "tree.tree"
+    longer_tree.save_to_disk(str(tmp_path / "tree"), format="binary")
+    path.write_bytes(path.read_bytes()[:-1])
+    with pytest.raises(UnsupportedFormatError):
+        MappedTraversals(str(path))
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import pytest
+
+from binary_tree import ArrayTree, TreeNode, builders
+from binary_tree.cached import CachedTreeNode
+from binary_tree.exceptions import InvalidValueError
+from binary_tree.indexed import IndexedTreeNode
+from binary_tree.vectorized import depths
+
+
+def height(tree):
+    """Returns the number of levels of a tree of any class."""
+    if not isinstance(tree, ArrayTree):
+        tree = ArrayTree.from_tree_node(tree)
+    return max(depths(tree)) + 1
+
+
+@pytest.mark.parametrize(
+    "tree_class", [TreeNode, ArrayTree, CachedTreeNode, IndexedTreeNode])
+def test_from_sorted(tree_class):
+    values = list(range(0, 2000, 2))
+    tree = builders.from_sorted(values, tree_class=tree_class)
+    assert isinstance(tree, tree_class)
+    if tree_class is ArrayTree:
+        assert tree.traverse("inorder") == values
+    else:
+        assert TreeNode.traverse(tree, "inorder") == values
+    assert height(tree) == 10
+    assert builders.from_sorted([]) is None
+    with pytest.raises(InvalidValueError):
+        builders.from_sorted([1, 2.5])
+
+
+def test_from_level_order():
+    tree = builders.from_level_order([1, None, 2, 3])
+    assert TreeNode.traverse(tree) == [1, 2, 3]
+    assert tree.left_child is None and tree.right_child.left_child.value == 3
+    tree = builders.from_level_order(
+        [25, 15, 50, 10, 22, 35, 70, 4, 12, 18, 24, 31, 44, 66, 90, None])
+    assert TreeNode.traverse(tree, "postorder") == [
+        4, 12, 10, 18, 24, 22, 15, 31, 44, 35, 66, 90, 70, 50, 25]
+    assert builders.from_level_order([]) is None
+    assert builders.from_level_order([None]) is None
+    array_tree = builders.from_level_order(
+        [1, 2, 3, None, 4], tree_class=ArrayTree)
+    assert array_tree.traverse("inorder") == [2, 4, 1, 3]
+    with pytest.raises(InvalidValueError):
+        builders.from_level_order([1, None, None, 2])
+    with pytest.raises(InvalidValueError):
+        builders.from_level_order([1, "2"])
+
+
+@pytest.mark.parametrize("shape", sorted(builders.SHAPES))
+def test_random_tree(shape):
+    """Trees of every shape have unique values, and are the same for the
+    same seed."""
+    tree = builders.random_tree(5000, shape=shape, seed=1)
+    values = TreeNode.traverse(tree)
+    assert sorted(values) == list(range(5000))
+    assert values == TreeNode.traverse(
+        builders.random_tree(5000, shape=shape, seed=1))
+    expected = {"balanced": 13, "left": 5000, "right": 5000, "zigzag": 5000,
+                "spine": 2501}
+    if shape in expected:
+        assert height(tree) == expected[shape]
+
+
+def test_random_tree_errors():
+    assert builders.random_tree(0) is None
+    with pytest.raises(InvalidValueError):
+        builders.random_tree(10, shape="triangle")
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import pytest
+
+from binary_tree import TreeNode
+from binary_tree.builders import random_tree
+from binary_tree.cached import CachedTreeNode
+from binary_tree.exceptions import InvalidChildError, InvalidTraversalMode
+from tests.conftest import INORDER, POSTORDER, PREORDER
+
+
+def check(node):
+    """Checks the traversals of a tree, cached or not, against those of a
+    copy of it made of TreeNode objects."""
+    copy = TreeNode.load(
+        preorder=list(TreeNode.iter_traverse(node, "preorder")),
+        inorder=list(TreeNode.iter_traverse(node, "inorder")))
+    for mode in ("preorder", "inorder", "postorder"):
+        assert TreeNode.traverse(node, mode) == TreeNode.traverse(copy, mode)
+
+
+def test_cache_hits():
+    node = CachedTreeNode.load(preorder=PREORDER, inorder=INORDER)
+    assert node.cached == ()
+    assert TreeNode.traverse(node, "postorder") == POSTORDER
+    assert node.cached == ("postorder",)
+    assert node.traversal("postorder") is node.traversal("postorder")
+    assert list(CachedTreeNode.iter_traverse(node, "inorder")) == INORDER
+    assert node.left_child.cached == ()
+    assert [child.value for child in CachedTreeNode.iter_traverse(
+        node, nodes=True)] == PREORDER
+    with pytest.raises(InvalidTraversalMode):
+        node.traversal("levelorder")
+
+
+def test_invalidation():
+    """A change clears the caches of the node and of its ancestors, and of
+    nothing else."""
+    node = CachedTreeNode.load(postorder=POSTORDER, inorder=INORDER)
+    left = node.left_child
+    right = node.right_child
+    for child in (node, left, right, right.right_child):
+        child.traversal("inorder")
+    right.right_child.value = 71
+    assert node.cached == right.cached == right.right_child.cached == ()
+    assert left.cached == ("inorder",)
+    assert TreeNode.traverse(node, "inorder") == INORDER[:13] + [71, 90]
+    node.left_child = CachedTreeNode(5, CachedTreeNode(3))
+    assert left.parent is None and left.cached == ("inorder",)
+    check(node)
+    # Moving a subtree out of a cached tree clears the caches of both.
+    left.traversal("preorder")
+    node.left_child.right_child = left.right_child
+    assert left.cached == ()
+    check(node)
+    check(left)
+
+
+def test_subtree_reuse():
+    """The traversal of a node is built from the cached traversals of its
+    subtrees."""
+    node = CachedTreeNode.load(preorder=PREORDER, inorder=INORDER)
+    for mode in ("preorder", "inorder", "postorder"):
+        node.right_child.traversal(mode)
+    # A stale value in the cache of a subtree shows it is reused.
+    node.right_child._value = 0
+    assert TreeNode.traverse(node, "inorder") == INORDER
+    assert TreeNode.traverse(node, "postorder") == POSTORDER
+    assert TreeNode.traverse(node) == PREORDER
+
+
+@pytest.mark.parametrize("format", ["text", "binary", "succinct"])
+def test_save_to_disk(format, tmp_path):
+    prefix = str(tmp_path / "tree")
+    node = CachedTreeNode.load(preorder=PREORDER, inorder=INORDER)
+    node.save_to_disk(prefix, format=format)
+    assert node.cached == (
+        ("succinct",) if format == "succinct" else ("preorder", "inorder"))
+    node.save_to_disk(prefix, format=format)
+    loaded = CachedTreeNode.parse_files(
+        preorder=prefix + ".preorder", inorder=prefix + ".inorder",
+        format=format,
+        filename=prefix + (".tree" if format == "binary" else ".succinct"))
+    assert isinstance(loaded, CachedTreeNode)
+    assert TreeNode.traverse(loaded, "postorder") == POSTORDER
+
+
+def test_tracked_children():
+    node = CachedTreeNode.load(preorder=PREORDER, inorder=INORDER)
+    with pytest.raises(InvalidChildError):
+        node.left_child.left_child = node
+    with pytest.raises(InvalidChildError):
+        node.left_child = TreeNode(1)
+    child = node.left_child.left_child
+    node.right_child = child
+    assert child.parent is node and node.left_child.left_child is None
+    assert child.root is node and node.parent is None
+    check(node)
+
+
+class CountingTreeNode(CachedTreeNode):
+    """Counts the values read, one for every node walked."""
+
+    __slots__ = ("_counted_value",)
+    reads = 0
+
+    @property
+    def _value(self):
+        CountingTreeNode.reads += 1
+        return self._counted_value
+
+    @_value.setter
+    def _value(self, value):
+        self._counted_value = value
+
+
+def test_walks_after_change():
+    """After a leaf changes, only the nodes close to its path are walked
+    again, since the subtrees walked by the first traversal were cached."""
+    node = random_tree(20000, seed=1, tree_class=CountingTreeNode)
+    for mode in ("preorder", "inorder", "postorder"):
+        node.traversal(mode)
+    leaf = node
+    while leaf.left_child is not None or leaf.right_child is not None:
+        leaf = leaf.left_child or leaf.right_child
+    leaf.value = -1
+    for mode in ("preorder", "inorder", "postorder"):
+        CountingTreeNode.reads = 0
+        node.traversal(mode)
+        assert CountingTreeNode.reads < 2000
+    check(node)
+
+
+def test_subtrees_cached_on_the_way():
+    """The traversals cached on the way stay right through changes."""
+    node = random_tree(3000, seed=2, tree_class=CachedTreeNode)
+    nodes = list(CachedTreeNode.iter_traverse(node, nodes=True))
+    for step in range(20):
+        check(node)
+        changed = nodes[(step * 7919) % len(nodes)]
+        if step % 2:
+            changed.value = -step
+        else:
+            changed.right_child = CachedTreeNode(step)
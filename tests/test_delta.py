@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+from binary_tree import TreeNode, delta
+from binary_tree.builders import random_tree
+from binary_tree.delta import DeltaTreeNode
+from binary_tree.exceptions import UnsupportedFormatError
+from binary_tree.interning import save_dag
+from tests.conftest import INORDER, PREORDER
+
+
+def reload(prefix, format="text"):
+    """Loads the base and delta log saved under a prefix."""
+    if format == "text":
+        return DeltaTreeNode.parse_files(
+            preorder=prefix + ".preorder", inorder=prefix + ".inorder",
+            delta=prefix + ".delta")
+    extension = {"binary": ".tree", "succinct": ".succinct"}[format]
+    return DeltaTreeNode.parse_files(
+        filename=prefix + extension, format=format, delta=prefix + ".delta")
+
+
+def mutate(node):
+    """Changes a value, removes a subtree and moves another one."""
+    node.left_child.left_child.value = 5
+    moved = node.right_child.left_child
+    node.right_child.right_child.right_child = None
+    node.left_child.right_child.left_child.left_child = moved
+    node.right_child.left_child = DeltaTreeNode(40, right=DeltaTreeNode(45))
+
+
+@pytest.mark.parametrize("format", ["text", "binary", "succinct"])
+def test_save_delta(tmp_path, format):
+    prefix = str(tmp_path / "tree")
+    node = DeltaTreeNode.load(preorder=PREORDER, inorder=INORDER)
+    node.save_to_disk(prefix, format=format)
+    assert node.save_delta(prefix) == 0
+    mutate(node)
+    assert node.save_delta(prefix) == 4
+    node.value = 26
+    node.right_child.left_child.right_child.value = 46
+    assert node.save_delta(prefix) == 2
+    loaded = reload(prefix, format)
+    for mode in ("preorder", "inorder", "postorder"):
+        assert TreeNode.traverse(loaded, mode) == TreeNode.traverse(
+            node, mode)
+    # Nothing is left to save once replayed.
+    assert loaded.save_delta(prefix) == 0
+
+
+def test_replay_into_tree_nodes(tmp_path):
+    prefix = str(tmp_path / "tree")
+    node = DeltaTreeNode.load(preorder=PREORDER, inorder=INORDER)
+    node.save_to_disk(prefix)
+    mutate(node)
+    node.save_delta(prefix)
+    plain = TreeNode.parse_files(
+        preorder=prefix + ".preorder", inorder=prefix + ".inorder")
+    assert delta.replay(plain, prefix + ".delta") == 4
+    assert type(plain.right_child.left_child) is TreeNode
+    assert TreeNode.traverse(plain) == TreeNode.traverse(node)
+
+
+def test_checkpoint_walks_changes_only(tmp_path):
+    """A checkpoint only encodes what changed, however large the tree."""
+    prefix = str(tmp_path / "tree")
+    node = random_tree(20000, seed=3, tree_class=DeltaTreeNode)
+    node.save_to_disk(prefix, format="binary")
+    size = os.path.getsize(prefix + ".delta")
+    leaf = node
+    while leaf.left_child is not None:
+        leaf = leaf.left_child
+    leaf.value = -1
+    leaf.left_child = DeltaTreeNode(-2)
+    assert node.save_delta(prefix) == 2
+    assert os.path.getsize(prefix + ".delta") - size < 100
+    assert TreeNode.traverse(reload(prefix, "binary")) == TreeNode.traverse(
+        node)
+
+
+def test_compact(tmp_path):
+    prefix = str(tmp_path / "tree")
+    node = DeltaTreeNode.load(preorder=PREORDER, inorder=INORDER)
+    node.save_to_disk(prefix, format="succinct")
+    mutate(node)
+    node.save_delta(prefix)
+    compacted = delta.compact(prefix, format="succinct")
+    assert TreeNode.traverse(compacted) == TreeNode.traverse(node)
+    _, records = delta.read_log(prefix + ".delta")
+    assert records == []
+    assert TreeNode.traverse(reload(prefix, "succinct")) == (
+        TreeNode.traverse(node))
+
+
+def test_interrupted_saves(tmp_path):
+    prefix = str(tmp_path / "tree")
+    node = DeltaTreeNode.load(preorder=PREORDER, inorder=INORDER)
+    node.save_to_disk(prefix)
+    node.value = 26
+    node.save_delta(prefix)
+    # A checkpoint cut short before its header was updated is ignored.
+    with open(prefix + ".delta", "ab") as f:
+        f.write(b"\x02garbage")
+    assert reload(prefix).value == 26
+    node.value = 27
+    node.save_delta(prefix)
+    assert reload(prefix).value == 27
+    # A compaction which didn't get to replace the log leaves a log that
+    # doesn't match the new base.
+    node.left_child = None
+    TreeNode.load(
+        preorder=TreeNode.traverse(node),
+        inorder=TreeNode.traverse(node, "inorder")).save_to_disk(prefix)
+    with pytest.warns(UserWarning):
+        loaded = reload(prefix)
+    assert TreeNode.traverse(loaded) == TreeNode.traverse(node)
+
+
+def test_invalid_logs(tmp_path):
+    path = str(tmp_path / "tree.delta")
+    with open(path, "wb") as f:
+        f.write(b"BTRS" + bytes(28))
+    with pytest.raises(UnsupportedFormatError):
+        delta.read_log(path)
+    with open(path, "wb") as f:
+        f.write(delta.HEADER.pack(delta.MAGIC, delta.VERSION, 0, 0, 0, 64))
+    with pytest.raises(UnsupportedFormatError):
+        delta.read_log(path)
+    # A DAG file isn't mistaken for a delta log.
+    save_dag(TreeNode(1), path)
+    with pytest.raises(UnsupportedFormatError):
+        delta.read_log(path)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+from binary_tree import ArrayTree, TreeNode
+from binary_tree.exceptions import InvalidValueError, UnsupportedFormatError
+from binary_tree.forest import (
+    Forest, ForestWriter, load_forest, save_forest)
+from tests.conftest import INORDER, PREORDER
+
+
+@pytest.fixture
+def trees(longer_tree):
+    """Returns a few trees by key, one of them with repeated values."""
+    return {
+        "longer": longer_tree,
+        "single": TreeNode(7),
+        "repeated": TreeNode(1, TreeNode(1, TreeNode(1)), TreeNode(1)),
+        "array": ArrayTree.load(preorder=PREORDER[:3], inorder=[10, 15, 25]),
+    }
+
+
+def traversals(tree):
+    if isinstance(tree, ArrayTree):
+        tree = tree.to_tree_node()
+    return [TreeNode.traverse(tree, mode=mode)
+            for mode in ("preorder", "inorder", "postorder")]
+
+
+def test_round_trip(tmp_path, trees):
+    """Every tree is loaded back under its key, in the order written."""
+    path = str(tmp_path / "trees.forest")
+    save_forest(path, trees)
+    loaded = load_forest(path)
+    assert list(loaded) == list(trees)
+    for key, tree in trees.items():
+        assert traversals(loaded[key]) == traversals(tree)
+
+
+def test_random_access(tmp_path, trees):
+    """A single tree is loaded by key, as a tree of the requested class."""
+    path = str(tmp_path / "trees.forest")
+    save_forest(path, trees.items())
+    with Forest(path, tree_class=ArrayTree) as forest:
+        assert len(forest) == len(trees)
+        assert "single" in forest and "missing" not in forest
+        assert forest["repeated"].traverse("postorder") == [1, 1, 1, 1]
+        assert forest["longer"].traverse("inorder") == INORDER
+        with pytest.raises(KeyError):
+            forest["missing"]
+
+
+def test_many_trees(tmp_path):
+    """Many small trees are stored in a single file."""
+    path = str(tmp_path / "trees.forest")
+    with ForestWriter(path, atomic=True) as writer:
+        for index in range(1000):
+            writer.add(str(index), TreeNode(index, TreeNode(-index)))
+    assert os.listdir(str(tmp_path)) == ["trees.forest"]
+    with Forest(path) as forest:
+        assert TreeNode.traverse(forest["999"]) == [999, -999]
+        assert [TreeNode.traverse(tree)[0]
+                for key, tree in forest.iter_trees()] == list(range(1000))
+
+
+def test_invalid_keys(tmp_path):
+    with ForestWriter(str(tmp_path / "trees.forest")) as writer:
+        writer.add("tree", TreeNode(1))
+        with pytest.raises(InvalidValueError):
+            writer.add("tree", TreeNode(2))
+        with pytest.raises(InvalidValueError):
+            writer.add(3, TreeNode(3))
+
+
+def test_failed_atomic_write(tmp_path, trees):
+    """A forest that fails to be written leaves the previous one intact."""
+    path = str(tmp_path / "trees.forest")
+    save_forest(path, trees)
+    with pytest.raises(RuntimeError):
+        with ForestWriter(path, atomic=True) as writer:
+            writer.add("tree", TreeNode(1))
+            raise RuntimeError
+    assert list(load_forest(path)) == list(trees)
+    assert os.listdir(str(tmp_path)) == ["trees.forest"]
+
+
+def test_not_a_forest(tmp_path):
+    path = str(tmp_path / "tree")
+    TreeNode(1, TreeNode(2)).save_to_disk(path, format="succinct")
+    with pytest.raises(UnsupportedFormatError):
+        Forest(path + ".succinct")
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import pytest
+
+from binary_tree import TreeNode
+from binary_tree.hashing import (
+    EMPTY, matches_files, structural_hash, trees_equal)
+from tests.conftest import INORDER, PREORDER
+
+
+def test_trees_equal(longer_tree):
+    """Trees are equal when their shapes and values are."""
+    copy = TreeNode.load(preorder=PREORDER, inorder=INORDER)
+    assert trees_equal(longer_tree, copy)
+    assert trees_equal(longer_tree, longer_tree)
+    copy.right_child.right_child.value = 91
+    assert not trees_equal(longer_tree, copy)
+    # The same values in a different shape.
+    assert not trees_equal(
+        TreeNode(1, TreeNode(2)), TreeNode(1, None, TreeNode(2)))
+    assert not trees_equal(longer_tree, None)
+
+
+def test_structural_hash(longer_tree):
+    """Equal trees have the same digest, different trees don't."""
+    copy = TreeNode.load(preorder=PREORDER, inorder=INORDER)
+    assert structural_hash(longer_tree) == structural_hash(copy)
+    assert len(structural_hash(longer_tree)) == 16
+    assert structural_hash(TreeNode(1, TreeNode(2))) != structural_hash(
+        TreeNode(1, None, TreeNode(2)))
+    assert structural_hash(TreeNode(12)) != structural_hash(
+        TreeNode(1, TreeNode(2)))
+    assert structural_hash(None) == EMPTY
+
+
+def test_cache(longer_tree):
+    """The digest of every subtree is cached, and matches the digest of the
+    subtree computed on its own."""
+    cache = {}
+    digest = structural_hash(longer_tree, cache=cache)
+    assert len(cache) == len(PREORDER)
+    assert cache[longer_tree.left_child] == structural_hash(
+        longer_tree.left_child)
+    # A cached subtree isn't walked again.
+    cache[longer_tree.left_child] = EMPTY
+    del cache[longer_tree]
+    assert structural_hash(longer_tree, cache=cache) != digest
+
+
+def test_shared_subtrees():
+    """A subtree referenced twice is hashed like two copies of it."""
+    shared = TreeNode(2, TreeNode(3))
+    first = TreeNode(1, shared, TreeNode(4, shared))
+    second = TreeNode(
+        1, TreeNode(2, TreeNode(3)), TreeNode(4, TreeNode(2, TreeNode(3))))
+    assert structural_hash(first) == structural_hash(second)
+    assert structural_hash(first, cache={}) == structural_hash(second)
+
+
+def test_deep_tree():
+    """Degenerate trees don't hit the recursion limit."""
+    node = None
+    for value in range(20000):
+        node = TreeNode(value, node)
+    assert trees_equal(node, TreeNode.load(
+        preorder=TreeNode.traverse(node),
+        inorder=TreeNode.traverse(node, mode="inorder")))
+    assert structural_hash(node) == structural_hash(node, cache={})
+
+
+@pytest.mark.parametrize("format", ["text", "binary", "succinct"])
+def test_matches_files(tmp_path, longer_tree, format):
+    """A dump matches the tree it was written from, and no other tree."""
+    prefix = str(tmp_path / "tree")
+    longer_tree.save_to_disk(prefix, format=format)
+    if format == "text":
+        files = {
+            "preorder": prefix + ".preorder", "inorder": prefix + ".inorder"}
+    else:
+        extension = ".tree" if format == "binary" else ".succinct"
+        files = {"filename": prefix + extension}
+    assert matches_files(longer_tree, format=format, **files)
+    longer_tree.left_child.left_child.value = 11
+    assert not matches_files(longer_tree, format=format, **files)
+    assert not matches_files(TreeNode(25), format=format, **files)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import pytest
+
+from binary_tree import TreeNode, indexed
+from binary_tree.exceptions import InvalidChildError, InvalidValueError
+from binary_tree.indexed import IndexedTreeNode
+from tests.conftest import INORDER, POSTORDER, PREORDER
+
+
+def check(node):
+    """Checks the parents, sizes, index and positions of a whole tree
+    against a traversal of it."""
+    nodes = list(TreeNode.iter_traverse(node, "inorder", nodes=True))
+    assert node.parent is None and node.size == len(nodes)
+    for position, child in enumerate(nodes):
+        assert child.find(child.value) is child
+        assert child.position == position
+        assert node.kth(position) is child
+        for grandchild in (child.left_child, child.right_child):
+            if grandchild is not None:
+                assert grandchild.parent is child
+        assert child.size == len(TreeNode.traverse(child))
+    assert len(node._index.nodes) == len(nodes)
+
+
+@pytest.mark.parametrize("order", ["preorder", "postorder"])
+def test_load(order):
+    traversal = PREORDER if order == "preorder" else POSTORDER
+    node = indexed.load(inorder=INORDER, **{order: traversal})
+    assert isinstance(node, IndexedTreeNode)
+    assert TreeNode.traverse(node, "postorder") == POSTORDER
+    check(node)
+    assert node.find(66).parent.value == 70
+    assert node.find(67) is None
+    assert node.rank(44) == 10
+    assert node.find(50).kth(0).value == 31
+    with pytest.raises(InvalidValueError):
+        node.rank(67)
+    with pytest.raises(IndexError):
+        node.kth(15)
+
+
+@pytest.mark.parametrize("format", ["text", "binary", "succinct"])
+def test_parse_files(format, tmp_path, longer_tree):
+    prefix = str(tmp_path / "tree")
+    longer_tree.save_to_disk(prefix, format=format)
+    node = indexed.parse_files(
+        preorder=prefix + ".preorder", inorder=prefix + ".inorder",
+        format=format,
+        filename=prefix + (".tree" if format == "binary" else ".succinct"))
+    assert TreeNode.traverse(node) == PREORDER
+    check(node)
+
+
+def test_reassignment():
+    """Moving subtrees around keeps every tree consistent."""
+    node = indexed.load(preorder=PREORDER, inorder=INORDER)
+    left, right = node.left_child, node.right_child
+    # Moving a subtree within the tree.
+    node.find(4).left_child = node.find(70)
+    check(node)
+    assert right.size == 4
+    # Replacing a subtree, which becomes a tree of its own.
+    node.left_child = None
+    check(node)
+    check(left)
+    assert node.find(15) is None and left.find(15) is left
+    assert node.size == 5 and left.size == 10
+    # Adding a new subtree.
+    node.left_child = IndexedTreeNode(5, IndexedTreeNode(3))
+    check(node)
+    assert node.rank(25) == 2
+    node.find(3).value = 1
+    assert node.find(3) is None and node.find(1).value == 1
+
+
+def test_invalid_reassignment():
+    node = indexed.load(preorder=PREORDER, inorder=INORDER)
+    with pytest.raises(InvalidChildError):
+        node.find(4).left_child = node
+    with pytest.raises(InvalidChildError):
+        node.left_child = TreeNode(5)
+    with pytest.raises(InvalidValueError):
+        node.left_child.left_child = IndexedTreeNode(90)
+    with pytest.raises(InvalidValueError):
+        node.find(4).value = 90
+    # Values of the replaced subtree can come back.
+    node.left_child = IndexedTreeNode(
+        10, IndexedTreeNode(4), IndexedTreeNode(12))
+    check(node)
+
+
+def test_repeated_values():
+    with pytest.raises(InvalidValueError):
+        IndexedTreeNode._from_links([1, 1], [1, -1], [-1, -1], 0)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+from binary_tree import ArrayTree, TreeNode
+from binary_tree.instrumentation import (
+    NULL_INSTRUMENTATION, Instrumentation)
+from binary_tree.reconstruction import depth
+from tests.conftest import INORDER, PREORDER
+
+
+def test_save_text(tmp_path, longer_tree):
+    """Saving records the walk, the formatting and the writing of the
+    values, and the bytes written."""
+    prefix = str(tmp_path / "tree")
+    instrumentation = Instrumentation()
+    longer_tree.save_to_disk(prefix, instrumentation=instrumentation)
+    operation, = instrumentation.operations
+    assert operation.name == "save_to_disk"
+    assert list(operation.phases) == ["traverse", "format", "write"]
+    for phase in operation.phases.values():
+        assert phase.nodes == len(PREORDER)
+        assert phase.seconds > 0
+    written = sum(
+        os.path.getsize(prefix + extension)
+        for extension in (".preorder", ".inorder"))
+    assert operation.phases["write"].bytes_written == written
+
+
+@pytest.mark.parametrize("format,extension", [
+    ("binary", ".tree"), ("succinct", ".succinct")])
+def test_save_single_file(tmp_path, longer_tree, format, extension):
+    """The single file formats report the size of their file."""
+    prefix = str(tmp_path / "tree")
+    instrumentation = Instrumentation()
+    longer_tree.save_to_disk(
+        prefix, format=format, instrumentation=instrumentation)
+    phases = instrumentation.operations[0].phases
+    assert phases["write"].bytes_written == os.path.getsize(
+        prefix + extension)
+    assert phases["write"].nodes == len(PREORDER)
+
+
+@pytest.mark.parametrize("format", ["text", "binary"])
+@pytest.mark.parametrize("tree_class", [TreeNode, ArrayTree])
+def test_save_depth(tmp_path, longer_tree, format, tree_class):
+    """The walk of a save records how deep its stack went."""
+    tree = longer_tree
+    if tree_class is ArrayTree:
+        tree = ArrayTree.from_tree_node(longer_tree)
+    instrumentation = Instrumentation()
+    tree.save_to_disk(
+        str(tmp_path / "tree"), preorder=False, postorder=True,
+        format=format, instrumentation=instrumentation)
+    assert instrumentation.operations[0].phases["traverse"].max_depth == 4
+
+
+def test_save_depth_of_left_spine(tmp_path):
+    """Without the postorder, the stack holds the left spine."""
+    size = 5000
+    tree = ArrayTree(
+        list(range(size)), list(range(1, size)) + [-1], [-1] * size)
+    instrumentation = Instrumentation()
+    tree.to_tree_node().save_to_disk(
+        str(tmp_path / "tree"), instrumentation=instrumentation)
+    assert instrumentation.operations[0].phases["traverse"].max_depth == size
+
+
+@pytest.mark.parametrize("format,memory_map", [
+    ("text", False), ("binary", False), ("binary", True),
+    ("succinct", False)])
+def test_parse_is_one_operation(tmp_path, longer_tree, format, memory_map):
+    """Parsing records the reading of the files and the load of the tree as
+    a single operation, along with the depth of the tree."""
+    prefix = str(tmp_path / "tree")
+    longer_tree.save_to_disk(prefix, format=format)
+    instrumentation = Instrumentation()
+    if format == "text":
+        TreeNode.parse_files(
+            preorder=prefix + ".preorder", inorder=prefix + ".inorder",
+            instrumentation=instrumentation)
+    else:
+        extension = ".tree" if format == "binary" else ".succinct"
+        TreeNode.parse_files(
+            format=format, filename=prefix + extension,
+            memory_map=memory_map, instrumentation=instrumentation)
+    operation, = instrumentation.operations
+    assert operation.name == "parse_files"
+    assert list(operation.phases)[1:] == ["reconstruct", "build"]
+    assert operation.phases["reconstruct"].max_depth == 4
+    for phase in operation.phases.values():
+        assert phase.nodes == len(PREORDER)
+    if not memory_map:
+        assert list(operation.phases.values())[0].bytes_read > 0
+
+
+def test_load_and_callback():
+    """Every completed operation is handed to the callback, for ArrayTree
+    objects too."""
+    operations = []
+    instrumentation = Instrumentation(callback=operations.append, keep=2)
+    TreeNode.load(
+        preorder=PREORDER, inorder=INORDER, instrumentation=instrumentation)
+    ArrayTree.load(
+        preorder=PREORDER, inorder=INORDER, instrumentation=instrumentation)
+    assert operations == list(instrumentation.operations)
+    assert [operation.name for operation in operations] == ["load", "load"]
+    report = instrumentation.report()
+    assert [phase["name"] for phase in report[0]["phases"]] == [
+        "reconstruct", "build"]
+    assert report[1]["phases"][0]["max_depth"] == 4
+
+
+def test_depth():
+    """The depth of a degenerate tree is its size."""
+    size = 5000
+    left = list(range(1, size)) + [-1]
+    assert depth(left, [-1] * size, 0) == size
+    assert depth([], [], 0) == 0
+
+
+def test_disabled():
+    """Without instrumentation, nothing is recorded."""
+    with NULL_INSTRUMENTATION.operation("load") as operation:
+        with operation.phase("build") as phase:
+            phase.nodes += 10
+    assert phase.nodes == 0
+
+
+def test_kept_operations():
+    """Only the last operations are kept, and none are by default when a
+    callback consumes them."""
+    instrumentation = Instrumentation(keep=2)
+    for _ in range(3):
+        TreeNode.load(
+            preorder=PREORDER, inorder=INORDER,
+            instrumentation=instrumentation)
+    assert len(instrumentation.operations) == 2
+    operations = []
+    instrumentation = Instrumentation(callback=operations.append)
+    TreeNode.load(
+        preorder=PREORDER, inorder=INORDER, instrumentation=instrumentation)
+    assert len(operations) == 1 and not instrumentation.operations
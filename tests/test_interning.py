@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+from binary_tree import ArrayTree, TreeNode, shared, vectorized
+from binary_tree.exceptions import InconsistentTraversalError
+from binary_tree.hashing import trees_equal
+from binary_tree.interning import (
+    intern_tree, load_dag, save_dag, unique_nodes)
+from tests.conftest import INORDER, POSTORDER, PREORDER
+
+
+def repeated_tree(depth):
+    """Returns a perfect tree in which every node holds its depth, so all the
+    subtrees of a level are identical, though made of distinct nodes."""
+    level = [TreeNode(depth) for _ in range(2 ** depth)]
+    for value in range(depth - 1, -1, -1):
+        level = [
+            TreeNode(value, level[index], level[index + 1])
+            for index in range(0, len(level), 2)]
+    return level[0]
+
+
+def test_intern_tree():
+    """Identical subtrees are collapsed into one node per level."""
+    tree = repeated_tree(9)
+    assert unique_nodes(tree) == 2 ** 10 - 1
+    interned = intern_tree(tree)
+    assert unique_nodes(interned) == 10
+    assert trees_equal(tree, interned)
+    for mode in ("preorder", "inorder", "postorder"):
+        assert TreeNode.traverse(interned, mode) == TreeNode.traverse(
+            tree, mode)
+
+
+def test_unique_tree_is_unchanged(longer_tree):
+    """A tree without repeated subtrees keeps all its nodes."""
+    tree = longer_tree
+    interned = intern_tree(tree)
+    assert interned is not tree
+    assert unique_nodes(interned) == len(PREORDER)
+    assert trees_equal(tree, interned)
+
+
+def test_intern_dag():
+    """A tree that already shares nodes is interned further."""
+    leaf = TreeNode(3)
+    tree = TreeNode(1, TreeNode(2, leaf), TreeNode(2, TreeNode(3)))
+    interned = intern_tree(tree)
+    assert interned.left_child is interned.right_child
+    assert unique_nodes(interned) == 3
+
+
+@pytest.mark.parametrize("tree_class", [TreeNode, ArrayTree])
+def test_save_and_load(tmp_path, tree_class):
+    """A DAG file stores every unique subtree once, and loads back either
+    shared or expanded."""
+    tree = repeated_tree(12)
+    path = str(tmp_path / "tree.dag")
+    save_dag(tree, path)
+    text_prefix = str(tmp_path / "tree")
+    tree.save_to_disk(text_prefix, format="binary")
+    assert os.path.getsize(path) * 50 < os.path.getsize(
+        text_prefix + ".tree")
+
+    shared = load_dag(path, tree_class=tree_class)
+    expanded = load_dag(path, expand=True, tree_class=tree_class)
+    if tree_class is ArrayTree:
+        assert len(shared) == 13
+        assert len(expanded) == 2 ** 13 - 1
+        shared, expanded = shared.to_tree_node(), expanded.to_tree_node()
+    assert unique_nodes(shared) == 13
+    assert unique_nodes(expanded) == 2 ** 13 - 1
+    assert trees_equal(shared, tree)
+    assert trees_equal(expanded, tree)
+
+
+def test_array_tree_links(tmp_path, longer_tree):
+    """The 4 byte links of a small DAG file are loaded into an ArrayTree as
+    64 bit links, which the vectorized and shared memory code expect."""
+    path = str(tmp_path / "tree.dag")
+    save_dag(longer_tree, path)
+    tree = load_dag(path, tree_class=ArrayTree)
+    assert tree.left.typecode == tree.right.typecode == "q"
+    assert list(vectorized.traverse(tree, "inorder")) == INORDER
+    assert list(vectorized.subtree_sizes(tree))[tree.root] == len(INORDER)
+    published = shared.publish(tree)
+    try:
+        with shared.attach(published.name) as attached:
+            assert attached.tree.traverse("postorder") == POSTORDER
+    finally:
+        published.unlink()
+
+
+def test_deep_tree(tmp_path):
+    """Degenerate trees don't hit the recursion limit."""
+    node = None
+    for value in range(20000):
+        node = TreeNode(value % 2, node)
+    path = str(tmp_path / "tree.dag")
+    save_dag(node, path)
+    assert trees_equal(load_dag(path), node)
+
+
+def test_corrupt_links(tmp_path):
+    """Links pointing forward, which could make cycles, are rejected."""
+    path = str(tmp_path / "tree.dag")
+    save_dag(TreeNode(1, TreeNode(2)), path)
+    with open(path, "r+b") as f:
+        # The left link of the first subtree, after the header and the two
+        # 4 byte values.
+        f.seek(16 + 8)
+        f.write((1).to_bytes(4, "little"))
+    with pytest.raises(InconsistentTraversalError):
+        load_dag(path)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import pytest
+
+from binary_tree import ArrayTree, TreeNode
+from binary_tree.exceptions import (
+    InconsistentTraversalError, UnsupportedFormatError)
+from binary_tree.hashing import trees_equal
+from binary_tree.lazy import HEADER, RECORD, LazyTree, save_records
+from tests.conftest import INORDER, POSTORDER, PREORDER
+
+
+@pytest.fixture
+def records(tmp_path, longer_tree):
+    """Returns the path of the record file of the longer tree."""
+    path = str(tmp_path / "tree.records")
+    save_records(longer_tree, path)
+    return path
+
+
+def test_traversals(records):
+    """A lazy tree traverses like the tree it was saved from."""
+    with LazyTree(records) as tree:
+        assert len(tree) == len(PREORDER)
+        assert TreeNode.traverse(tree.root) == PREORDER
+        assert TreeNode.traverse(tree.root, "inorder") == INORDER
+        assert TreeNode.traverse(tree.root, "postorder") == POSTORDER
+        assert trees_equal(
+            tree.root, TreeNode.load(preorder=PREORDER, inorder=INORDER))
+
+
+def test_nodes_are_read_on_demand(records):
+    """Only the nodes accessed are read."""
+    with LazyTree(records) as tree:
+        assert tree.resident == 0
+        root = tree.root
+        assert root.value == 25
+        assert tree.resident == 1
+        assert root.right_child.right_child.left_child.value == 66
+        assert tree.resident == 4
+        assert root.right_child is root.right_child
+        assert repr(root) == "<TreeNode [Value: 25] [L: 15 | R: 50]>"
+
+
+def test_eviction(records):
+    """No more than max_resident nodes are kept, evicted nodes being read
+    again when accessed."""
+    with LazyTree(records, max_resident=3) as tree:
+        root = tree.root
+        assert TreeNode.traverse(root, "inorder") == INORDER
+        assert tree.resident == 3
+        assert root.left_child.value == 15
+
+
+def test_read_only(records):
+    with LazyTree(records) as tree:
+        root = tree.root
+        with pytest.raises(AttributeError):
+            root.left_child = None
+        with pytest.raises(AttributeError):
+            root.value = 26
+        assert root.value == 25
+
+
+def test_array_tree_in_postorder(tmp_path):
+    """An ArrayTree laid out in postorder is saved in preorder."""
+    path = str(tmp_path / "tree.records")
+    save_records(ArrayTree.load(postorder=POSTORDER, inorder=INORDER), path)
+    with LazyTree(path) as tree:
+        assert TreeNode.traverse(tree.root) == PREORDER
+
+
+def test_deep_tree(tmp_path):
+    """Degenerate trees don't hit the recursion limit."""
+    node = None
+    for value in range(20000):
+        node = TreeNode(value, None, node)
+    path = str(tmp_path / "tree.records")
+    save_records(node, path)
+    with LazyTree(path, max_resident=10) as tree:
+        assert TreeNode.traverse(tree.root, "postorder") == list(range(20000))
+
+
+def test_corrupt_files(records):
+    with open(records, "r+b") as f:
+        # Make the right child of the root point back to the root.
+        f.seek(HEADER.size + 16)
+        f.write((0).to_bytes(8, "little"))
+    with LazyTree(records) as tree:
+        with pytest.raises(InconsistentTraversalError):
+            tree.root.right_child
+    with open(records, "r+b") as f:
+        f.truncate(HEADER.size + RECORD.size)
+    with pytest.raises(UnsupportedFormatError):
+        LazyTree(records)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import pytest
+
+from binary_tree import ArrayTree, TreeNode, parallel
+from binary_tree.builders import random_tree
+from binary_tree.exceptions import (
+    InconsistentTraversalError, InsufficientTraversalInformation)
+from binary_tree.hashing import trees_equal
+from tests.conftest import INORDER, POSTORDER, PREORDER
+
+
+def random_traversals(size, seed=0):
+    """Returns the preorder, inorder and postorder of a random tree."""
+    node = random_tree(size, seed=seed)
+    return [TreeNode.traverse(node, mode)
+            for mode in ("preorder", "inorder", "postorder")]
+
+
+@pytest.mark.parametrize("order", ["preorder", "postorder"])
+def test_same_links_as_load(order):
+    """The tree is split into many tasks, and rebuilt with the same links as
+    ArrayTree.load."""
+    preorder, inorder, postorder = random_traversals(3000)
+    traversal = preorder if order == "preorder" else postorder
+    tree = parallel.load(
+        inorder=inorder, workers=2, threshold=50, **{order: traversal})
+    expected = ArrayTree.load(inorder=inorder, **{order: traversal})
+    assert isinstance(tree, ArrayTree)
+    assert tree.root == expected.root
+    assert tree.left == expected.left
+    assert tree.right == expected.right
+
+
+def test_split():
+    """The nodes above the subtrees are linked by the split."""
+    left = [-1] * len(PREORDER)
+    right = [-1] * len(PREORDER)
+    tasks = parallel.split(PREORDER, INORDER, left, right, "preorder", 3)
+    assert sorted(tasks) == [(2, 0, 3), (5, 4, 3), (9, 8, 3), (12, 12, 3)]
+    assert left[:2] == [1, 2] and right[:2] == [8, 5]
+
+
+def test_tree_node(longer_tree):
+    tree = parallel.load(
+        postorder=POSTORDER, inorder=INORDER, tree_class=TreeNode,
+        workers=2, threshold=2)
+    assert trees_equal(tree, longer_tree)
+
+
+def test_degenerate_tree():
+    """A tree too unbalanced to be split is still rebuilt."""
+    size = 5000
+    tree = parallel.load(
+        preorder=list(range(size)), inorder=list(range(size - 1, -1, -1)),
+        workers=2, threshold=10)
+    assert tree.traverse("postorder") == list(range(size - 1, -1, -1))
+
+
+def test_serial_fallback():
+    """A single worker, or a small tree, is loaded in the current process."""
+    tree = parallel.load(preorder=PREORDER, inorder=INORDER, workers=1)
+    assert tree.traverse("postorder") == POSTORDER
+    tree = parallel.load(preorder=PREORDER, inorder=INORDER, workers=4)
+    assert tree.traverse("postorder") == POSTORDER
+
+
+def test_errors():
+    with pytest.raises(InsufficientTraversalInformation):
+        parallel.load(preorder=PREORDER)
+    with pytest.raises(InconsistentTraversalError):
+        parallel.load(
+            preorder=PREORDER, inorder=INORDER[:-1] + [91], workers=2,
+            threshold=2)
+    # A misplaced value in a subtree is found by a worker.
+    with pytest.raises(InconsistentTraversalError):
+        parallel.load(
+            preorder=PREORDER[:3] + [12, 4] + PREORDER[5:], inorder=INORDER,
+            workers=2, threshold=4)
@@ -5,6 +5,9 @@ import sys
 import pytest
 
 from binary_tree import TreeNode
+from binary_tree.builders import random_tree
+from binary_tree.exceptions import (
+    InconsistentTraversalError, InvalidTraversalMode)
 
 
 @pytest.fixture
@@ -90,40 +93,6 @@ def test_basic_deserialize_postorder_inorder(basic_tree):
             deserialized_tree, mode="inorder")
 
 
-@pytest.fixture
-def longer_tree():
-    """Returns a longer tree with a preorder traversal of:
-        [25, 15, 10, 4, 12, 22, 18, 24, 50, 35, 31, 44, 70, 66, 90]
-    """
-    root = TreeNode(25)
-
-    root.left_child = TreeNode(15)
-
-    root.left_child.left_child = TreeNode(10)
-
-    root.left_child.left_child.left_child = TreeNode(4)
-    root.left_child.left_child.right_child = TreeNode(12)
-
-    root.left_child.right_child = TreeNode(22)
-
-    root.left_child.right_child.left_child = TreeNode(18)
-    root.left_child.right_child.right_child = TreeNode(24)
-
-    root.right_child = TreeNode(50)
-
-    root.right_child.left_child = TreeNode(35)
-
-    root.right_child.left_child.left_child = TreeNode(31)
-    root.right_child.left_child.right_child = TreeNode(44)
-
-    root.right_child.right_child = TreeNode(70)
-
-    root.right_child.right_child.left_child = TreeNode(66)
-    root.right_child.right_child.right_child = TreeNode(90)
-    yield root
-    del root
-
-
 def test_longer_serialize_preorder(longer_tree):
     """Tests the serialization of the longer tree with preorder."""
     serialized_tree = TreeNode.traverse(longer_tree, mode="preorder")
@@ -197,31 +166,9 @@ def test_longer_deserialize_postorder_inorder(longer_tree):
 
 @pytest.fixture
 def giant_tree():
-    """Fixture to generate a massive binary tree."""
-    import random
-
-    def get_random_node_value(size):
-        """Function to get a random node value"""
-        nonlocal node_ids
-        node_value = 0
-        while node_value in node_ids:
-            node_value = random.randint(0, size)
-        node_ids.update({node_value})
-        return node_value
-
-    node = TreeNode(1)
-    node_ids = {1}
-    node_ = node
-    size = 10000
-    # re-enable this if checking with larger binary trees.
-    # sys.setrecursionlimit(size)
-    while len(node_ids) < size:
-        node_.left_child = TreeNode(get_random_node_value(size))
-        node_.right_child = TreeNode(get_random_node_value(size))
-        if random.random() < 0.5:
-            node_ = node_.left_child
-        else:
-            node_ = node_.right_child
+    """Fixture to generate a massive binary tree, a random spine of nodes with
+    a leaf hanging on each."""
+    node = random_tree(10000, shape="spine", seed=0)
     yield node
     del node
 
@@ -239,3 +186,88 @@ def test_giant_deserialize_preorder_inorder(giant_tree):
     assert isinstance(deserialized_tree, TreeNode)
 
     assert TreeNode.traverse(deserialized_tree) == TreeNode.traverse(giant_tree)
+
+
+def test_load_lengths_mismatch():
+    """Traversals of different lengths cannot describe the same tree."""
+    with pytest.raises(InconsistentTraversalError):
+        TreeNode.load(preorder=[1, 2, 4, 5, 3], inorder=[4, 2, 5, 1])
+
+
+def test_load_missing_value():
+    """Every value of the preorder must be found in the inorder traversal."""
+    with pytest.raises(InconsistentTraversalError):
+        TreeNode.load(postorder=[4, 5, 2, 3, 6], inorder=[4, 2, 5, 1, 3])
+
+
+def test_degenerate_tree_round_trip():
+    """A linked-list-shaped tree, far deeper than the recursion limit, can be
+    traversed and loaded back."""
+    size = sys.getrecursionlimit() * 20
+    root = TreeNode(0)
+    node = root
+    for value in range(1, size):
+        node.left_child = TreeNode(value)
+        node = node.left_child
+    preorder = TreeNode.traverse(root, mode="preorder")
+    inorder = TreeNode.traverse(root, mode="inorder")
+    postorder = TreeNode.traverse(root, mode="postorder")
+    assert preorder == list(range(size))
+    assert inorder == postorder == list(range(size - 1, -1, -1))
+
+    from_preorder = TreeNode.load(preorder=preorder, inorder=inorder)
+    from_postorder = TreeNode.load(postorder=postorder, inorder=inorder)
+    assert TreeNode.traverse(from_preorder, mode="preorder") == preorder
+    assert TreeNode.traverse(from_postorder, mode="preorder") == preorder
+
+
+def test_load_impossible_order():
+    """The values match, but no tree has both of these traversals."""
+    with pytest.raises(InconsistentTraversalError):
+        TreeNode.load(preorder=[1, 2, 3], inorder=[3, 1, 2])
+    with pytest.raises(InconsistentTraversalError):
+        TreeNode.load(postorder=[2, 3, 1], inorder=[3, 1, 2])
+
+
+def test_iter_traverse_matches_traverse(longer_tree):
+    """The lazy traversal yields the same values as the list traversal."""
+    for mode in ("preorder", "inorder", "postorder"):
+        assert list(TreeNode.iter_traverse(longer_tree, mode=mode)) == (
+            TreeNode.traverse(longer_tree, mode=mode))
+
+
+def test_iter_traverse_nodes(basic_tree):
+    """The lazy traversal can yield the nodes instead of their values."""
+    nodes = list(TreeNode.iter_traverse(
+        basic_tree, mode="postorder", nodes=True))
+    assert all(isinstance(node, TreeNode) for node in nodes)
+    assert [node.value for node in nodes] == [4, 5, 2, 3, 1]
+    assert nodes[-1] is basic_tree
+
+
+def test_iter_traverse_invalid_mode(basic_tree):
+    """An invalid mode is reported before iterating."""
+    with pytest.raises(InvalidTraversalMode):
+        TreeNode.iter_traverse(basic_tree, mode="levelorder")
+
+
+def test_postorder_shared_child():
+    """A node whose children are the same object is traversed correctly."""
+    shared = TreeNode(2, TreeNode(3))
+    root = TreeNode(1, shared, shared)
+    assert TreeNode.traverse(root, mode="postorder") == [3, 2, 3, 2, 1]
+
+
+def test_tree_node_has_no_dict(basic_tree):
+    """Nodes are slotted, so they can't grow arbitrary attributes."""
+    assert not hasattr(basic_tree, "__dict__")
+    with pytest.raises(AttributeError):
+        basic_tree.colour = "red"
+
+
+def test_from_links():
+    """The trusted construction path wires the nodes from their links."""
+    root = TreeNode._from_links(
+        [1, 2, 4, 5, 3], [1, 2, -1, -1, -1], [4, 3, -1, -1, -1], 0)
+    assert TreeNode.traverse(root, mode="inorder") == [4, 2, 5, 1, 3]
+    assert root.right_child.left_child is None
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from binary_tree import ArrayTree, TreeNode, shared
+from binary_tree.exceptions import UnsupportedFormatError
+from tests.conftest import INORDER, POSTORDER, PREORDER
+
+
+def attached_postorder(name):
+    """Returns the postorder of a shared tree, from another process."""
+    with shared.attach(name) as published:
+        return published.tree.traverse("postorder")
+
+
+def test_publish_and_attach(longer_tree):
+    published = shared.publish(longer_tree)
+    try:
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            results = list(pool.map(attached_postorder, [published.name] * 4))
+        assert results == [POSTORDER] * 4
+        with shared.attach(published.name) as attached:
+            assert len(attached) == len(PREORDER)
+            assert isinstance(attached.tree.values, memoryview)
+            assert attached.tree.traverse("inorder") == INORDER
+            with pytest.raises(TypeError):
+                attached.tree.values[0] = 1
+    finally:
+        published.unlink()
+    with pytest.raises(FileNotFoundError):
+        shared.attach(published.name)
+
+
+def test_array_tree_in_postorder():
+    """The root of an ArrayTree laid out in postorder is kept."""
+    tree = ArrayTree.load(postorder=POSTORDER, inorder=INORDER)
+    published = shared.publish(tree)
+    try:
+        with shared.attach(published.name) as attached:
+            assert attached.tree.root == len(POSTORDER) - 1
+            assert TreeNode.traverse(attached.tree.to_tree_node()) == (
+                PREORDER)
+    finally:
+        published.unlink()
+
+
+def test_files(tmp_path):
+    path = str(tmp_path / "tree.shared")
+    shared.publish_file(
+        ArrayTree.load(preorder=PREORDER, inorder=INORDER), path,
+        atomic=True)
+    with shared.attach_file(path) as attached:
+        assert attached.tree.traverse("postorder") == POSTORDER
+        # A tree attached from a file is saved like any other.
+        attached.tree.save_to_disk(str(tmp_path / "tree"), format="binary")
+    node = TreeNode.parse_files(
+        filename=str(tmp_path / "tree.tree"), format="binary")
+    assert TreeNode.traverse(node) == PREORDER
+
+
+def test_invalid_files(tmp_path, longer_tree):
+    path = str(tmp_path / "tree.shared")
+    with open(path, "wb") as f:
+        f.write(b"BTRE" + bytes(20))
+    with pytest.raises(UnsupportedFormatError):
+        shared.attach_file(path)
+    shared.publish_file(longer_tree, path)
+    with open(path, "r+b") as f:
+        f.truncate(shared.layout_size(len(PREORDER)) - 8)
+    with pytest.raises(UnsupportedFormatError):
+        shared.attach_file(path)
+    open(path, "wb").close()
+    with pytest.raises(UnsupportedFormatError):
+        shared.attach_file(path)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+from binary_tree import ArrayTree, TreeNode
+from binary_tree import succinct
+from binary_tree.exceptions import (
+    InconsistentTraversalError, UnsupportedFormatError)
+from tests.conftest import INORDER, PREORDER
+
+
+def assert_same_tree(first, second):
+    """Asserts that two trees have the same traversals."""
+    for mode in ("preorder", "inorder", "postorder"):
+        assert TreeNode.traverse(first, mode=mode) == TreeNode.traverse(
+            second, mode=mode)
+
+
+def test_encode_basic_tree():
+    """The shape codes tell which children every node has."""
+    root = TreeNode(1, TreeNode(2, TreeNode(4), TreeNode(5)), TreeNode(3))
+    values, codes = succinct.encode(root)
+    assert values == [1, 2, 4, 5, 3]
+    assert bytes(codes) == bytes([3, 3, 0, 0, 0])
+    assert succinct.pack_shape(codes) == bytes([0b00001111, 0])
+    assert succinct.unpack_shape(succinct.pack_shape(codes), 5) == codes
+
+
+def test_round_trip(tmp_path, longer_tree):
+    """A tree saved in the succinct format is loaded back identically, and
+    the file is about half the size of the binary format."""
+    prefix = str(tmp_path / "tree")
+    longer_tree.save_to_disk(prefix, format="succinct")
+    longer_tree.save_to_disk(prefix, format="binary")
+    loaded = TreeNode.parse_files(
+        filename=prefix + ".succinct", format="succinct")
+    assert_same_tree(loaded, longer_tree)
+    assert os.path.getsize(prefix + ".succinct") == (
+        succinct.HEADER.size + 8 + 15 * 4)
+    assert os.path.getsize(prefix + ".tree") == 16 + 2 * 15 * 4
+
+
+def test_repeated_values(tmp_path):
+    """Repeated values, which the inorder lookup can't handle, survive."""
+    root = TreeNode(7, TreeNode(7, right=TreeNode(7)), TreeNode(7))
+    prefix = str(tmp_path / "tree")
+    root.save_to_disk(prefix, format="succinct")
+    loaded = TreeNode.parse_files(
+        filename=prefix + ".succinct", format="succinct")
+    assert loaded.left_child.left_child is None
+    assert loaded.left_child.right_child.value == 7
+    assert loaded.right_child.left_child is None
+
+
+def test_array_tree_round_trip(tmp_path, longer_tree):
+    """ArrayTree reads and writes the same succinct files."""
+    prefix = str(tmp_path / "tree")
+    ArrayTree.load(postorder=TreeNode.traverse(
+        longer_tree, mode="postorder"), inorder=INORDER).save_to_disk(
+            prefix, format="succinct")
+    tree = ArrayTree.parse_files(
+        filename=prefix + ".succinct", format="succinct")
+    assert list(tree.values) == PREORDER
+    assert tree.traverse("inorder") == INORDER
+
+
+def test_deep_tree(tmp_path):
+    """A degenerate tree is encoded and decoded without recursion."""
+    root = TreeNode(0)
+    node = root
+    for value in range(1, 20000):
+        node.right_child = TreeNode(value)
+        node = node.right_child
+    prefix = str(tmp_path / "tree")
+    root.save_to_disk(prefix, format="succinct")
+    loaded = TreeNode.parse_files(
+        filename=prefix + ".succinct", format="succinct")
+    assert TreeNode.traverse(loaded, mode="inorder") == list(range(20000))
+
+
+@pytest.mark.parametrize("codes", [
+    [0, 0],
+    [1],
+    [3, 0],
+    [2, 1, 0, 0],
+])
+def test_inconsistent_shapes(codes):
+    """Shapes that end too early or too late are rejected."""
+    with pytest.raises(InconsistentTraversalError):
+        succinct.links(bytes(codes))
+
+
+def test_invalid_file(tmp_path, longer_tree):
+    """Foreign and truncated files are rejected."""
+    prefix = str(tmp_path / "tree")
+    longer_tree.save_to_disk(prefix, format="binary")
+    with pytest.raises(UnsupportedFormatError):
+        TreeNode.parse_files(filename=prefix + ".tree", format="succinct")
+    longer_tree.save_to_disk(prefix, format="succinct")
+    path = tmp_path / "tree.succinct"
+    path.write_bytes(path.read_bytes()[:-4])
+    with pytest.raises(UnsupportedFormatError):
+        TreeNode.parse_files(filename=str(path), format="succinct")
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import threading
+from array import array
+
+import pytest
+
+from binary_tree import TreeNode
+from binary_tree.text_format import read_values, write_batches
+from binary_tree.traversal import iter_batches
+
+
+def read_file_values(path):
+    """Returns the integers of a text traversal file."""
+    with open(path, "rb") as f:
+        return [int(line) for line in f.read().splitlines()]
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 7, 65536])
+def test_write_all_traversals_in_batches(tmp_path, longer_tree, batch_size):
+    """Every batch size writes the same three traversals."""
+    prefix = str(tmp_path / "tree")
+    write_batches(
+        iter_batches(
+            longer_tree, preorder=True, inorder=True, postorder=True,
+            batch_size=batch_size),
+        prefix, preorder=True, inorder=True, postorder=True)
+    for mode in ("preorder", "inorder", "postorder"):
+        assert read_file_values("{}.{}".format(prefix, mode)) == (
+            TreeNode.traverse(longer_tree, mode=mode))
+
+
+def test_save_to_disk_text_layout(tmp_path):
+    """The files hold one integer per line, with a trailing newline."""
+    prefix = str(tmp_path / "tree")
+    TreeNode(1, TreeNode(2), TreeNode(3)).save_to_disk(prefix)
+    with open(prefix + ".preorder", "rb") as f:
+        assert f.read() == b"1\n2\n3\n"
+    with open(prefix + ".inorder", "rb") as f:
+        assert f.read() == b"2\n1\n3\n"
+    assert not os.path.exists(prefix + ".postorder")
+
+
+def test_atomic_save_replaces_files(tmp_path, longer_tree):
+    """An atomic save replaces the old dump and leaves no temporary files."""
+    prefix = str(tmp_path / "tree")
+    TreeNode(1).save_to_disk(prefix)
+    longer_tree.save_to_disk(prefix, atomic=True)
+    assert sorted(os.listdir(str(tmp_path))) == [
+        "tree.inorder", "tree.preorder"]
+    loaded = TreeNode.parse_files(
+        preorder=prefix + ".preorder", inorder=prefix + ".inorder")
+    assert TreeNode.traverse(loaded) == TreeNode.traverse(longer_tree)
+
+
+def test_failed_atomic_save_keeps_old_files(tmp_path):
+    """If writing fails midway, the previous dump is left untouched."""
+
+    class Unprintable(int):
+        def __str__(self):
+            raise RuntimeError("Cannot format this value.")
+
+    prefix = str(tmp_path / "tree")
+    TreeNode(1).save_to_disk(prefix)
+    broken = TreeNode(1, TreeNode(Unprintable(2)))
+    with pytest.raises(RuntimeError):
+        broken.save_to_disk(prefix, atomic=True)
+    assert sorted(os.listdir(str(tmp_path))) == [
+        "tree.inorder", "tree.preorder"]
+    assert read_file_values(prefix + ".preorder") == [1]
+
+
+def test_concurrent_atomic_saves(tmp_path):
+    """Atomic saves to the same prefix from one process don't share their
+    temporary files."""
+    prefix = str(tmp_path / "tree")
+    barrier = threading.Barrier(2, timeout=10)
+    errors = []
+
+    def batches(values):
+        yield values[:1], values[:1], []
+        # Both saves have their temporary files open at this point.
+        barrier.wait()
+        yield values[1:], values[1:], []
+
+    def save(values):
+        try:
+            write_batches(batches(values), prefix, atomic=True)
+        except Exception as error:
+            errors.append(error)
+
+    threads = [
+        threading.Thread(target=save, args=(values,))
+        for values in ([1, 2, 3], [4, 5, 6])]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert sorted(os.listdir(str(tmp_path))) == [
+        "tree.inorder", "tree.preorder"]
+    assert read_file_values(prefix + ".preorder") in ([1, 2, 3], [4, 5, 6])
+
+
+@pytest.mark.parametrize("mode", ["preorder", "inorder", "postorder"])
+def test_write_single_traversal(tmp_path, longer_tree, mode):
+    """A single traversal can be written on its own, in small batches."""
+    prefix = str(tmp_path / "tree")
+    modes = {
+        "preorder": mode == "preorder",
+        "inorder": mode == "inorder",
+        "postorder": mode == "postorder",
+    }
+    write_batches(
+        iter_batches(longer_tree, batch_size=4, **modes), prefix, **modes)
+    assert os.listdir(str(tmp_path)) == ["tree." + mode]
+    assert read_file_values("{}.{}".format(prefix, mode)) == (
+        TreeNode.traverse(longer_tree, mode=mode))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 5, 1 << 20])
+def test_read_values_across_chunks(tmp_path, chunk_size):
+    """Lines split across chunks are parsed whole, with or without a
+    trailing newline."""
+    path = tmp_path / "values"
+    path.write_bytes(b"12\n-345\n0\n9876543210\n7")
+    values = read_values(str(path), chunk_size=chunk_size)
+    assert isinstance(values, array)
+    assert list(values) == [12, -345, 0, 9876543210, 7]
+
+
+def test_read_values_beyond_64_bits(tmp_path):
+    """Values that don't fit in 64 bits are still read back exactly."""
+    path = tmp_path / "values"
+    path.write_bytes(b"1\n%d\n-2\n" % (1 << 70))
+    assert list(read_values(str(path), chunk_size=4)) == [1, 1 << 70, -2]
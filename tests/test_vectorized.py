@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from array import array
+
+import pytest
+
+from binary_tree import ArrayTree, TreeNode, vectorized
+from binary_tree.builders import random_tree
+from binary_tree.exceptions import (
+    InconsistentTraversalError, InsufficientTraversalInformation,
+    InvalidTraversalMode)
+from binary_tree.instrumentation import Instrumentation
+from binary_tree.interning import load_dag, save_dag
+from tests.conftest import INORDER, POSTORDER, PREORDER
+
+MODES = ("preorder", "inorder", "postorder")
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    """Runs a test with NumPy, and with the pure Python fallback."""
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(vectorized, "numpy", None)
+    return request.param
+
+
+def test_traversals(backend):
+    tree = ArrayTree.load(postorder=POSTORDER, inorder=INORDER)
+    for mode, expected in zip(MODES, (PREORDER, INORDER, POSTORDER)):
+        assert list(vectorized.traverse(tree, mode)) == expected
+        assert list(vectorized.order(tree, mode)) == list(
+            tree.iter_indices(mode))
+    with pytest.raises(InvalidTraversalMode):
+        vectorized.order(tree, "levelorder")
+
+
+def test_sizes_and_depths(backend):
+    tree = ArrayTree.load(preorder=PREORDER, inorder=INORDER)
+    assert list(vectorized.subtree_sizes(tree)) == [
+        15, 7, 3, 1, 1, 3, 1, 1, 7, 3, 1, 1, 3, 1, 1]
+    assert list(vectorized.depths(tree)) == [
+        0, 1, 2, 3, 3, 2, 3, 3, 1, 2, 3, 3, 2, 3, 3]
+
+
+def test_random_tree(backend):
+    """Both backends agree with the ArrayTree traversals."""
+    tree = random_tree(2000, tree_class=ArrayTree)
+    for mode in MODES:
+        assert list(vectorized.traverse(tree, mode)) == tree.traverse(mode)
+    preorder, inorder = tree.traverse("preorder"), tree.traverse("inorder")
+    loaded = vectorized.load(preorder=preorder, inorder=inorder)
+    assert loaded.left == tree.left and loaded.right == tree.right
+    postorder = tree.traverse("postorder")
+    expected = ArrayTree.load(postorder=postorder, inorder=inorder)
+    left, right = vectorized.links(postorder=postorder, inorder=inorder)
+    assert left == expected.left and right == expected.right
+
+
+def test_narrow_links(backend):
+    """Links of any integer type are read as integers, not as raw bytes."""
+    expected = random_tree(1000, tree_class=ArrayTree)
+    links = [(array("i", expected.left), array("i", expected.right))]
+    if backend == "numpy":
+        import numpy
+        links.append((numpy.array(expected.left, dtype=numpy.int32),
+                      numpy.array(expected.right, dtype=numpy.int32)))
+    for left, right in links:
+        tree = ArrayTree(expected.values, left, right)
+        assert list(vectorized.traverse(tree, "postorder")) == (
+            expected.traverse("postorder"))
+        assert vectorized.subtree_sizes(tree) == vectorized.subtree_sizes(
+            expected)
+
+
+def test_shared_subtrees(backend, tmp_path):
+    """Trees whose subtrees are shared traverse like the tree they stand
+    for."""
+    leaf = TreeNode(3)
+    node = TreeNode(1, TreeNode(2, leaf, leaf), TreeNode(2, leaf, leaf))
+    path = str(tmp_path / "tree.dag")
+    save_dag(node, path)
+    tree = load_dag(path, tree_class=ArrayTree)
+    assert len(tree) == 3
+    for mode in MODES:
+        assert list(vectorized.traverse(tree, mode)) == TreeNode.traverse(
+            node, mode)
+    assert vectorized.subtree_sizes(tree)[tree.root] == 7
+
+
+def test_narrow_trees(monkeypatch):
+    """Trees too deep for their size fall back to the pure Python code."""
+    pytest.importorskip("numpy")
+    monkeypatch.setattr(vectorized, "MAX_NARROW_LEVELS", 4)
+    size = 100
+    tree = vectorized.load(
+        preorder=list(range(size)), inorder=list(range(size - 1, -1, -1)))
+    assert list(vectorized.traverse(tree, "postorder")) == list(
+        range(size - 1, -1, -1))
+    assert list(vectorized.depths(tree)) == list(range(size))
+    assert list(vectorized.subtree_sizes(tree)) == list(range(size, 0, -1))
+
+
+def test_parse_files(backend, tmp_path):
+    prefix = str(tmp_path / "tree")
+    ArrayTree.load(preorder=PREORDER, inorder=INORDER).save_to_disk(
+        prefix, format="binary")
+    instrumentation = Instrumentation()
+    tree = vectorized.parse_files(
+        filename=prefix + ".tree", format="binary",
+        instrumentation=instrumentation)
+    assert tree.traverse("postorder") == POSTORDER
+    phases = instrumentation.operations[0].phases
+    assert phases["reconstruct"].max_depth == 4
+
+
+def test_errors(backend):
+    with pytest.raises(InsufficientTraversalInformation):
+        vectorized.load(preorder=PREORDER)
+    with pytest.raises(InconsistentTraversalError):
+        vectorized.load(preorder=PREORDER, inorder=INORDER[:-1] + [91])
+    with pytest.raises(InconsistentTraversalError):
+        vectorized.load(
+            preorder=PREORDER[:3] + [12, 4] + PREORDER[5:], inorder=INORDER)